@@ -0,0 +1,459 @@
+"""Offline benchmark for Ai Freesta.
+
+Runs DynamicAIWindow offscreen against local stand-in chat pages that
+mimic each AI_SITES entry's DOM (textarea / contenteditable / Quill
+editor, send and stop buttons, streamed replies) and prints one JSON
+document with startup, load, broadcast, layout and memory numbers.
+
+    python benchmark.py --output run.json
+    python benchmark.py --panes 10 --rounds 3 --compare run.json
+
+Nothing touches the network or the user's real settings, history or
+browser profiles: HOME and the XDG directories (and with them QSettings)
+are pointed at a temporary directory. On Windows QSettings still lives in
+the registry.
+"""
+
+import time
+
+_PROCESS_STARTED = time.perf_counter()
+
+import os
+import sys
+import json
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ------------------------------ mock sites ------------------------------
+
+# DOM stand-ins matching the selectors in freesta.AI_SITES. Each entry:
+# input element, send button, reply element (tag, attributes) and stop
+# button attributes.
+MOCK_SITES = {
+    "ChatGPT": {
+        "input": '<textarea id="prompt-textarea"></textarea>',
+        "send": '<button data-testid="send-button">Send</button>',
+        "reply": ("div", {"data-message-author-role": "assistant"}),
+        "stop": {"data-testid": "stop-button"},
+    },
+    "Grok": {
+        "input": "<textarea></textarea>",
+        "send": '<button type="submit">Send</button>',
+        "reply": ("div", {"class": "message-bubble"}),
+        "stop": {"aria-label": "Stop"},
+    },
+    "Gemini": {
+        "input": '<div class="ql-editor" contenteditable="true"><p><br></p></div>',
+        "send": '<button aria-label="Send message">Send</button>',
+        "reply": ("message-content", {}),
+        "stop": {"aria-label": "Stop response"},
+    },
+    "Z.AI": {
+        "input": "<textarea></textarea>",
+        "send": '<button aria-label="Send">Send</button>',
+        "reply": ("div", {"class": "chat-assistant"}),
+        "stop": {"aria-label": "Stop"},
+    },
+    "Perplexity Ai": {
+        "input": '<div contenteditable="true"></div>',
+        "send": '<button type="submit">Send</button>',
+        "reply": ("div", {"class": "prose"}),
+        "stop": {"aria-label": "Stop"},
+    },
+}
+
+GENERIC_MOCK = {
+    "input": "<textarea></textarea>",
+    "send": '<button type="submit">Send</button>',
+    "reply": ("div", {"class": "markdown"}),
+    "stop": {"aria-label": "Stop"},
+}
+
+MOCK_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>%(name)s (mock)</title></head>
+<body>
+<main id="thread"></main>
+<form id="composer" onsubmit="return false">%(input)s %(send)s</form>
+<script>
+const PANE = %(pane)s, REPLY = %(reply)s, STOP = %(stop)s;
+const FIRST_TOKEN_MS = %(first_token_ms)d, TOKEN_MS = %(token_ms)d, TOKENS = %(tokens)d;
+const input = document.querySelector("#composer > :first-child");
+const send = document.querySelector("#composer > button");
+const thread = document.getElementById("thread");
+const read = () => input.isContentEditable ? input.innerText : input.value;
+
+// Like a React app, the send button only enables on the next frame.
+const sync = () => requestAnimationFrame(() => { send.disabled = busy || !read().trim(); });
+let busy = false;
+input.addEventListener("input", sync);
+sync();
+
+function submit() {
+  const text = read().trim();
+  if (!text || busy) return;
+  busy = true;
+  fetch("/submit?pane=" + encodeURIComponent(PANE) + "&chars=" + text.length, { method: "POST" });
+  if (input.isContentEditable) input.innerHTML = ""; else input.value = "";
+  sync();
+
+  const user = document.createElement("div");
+  user.textContent = text;
+  thread.appendChild(user);
+  const reply = document.createElement(REPLY[0]);
+  for (const [k, v] of Object.entries(REPLY[1])) reply.setAttribute(k, v);
+  thread.appendChild(reply);
+  const stop = document.createElement("button");
+  for (const [k, v] of Object.entries(STOP)) stop.setAttribute(k, v);
+  stop.textContent = "Stop";
+  document.body.appendChild(stop);
+
+  let n = 0;
+  setTimeout(function tick() {
+    reply.textContent += (n ? " " : "") + "token" + n;
+    if (++n < TOKENS) { setTimeout(tick, TOKEN_MS); return; }
+    stop.remove();
+    busy = false;
+    sync();
+  }, FIRST_TOKEN_MS);
+}
+
+send.addEventListener("click", submit);
+input.addEventListener("keydown", (e) => {
+  if (e.key === "Enter" && !e.shiftKey) { e.preventDefault(); submit(); }
+});
+</script>
+</body></html>
+"""
+
+
+class MockSiteServer(ThreadingHTTPServer):
+    """Serves one stand-in site and records when its page submits."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str, name: str, pane: str, reply_timing: dict):
+        super().__init__((host, 0), MockSiteHandler)
+        spec = MOCK_SITES.get(name.rsplit(" #", 1)[0], GENERIC_MOCK)
+        self.page = (MOCK_PAGE % {
+            "name": name,
+            "pane": json.dumps(pane),
+            "input": spec["input"],
+            "send": spec["send"],
+            "reply": json.dumps(spec["reply"]),
+            "stop": json.dumps(spec["stop"]),
+            **reply_timing,
+        }).encode("utf-8")
+        self.submits = []
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.server.page)))
+        self.end_headers()
+        self.wfile.write(self.server.page)
+
+    def do_POST(self):
+        self.server.submits.append(time.perf_counter())
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock_sites(sites: list, reply_timing: dict) -> list:
+    servers = []
+    for i, site in enumerate(sites):
+        # Distinct loopback addresses make each mock its own "site", so
+        # Chromium gives it its own renderer like the real ones. macOS only
+        # routes 127.0.0.1, where distinct ports have to do.
+        host = "127.0.0.1" if sys.platform == "darwin" else f"127.0.0.{i + 1}"
+        server = MockSiteServer(host, site["name"], str(i), reply_timing)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+# ------------------------------ harness ------------------------------
+
+def isolate_environment(root: str):
+    """Keep settings, history and browser profiles out of the real home."""
+    os.environ["HOME"] = root
+    os.environ["USERPROFILE"] = root
+    os.environ["XDG_CONFIG_HOME"] = os.path.join(root, ".config")
+    os.environ["XDG_DATA_HOME"] = os.path.join(root, ".local", "share")
+    os.environ["XDG_CACHE_HOME"] = os.path.join(root, ".cache")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def wait_until(app, predicate, timeout_s: float) -> bool:
+    from PySide6.QtCore import QEventLoop
+
+    deadline = time.perf_counter() + timeout_s
+    while not predicate():
+        if time.perf_counter() > deadline:
+            return False
+        app.processEvents(QEventLoop.AllEvents, 20)
+    return True
+
+
+def ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def run(args) -> dict:
+    import_started = time.perf_counter()
+    import freesta
+    from PySide6.QtCore import QSettings, qVersion
+    from PySide6.QtWidgets import QApplication
+    imported = time.perf_counter()
+
+    base_sites = freesta.AI_SITES
+    sites = []
+    for i in range(args.panes or len(base_sites)):
+        site = dict(base_sites[i % len(base_sites)])
+        if i >= len(base_sites):
+            site["name"] = f"{site['name']} #{i // len(base_sites) + 1}"
+        sites.append(site)
+
+    reply_timing = {
+        "first_token_ms": args.first_token_ms, "token_ms": args.token_ms, "tokens": args.tokens,
+    }
+    servers = start_mock_sites(sites, reply_timing)
+    for site, server in zip(sites, servers):
+        site["url"] = server.url
+
+    preset = freesta.apply_chromium_preset(args.chromium_preset)
+    app = QApplication(sys.argv[:1])
+    run_started = time.perf_counter()
+    footprint_started = freesta.engine_footprint()
+    app.setStyle("Fusion")
+    settings = QSettings("Ai Freesta", "Ai Freesta")
+    settings.setValue("hide_notice", True)
+    settings.setValue("memory_budget_mb", 0)   # no hibernation mid-run
+
+    window_started = time.perf_counter()
+    window = freesta.DynamicAIWindow(sites)
+    # Hook the views before showing the window, so no early load is missed.
+    loaded = {}
+    for i, view in enumerate(window.views):
+        view.loadFinished.connect(lambda ok, i=i: loaded.setdefault(i, (time.perf_counter(), ok)))
+    window.show()
+    app.processEvents()
+    window_shown = time.perf_counter()
+
+    all_loaded = wait_until(app, lambda: len(loaded) == len(window.views), args.timeout)
+    all_loaded_at = max((t for t, _ok in loaded.values()), default=time.perf_counter())
+
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "qt": qVersion(),
+            "platform": platform.platform(),
+            "panes": len(sites),
+            "chromium_preset": preset,
+            "chromium_flags": os.environ.get("QTWEBENGINE_CHROMIUM_FLAGS", ""),
+        },
+        "startup": {
+            "import_ms": ms(imported - import_started),
+            "window_ms": ms(window_shown - window_started),
+            "process_to_window_ms": ms(window_shown - _PROCESS_STARTED),
+            # Measured by the app from its own import to the first event-loop turn.
+            "interactive_ms": round(window.startup_timings["interactive_ms"], 2)
+            if "interactive_ms" in window.startup_timings else None,
+            "all_loaded_ms": ms(all_loaded_at - window_started) if all_loaded else None,
+            "panes_failed_to_load": sorted(
+                sites[i]["name"] for i in range(len(sites)) if not loaded.get(i, (0, False))[1]
+            ),
+        },
+        "broadcast": [],
+    }
+
+    # -------------------- broadcast rounds --------------------
+
+    # The regular rounds, then one round per --payload-kb size, so send time
+    # can be compared against prompt size.
+    prompts = [(f"benchmark prompt {n}: \"quotes\", newlines\nand unicode ✓", 0) for n in range(args.rounds)]
+    for kb in args.payload_kb:
+        line = "payload line with \"quotes\", <tags> and unicode ✓\n"
+        prompts.append(((line * (kb * 1024 // len(line) + 1))[:kb * 1024], kb))
+
+    for round_no, (prompt, payload_kb) in enumerate(prompts):
+        acked, finished = {}, {}
+        on_ack = lambda view, info: acked.setdefault(view, (time.perf_counter(), info))
+        on_done = lambda view, _text, timings: finished.setdefault(view, timings)
+        window.dispatcher.acknowledged.connect(on_ack)
+        window.capture.finished.connect(on_done)
+        submits_before = [len(s.submits) for s in servers]
+
+        started = time.perf_counter()
+        window.broadcast_prompt(prompt)
+        wait_until(app, lambda: len(finished) == len(window.views), args.timeout)
+
+        panes = {}
+        for i, view in enumerate(window.views):
+            server = servers[i]
+            submitted = server.submits[submits_before[i]] if len(server.submits) > submits_before[i] else None
+            ack = acked.get(view)
+            timings = finished.get(view, {})
+            panes[sites[i]["name"]] = {
+                "submit_ms": ms(submitted - started) if submitted else None,
+                "ack_ms": ms(ack[0] - started) if ack else None,
+                "ack_attempts": ack[1]["attempts"] if ack else None,
+                "first_text_ms": round(timings["ttft_ms"], 2) if timings else None,
+                "response_ms": round(timings["total_ms"], 2) if timings else None,
+                "completion": timings.get("reason"),
+            }
+        window.dispatcher.acknowledged.disconnect(on_ack)
+        window.capture.finished.disconnect(on_done)
+
+        submit_times = [p["submit_ms"] for p in panes.values() if p["submit_ms"] is not None]
+        result["broadcast"].append({
+            "round": round_no,
+            "payload_kb": payload_kb,
+            "submitted": f"{len(submit_times)}/{len(panes)}",
+            "submit_p50_ms": round(statistics.median(submit_times), 2) if submit_times else None,
+            "submit_max_ms": max(submit_times) if submit_times else None,
+            "panes": panes,
+        })
+
+    # Per-site percentiles from the same store the ⏱ Latency dashboard reads.
+    result["latency"] = window.latency.summary()
+
+    # -------------------- layout switching --------------------
+
+    layouts = {}
+    for style in ("vertical", "grid", "horizontal"):
+        samples = []
+        for _ in range(args.layout_repeats):
+            t = time.perf_counter()
+            window._rebuild_layout(style)
+            app.processEvents()
+            samples.append(time.perf_counter() - t)
+            window._rebuild_layout("horizontal" if style != "horizontal" else "vertical")
+            app.processEvents()
+        layouts[style] = {"p50_ms": ms(statistics.median(samples)), "max_ms": ms(max(samples))}
+    result["layout_switch"] = layouts
+
+    # -------------------- memory --------------------
+
+    result["memory"] = {
+        "renderers_mb": round(window.hibernator.total_memory() / (1024 * 1024), 1),
+        "browser_process_mb": round(freesta.process_rss_bytes(os.getpid()) / (1024 * 1024), 1),
+        "per_pane_mb": {
+            sites[i]["name"]: round(window.hibernator.pane_memory(v) / (1024 * 1024), 1)
+            for i, v in enumerate(window.views)
+        },
+    }
+
+    # Whole app: browser process plus every Chromium child (GPU, utility, renderers).
+    footprint = freesta.engine_footprint()
+    result["footprint"] = {
+        "processes": footprint["processes"],
+        "rss_mb": round(footprint["rss_bytes"] / (1024 * 1024), 1),
+        "cpu_seconds": round(footprint["cpu_seconds"] - footprint_started["cpu_seconds"], 2),
+        "cpu_percent": round(
+            (footprint["cpu_seconds"] - footprint_started["cpu_seconds"])
+            / (time.perf_counter() - run_started) * 100, 1
+        ),
+    }
+
+    window.close()
+    del window
+    for server in servers:
+        server.shutdown()
+    return result
+
+
+# ------------------------------ comparison ------------------------------
+
+def flatten(data, prefix="") -> dict:
+    flat = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            flat.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, list):
+        for i, value in enumerate(data):
+            flat.update(flatten(value, f"{prefix}{i}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        flat[prefix.rstrip(".")] = data
+    return flat
+
+
+def print_comparison(previous: dict, current: dict):
+    before, after = flatten(previous), flatten(current)
+    print(f"{'metric':60} {'before':>10} {'after':>10} {'change':>8}", file=sys.stderr)
+    for key in sorted(after):
+        if key.startswith("meta.") or key not in before:
+            continue
+        old, new = before[key], after[key]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else ""
+        print(f"{key:60} {old:>10} {new:>10} {change:>8}", file=sys.stderr)
+
+
+# ------------------------------- main -------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Ai Freesta benchmark")
+    parser.add_argument("--panes", type=int, default=0,
+                        help="number of panes (AI_SITES repeated as needed; default: one per site)")
+    parser.add_argument("--rounds", type=int, default=2,
+                        help="broadcast rounds; later rounds use the learned dispatch timings")
+    parser.add_argument("--payload-kb", type=int, nargs="*", default=[],
+                        help="extra broadcast rounds with prompts of these sizes, e.g. 1 64 256")
+    parser.add_argument("--layout-repeats", type=int, default=5)
+    parser.add_argument("--first-token-ms", type=int, default=300)
+    parser.add_argument("--token-ms", type=int, default=20)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds per wait")
+    parser.add_argument("--no-sandbox", action="store_true",
+                        help="disable the Chromium sandbox (needed when running as root)")
+    parser.add_argument("--chromium-preset", help="one of freesta.CHROMIUM_PRESETS (default: balanced)")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument("--compare", help="previous JSON result to print deltas against")
+    args = parser.parse_args()
+
+    if args.no_sandbox:
+        os.environ["QTWEBENGINE_DISABLE_SANDBOX"] = "1"
+
+    with tempfile.TemporaryDirectory(prefix="aifreesta-bench-") as root:
+        isolate_environment(root)
+        result = run(args)
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(json.load(f), result)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,32 @@
 import sys
 import os
-from PySide6.QtCore import QUrl, Qt, QSettings, QTimer
+import re
+import html
+import hmac
+import json
+import math
+import time
+from urllib.parse import parse_qs, unquote
+
+# Reference point for the time-to-interactive shown at startup.
+PROCESS_STARTED = time.perf_counter()
+
+from PySide6.QtCore import (
+    QUrl,
+    Qt,
+    QSettings,
+    QTimer,
+    QObject,
+    Signal,
+    Slot,
+    QFile,
+    QIODevice,
+    QAbstractListModel,
+    QModelIndex,
+    QEvent,
+    QPoint,
+    QRect,
+)
 from PySide6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -18,10 +44,28 @@ from PySide6.QtWidgets import (
     QCompleter,
     QComboBox,
     QFrame,
+    QPushButton,
+    QDockWidget,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QFileDialog,
+    QSpinBox,
+    QPlainTextEdit,
+    QDialog,
+    QDialogButtonBox,
+    QListWidget,
+    QListWidgetItem,
+    QMenu,
+    QToolButton,
 )
-from PySide6.QtGui import QAction, QKeyEvent, QIcon, QKeySequence, QShortcut
+from PySide6.QtGui import QAction, QFontDatabase, QKeyEvent, QIcon, QKeySequence, QShortcut, QTextCursor
 from PySide6.QtWebEngineWidgets import QWebEngineView
-from PySide6.QtWebEngineCore import QWebEnginePage
+from PySide6.QtWebEngineCore import (
+    QWebEnginePage, QWebEngineProfile, QWebEngineScript,
+    QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo,
+)
+from PySide6.QtWebChannel import QWebChannel
 
 
 # ------------------------------- config -------------------------------
@@ -33,7 +77,8 @@ AI_SITES = [
         "mobile": True,
         "input_selector": "textarea#prompt-textarea, textarea, [contenteditable='true']",
         "send_selector": "button[data-testid='send-button'], button[type='submit']",
-        "delay_ms": 200,
+        "response_selector": "[data-message-author-role='assistant']",
+        "stop_selector": "button[data-testid='stop-button']",
     },
     {
         "name": "Grok",
@@ -41,7 +86,8 @@ AI_SITES = [
         "mobile": False,
         "input_selector": "textarea, [contenteditable='true']",
         "send_selector": "button[type='submit'], button[aria-label*='send' i]",
-        "delay_ms": 200,
+        "response_selector": ".message-bubble, .response-content-markdown",
+        "stop_selector": "button[aria-label*='Stop' i]",
     },
     {
         "name": "Gemini",
@@ -49,7 +95,8 @@ AI_SITES = [
         "mobile": False,
         "input_selector": "div.ql-editor[contenteditable='true'], textarea[aria-label*='Prompt'], textarea[placeholder*='Message Gemini']",
         "send_selector": "button[aria-label*='Send'], button[data-test-id='send-button']",
-        "delay_ms": 200,
+        "response_selector": "message-content, .model-response-text",
+        "stop_selector": "button[aria-label*='Stop' i]",
     },
     {
         "name": "Z.AI",
@@ -57,7 +104,8 @@ AI_SITES = [
         "mobile": False,
         "input_selector": "textarea, [contenteditable='true'], input[type='text']",
         "send_selector": "button[type='submit'], button[aria-label*='send' i]",
-        "delay_ms": 100,
+        "response_selector": ".chat-assistant, .markdown-prose",
+        "stop_selector": "button[aria-label*='Stop' i]",
     },
     {
         "name": "Perplexity Ai",
@@ -65,7 +113,8 @@ AI_SITES = [
         "mobile": False,
         "input_selector": "textarea, [contenteditable='true'], input[type='text']",
         "send_selector": "button[type='submit'], button[aria-label*='send' i]",
-        "delay_ms": 200,
+        "response_selector": ".prose",
+        "stop_selector": "button[aria-label*='Stop' i]",
     },
 ]
 
@@ -82,7 +131,181 @@ MOBILE_UA = (
 )
 
 MIN_PANE_WIDTH = 400
-MAX_HISTORY = 100
+HISTORY_PAGE_SIZE = 50
+
+# Conversation archive (~/.aifreesta_archive.db): every prompt and each
+# pane's final answer, zlib-compressed, full-text indexed. A background
+# thread writes whatever arrived within ARCHIVE_BATCH_MS (at most
+# ARCHIVE_BATCH_MAX items) in one transaction. "archive_enabled" turns
+# recording off.
+ARCHIVE_BATCH_MS = 500
+ARCHIVE_BATCH_MAX = 500
+ARCHIVE_PAGE_SIZE = 100
+ARCHIVE_OPEN_RUNS = 10000   # runs still waiting for answers, oldest dropped
+
+# Per-site latency (QSettings "latency/<site>"): the last LATENCY_SAMPLES
+# sends to each site, kept across sessions for the ⏱ Latency dashboard.
+LATENCY_SAMPLES = 500
+LATENCY_HISTOGRAM_BINS = 16
+
+# Every site gets its own persistent QWebEngineProfile (cookies, cache, UA).
+# Sites can share one with a "profile" key and override the defaults below
+# with "cache_type" ("disk" | "memory" | "none"), "cache_mb" and "cookies"
+# ("allow" | "force" | "session"). The defaults are also read from
+# QSettings ("http_cache_type", "http_cache_mb", "cookies_policy").
+HTTP_CACHE_TYPE = "disk"
+HTTP_CACHE_MB = 256
+COOKIES_POLICY = "allow"
+
+# Total renderer memory allowed before least-recently-used panes are
+# frozen and then discarded. 0 disables hibernation. Overridable from the
+# toolbar (stored in QSettings as "memory_budget_mb").
+MEMORY_BUDGET_MB = 3072
+HIBERNATE_CHECK_MS = 10000
+
+# Panes scrolled out of the pane area are hidden from Chromium (timers
+# slowed to 1 Hz, no painting) and frozen after VIEWPORT_FREEZE_MS (0 never
+# freezes). Panes within VIEWPORT_MARGIN_PX of the edge count as visible
+# so they are already running when scrolled in. "viewport_throttling"
+# turns this off.
+VIEWPORT_MARGIN_PX = MIN_PANE_WIDTH // 2
+VIEWPORT_FREEZE_MS = 60000
+VIEWPORT_CHECK_MS = 100
+
+# Typing mirror: "live" mirrors the draft into every pane while typing
+# (coalesced to one push per frame); "submit" leaves the panes' inputs
+# alone until Enter broadcasts the prompt. A saved "off" from earlier
+# versions reads as "submit", which is what it did.
+MIRROR_MODES = ("submit", "live")
+MIRROR_FRAME_MS = 16
+
+# Response capture: used for sites added at runtime and sites without their
+# own selectors. A response is complete once the stop button is gone and the
+# DOM has been quiet for RESPONSE_QUIET_MS.
+DEFAULT_RESPONSE_SELECTOR = (
+    "[data-message-author-role='assistant'], .markdown, .prose, [class*='response' i]"
+)
+DEFAULT_STOP_SELECTOR = "button[aria-label*='Stop' i], button[data-testid='stop-button']"
+RESPONSE_QUIET_MS = 2000
+RESPONSE_TIMEOUT_MS = 300000
+
+# Broadcast dispatch waits for the page instead of fixed delays: each step
+# is retried with exponential backoff starting at DISPATCH_RETRY_MS.
+DISPATCH_RETRY_MS = 40
+DISPATCH_MAX_RETRIES = 8
+
+# Prompts longer than PAYLOAD_INLINE_CHARS are not put into the page
+# scripts. They are held once in PayloadStore and each pane pulls them over
+# its web channel in PAYLOAD_CHUNK_CHARS pieces. Drafts that long are not
+# mirrored while typing.
+PAYLOAD_INLINE_CHARS = 4096
+PAYLOAD_CHUNK_CHARS = 64 * 1024
+
+# Metrics dock: sampling interval while the dock is open or auto-export is
+# on, and the default auto-export interval ("metrics_export_interval_s").
+METRICS_SAMPLE_MS = 2000
+METRICS_EXPORT_INTERVAL_S = 60
+
+# Startup: the window is shown first and panes load in the background, at
+# most STARTUP_CONCURRENCY at a time ("startup_concurrency"). A pane that
+# has not finished after STARTUP_LOAD_TIMEOUT_MS frees its slot anyway.
+STARTUP_CONCURRENCY = 2
+STARTUP_LOAD_TIMEOUT_MS = 15000
+
+# Standby views: up to STANDBY_POOL_SIZE hidden, already loaded pages
+# ("standby_pool_size", 0 turns it off). One is a blank page for ➕ Add AI,
+# the rest are fresh chats for the most used sites so 🗑️ Clear can swap them
+# in. Warming starts STANDBY_WARM_DELAY_MS after startup or after one is
+# used, never over the memory budget; standbys unused for STANDBY_IDLE_MS
+# are dropped and only rewarmed once the app is used again. Panes added
+# with ➕ share the ADDED_PANES_PROFILE profile, the blank standby's.
+STANDBY_POOL_SIZE = 3
+STANDBY_WARM_DELAY_MS = 3000
+STANDBY_IDLE_MS = 15 * 60 * 1000
+ADDED_PANES_PROFILE = "added"
+
+# Chromium presets, applied through QTWEBENGINE_CHROMIUM_FLAGS before the
+# QApplication exists. Chosen with --chromium-preset or from the toolbar
+# ("chromium_preset", takes effect on restart). Flags already in the
+# environment are kept and win over the preset's.
+CHROMIUM_PRESETS = {
+    "default": [],
+    # Panes share at most two renderers; no GPU process, software compositing.
+    "low-memory": [
+        "--renderer-process-limit=2", "--process-per-site",
+        "--disable-gpu", "--disable-gpu-compositing",
+    ],
+    "balanced": ["--renderer-process-limit=4", "--process-per-site"],
+    # One renderer per site, and hidden panes keep running at full speed.
+    "max-isolation": [
+        "--site-per-process",
+        "--disable-background-timer-throttling", "--disable-renderer-backgrounding",
+    ],
+}
+CHROMIUM_PRESET = "balanced"
+FOOTPRINT_SAMPLE_MS = 30000
+
+# Stall watchdog ("stall_watchdog" turns it off): a heartbeat runs every
+# WATCHDOG_HEARTBEAT_MS on the GUI thread; when it is more than
+# WATCHDOG_STALL_MS late ("stall_threshold_ms"), a helper thread samples the
+# GUI thread's Python stack every WATCHDOG_SAMPLE_MS and the stall is logged
+# to ~/.aifreesta_stalls.jsonl. Profiling sessions (Ctrl+Shift+P, --profile)
+# go to ~/.aifreesta_profiles/<time>/. Chromium traces need the DevTools
+# endpoint, opened on PROFILER_DEVTOOLS_PORT only when run with --profile.
+WATCHDOG_HEARTBEAT_MS = 100
+WATCHDOG_STALL_MS = 250
+WATCHDOG_SAMPLE_MS = 20
+WATCHDOG_LOG_MAX_BYTES = 1024 * 1024
+PROFILER_DEVTOOLS_PORT = 9333
+PROFILER_TRACE_CATEGORIES = [
+    "toplevel", "blink", "cc", "gpu", "v8", "loading", "devtools.timeline", "disabled-by-default-devtools.timeline",
+]
+
+# Request blocking ("request_blocking" toggles it). Rules are merged from
+# BLOCKLIST, ~/.aifreesta_blocklist.txt (one domain or /path pattern per
+# line, hosts-file lines work too) and a site's own "block" entry with the
+# same keys. Domains also match their subdomains, paths may use *, and
+# resource types only apply to third-party requests. Top-level page loads
+# are never blocked.
+BLOCKLIST = {
+    "domains": [
+        "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+        "googlesyndication.com", "segment.io", "segment.com", "mixpanel.com",
+        "amplitude.com", "hotjar.com", "fullstory.com", "clarity.ms",
+        "browser-intake-datadoghq.com", "sentry.io", "facebook.net",
+        "connect.facebook.net", "ads-twitter.com", "analytics.tiktok.com",
+    ],
+    "paths": ["/cdn-cgi/rum*", "*/gtag/js*", "*/analytics.js"],
+    "types": ["media", "ping", "csp_report"],
+}
+# Rough transfer size of a blocked request per resource type, for the
+# "saved" counter (the real size is unknown once a request is blocked).
+BLOCKED_BYTES_ESTIMATE = {
+    "script": 60 * 1024, "stylesheet": 20 * 1024, "image": 25 * 1024,
+    "font": 40 * 1024, "media": 512 * 1024, "xhr": 2 * 1024, "ping": 512,
+}
+
+# Pane workers: with --pane-workers N ("pane_workers") the panes are split
+# into N groups, each hosted in its own process and window. The main window
+# keeps the input bar and toolbar and drives the workers over a local socket.
+WORKER_CONNECT_TIMEOUT_MS = 5000
+WORKER_SHUTDOWN_MS = 3000
+
+# Control API: opt-in localhost HTTP/WebSocket server (--control-port or
+# "control_port", 0 = off). Requests need the token from
+# ~/.aifreesta_control.json. /batch answers 429 once more than
+# CONTROL_MAX_PENDING sends are queued, and a WebSocket client that falls
+# CONTROL_WS_BACKLOG events behind is disconnected.
+CONTROL_PORT = 0
+CONTROL_MAX_BODY = 4 * 1024 * 1024
+CONTROL_MAX_PENDING = 5000
+CONTROL_WS_BACKLOG = 256
+CONTROL_CALL_TIMEOUT_S = 10
+
+# Session snapshot (~/.aifreesta_session.json): written on exit and every
+# SESSION_SAVE_MS, restored on the next start.
+SESSION_VERSION = 1
+SESSION_SAVE_MS = 60000
 
 DARK_STYLESHEET = """
 QMainWindow {
@@ -208,72 +431,3632 @@ QComboBox QAbstractItemView {
     selection-background-color: #007acc;
 }
 
+QDockWidget {
+    color: #ffffff;
+}
+
+QTableWidget {
+    background-color: #1e1e1e;
+    color: #ffffff;
+    gridline-color: #3e3e42;
+    border: none;
+}
+
+QHeaderView::section {
+    background-color: #2d2d30;
+    color: #cccccc;
+    border: none;
+    border-right: 1px solid #3e3e42;
+    padding: 4px;
+}
+
 QFrame#pane_label_bar {
     background-color: #252526;
     border-bottom: 1px solid #3e3e42;
 }
+
+QPushButton#pane_placeholder {
+    background-color: #1e1e1e;
+    color: #888888;
+    border: none;
+    font-size: 14px;
+}
+
+QPushButton#pane_placeholder:hover {
+    background-color: #252526;
+    color: #ffffff;
+}
 """
 
 
 # ---------------------------- web helpers ----------------------------
 
-def make_view(url: str, *, mobile: bool) -> QWebEngineView:
+HTTP_CACHE_TYPES = {
+    "disk": QWebEngineProfile.HttpCacheType.DiskHttpCache,
+    "memory": QWebEngineProfile.HttpCacheType.MemoryHttpCache,
+    "none": QWebEngineProfile.HttpCacheType.NoCache,
+}
+
+COOKIES_POLICIES = {
+    "allow": QWebEngineProfile.PersistentCookiesPolicy.AllowPersistentCookies,
+    "force": QWebEngineProfile.PersistentCookiesPolicy.ForcePersistentCookies,
+    "session": QWebEngineProfile.PersistentCookiesPolicy.NoPersistentCookies,
+}
+
+_profiles = {}
+
+
+def site_profile(site: dict) -> QWebEngineProfile:
+    """Persistent profile for a site, shared by sites with the same
+    "profile" key. Mobile and desktop variants never share a profile since
+    the user agent is a profile-wide setting."""
+    group = site.get("profile") or site["name"]
+    storage_name = re.sub(r"[^A-Za-z0-9_-]+", "_", group).strip("_") or "default"
+    if site.get("mobile"):
+        storage_name += "-mobile"
+
+    profile = _profiles.get(storage_name)
+    if profile is not None:
+        return profile
+
+    settings = QSettings("Ai Freesta", "Ai Freesta")
+    cache_type = site.get("cache_type") or settings.value("http_cache_type", HTTP_CACHE_TYPE)
+    cache_mb = site.get("cache_mb") or settings.value("http_cache_mb", HTTP_CACHE_MB, type=int)
+    cookies = site.get("cookies") or settings.value("cookies_policy", COOKIES_POLICY)
+
+    # Parented to the application so profiles outlive every page using them.
+    profile = QWebEngineProfile(storage_name, QApplication.instance())
+    profile.setHttpUserAgent(MOBILE_UA if site.get("mobile") else DESKTOP_UA)
+    profile.setHttpCacheType(HTTP_CACHE_TYPES.get(cache_type, HTTP_CACHE_TYPES[HTTP_CACHE_TYPE]))
+    profile.setHttpCacheMaximumSize(int(cache_mb) * 1024 * 1024)
+    profile.setPersistentCookiesPolicy(COOKIES_POLICIES.get(cookies, COOKIES_POLICIES[COOKIES_POLICY]))
+    _profiles[storage_name] = profile
+    return profile
+
+
+def make_view(site: dict, load: bool = True) -> QWebEngineView:
     view = QWebEngineView()
-    profile = view.page().profile()
-    profile.setHttpUserAgent(MOBILE_UA if mobile else DESKTOP_UA)
-    view.setUrl(QUrl(url))
+    view.setPage(QWebEnginePage(site_profile(site), view))
+    install_runtime(view.page())
+    if load:
+        view.setUrl(QUrl(site["url"]))
     view.setMinimumWidth(MIN_PANE_WIDTH)
     return view
 
 
-def js_fill_and_send(text: str, input_sel: str, send_sel: str, delay_ms: int) -> str:
-    return f"""
-setTimeout(() => {{
-  const text = {text!r};
-  const inputSel = {input_sel!r};
-  const sendSel  = {send_sel!r};
-
-  const el = document.querySelector(inputSel);
-  if (!el) {{ console.warn('[AiFreesta] Input not found:', inputSel); return; }}
-  if (el.disabled) {{ console.warn('[AiFreesta] Input is disabled'); return; }}
-
-  el.focus();
-  const isContentEditable = el.isContentEditable || el.getAttribute("contenteditable") === "true";
-  if (isContentEditable) {{
-    el.innerText = text;
-    if (el.classList.contains('ql-editor')) el.innerHTML = '<p>' + text + '</p>';
-  }} else {{
-    el.value = text;
-  }}
-
-  el.dispatchEvent(new Event("input",  {{ bubbles: true }}));
-  el.dispatchEvent(new Event("change", {{ bubbles: true }}));
-  el.dispatchEvent(new InputEvent("input", {{ bubbles: true, inputType: 'insertText', data: text }}));
-
-  setTimeout(() => {{
-    const btn = document.querySelector(sendSel);
-    if (btn && !btn.disabled) {{ btn.click(); return; }}
-    const evDown  = new KeyboardEvent("keydown",  {{ key: "Enter", code: "Enter", keyCode: 13, which: 13, bubbles: true }});
-    const evPress = new KeyboardEvent("keypress", {{ key: "Enter", code: "Enter", keyCode: 13, which: 13, bubbles: true }});
-    const evUp    = new KeyboardEvent("keyup",    {{ key: "Enter", code: "Enter", keyCode: 13, which: 13, bubbles: true }});
-    el.dispatchEvent(evDown); el.dispatchEvent(evPress); el.dispatchEvent(evUp);
-  }}, 100);
-}}, {delay_ms});
+# Installed once per page at DocumentReady in an isolated world, so page
+# scripts can neither see nor clobber it. Python talks to it through small
+# AiFreesta.<method>(json...) calls, see run_runtime().
+AIFREESTA_RUNTIME = r"""
+(() => {
+  if (window.AiFreesta) return;
+
+  const ENTER = { key: "Enter", code: "Enter", keyCode: 13, which: 13, bubbles: true };
+  const CLEAR_SELECTORS = [
+    'button[aria-label*="New chat" i]', 'button[aria-label*="Clear" i]',
+    'a[aria-label*="New chat" i]', '[data-testid*="new-chat"]',
+  ];
+
+  // Selector lists are tried one selector at a time, in config order. The
+  // winner and its element are cached per list and reused until the
+  // element detaches or the page navigates (including SPA route changes).
+  const splitCache = new Map();
+  const resolved = new Map();
+  let resolvedHref = location.href;
+  let hits = {};
+
+  function splitSelectors(list) {
+    let parts = splitCache.get(list);
+    if (parts) return parts;
+    parts = [];
+    let depth = 0, quote = null, start = 0;
+    for (let i = 0; i < list.length; i++) {
+      const c = list[i];
+      if (quote) { if (c === quote) quote = null; continue; }
+      if (c === '"' || c === "'") quote = c;
+      else if (c === "[" || c === "(") depth++;
+      else if (c === "]" || c === ")") depth--;
+      else if (c === "," && depth === 0) { parts.push(list.slice(start, i).trim()); start = i + 1; }
+    }
+    parts.push(list.slice(start).trim());
+    parts = parts.filter(Boolean);
+    splitCache.set(list, parts);
+    return parts;
+  }
+
+  function invalidate() {
+    resolved.clear();
+    resolvedHref = location.href;
+  }
+  if (window.navigation) window.navigation.addEventListener("navigatesuccess", invalidate);
+  window.addEventListener("popstate", invalidate);
+
+  function recordHit(list, sel) {
+    const perList = hits[list] || (hits[list] = {});
+    perList[sel] = (perList[sel] || 0) + 1;
+  }
+
+  function resolve(list, track = true) {
+    if (!list) return null;
+    if (location.href !== resolvedHref) invalidate();
+    const cached = resolved.get(list);
+    if (cached) {
+      let el = cached.el.isConnected ? cached.el : document.querySelector(cached.sel);
+      if (el) {
+        cached.el = el;
+        if (track) recordHit(list, cached.sel);
+        return el;
+      }
+      resolved.delete(list);
+    }
+    for (const sel of splitSelectors(list)) {
+      let el = null;
+      try { el = document.querySelector(sel); } catch (e) { continue; }
+      if (el) {
+        resolved.set(list, { sel, el });
+        if (track) recordHit(list, sel);
+        return el;
+      }
+    }
+    return null;
+  }
+
+  const isEditable = (el) =>
+    el.isContentEditable || el.getAttribute("contenteditable") === "true";
+
+  // Rich editors (ProseMirror, Quill, Lexical, ...) all handle a paste
+  // natively, keeping newlines and their own document model, in one step
+  // whatever the size. execCommand is the next best thing; rebuilding the
+  // DOM by hand is the last resort.
+  function insertText(el, text) {
+    if (!isEditable(el)) { setText(el, text); return; }
+    el.focus();
+    const range = document.createRange();
+    range.selectNodeContents(el);
+    const selection = window.getSelection();
+    selection.removeAllRanges();
+    selection.addRange(range);
+    if (!text) {
+      if (!document.execCommand("delete")) setText(el, text);
+      return;
+    }
+    const data = new DataTransfer();
+    data.setData("text/plain", text);
+    const paste = new ClipboardEvent("paste", { clipboardData: data, bubbles: true, cancelable: true });
+    if (!el.dispatchEvent(paste)) return;   // the editor took it
+    if (!document.execCommand("insertText", false, text)) setText(el, text);
+  }
+
+  function setText(el, text) {
+    if (isEditable(el)) {
+      if (el.classList.contains("ql-editor")) {
+        // Quill keeps one <p> per line; build them as text nodes, never HTML.
+        el.replaceChildren(...text.split("\n").map((line) => {
+          const p = document.createElement("p");
+          if (line) p.textContent = line; else p.appendChild(document.createElement("br"));
+          return p;
+        }));
+      } else {
+        el.innerText = text;
+      }
+    } else {
+      // Go through the native setter so React-controlled inputs see the change.
+      const desc = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(el), "value");
+      if (desc && desc.set) desc.set.call(el, text); else el.value = text;
+    }
+    el.dispatchEvent(new Event("input", { bubbles: true }));
+  }
+
+  function pressEnter(el) {
+    for (const type of ["keydown", "keypress", "keyup"]) {
+      el.dispatchEvent(new KeyboardEvent(type, ENTER));
+    }
+  }
+
+  // Bridge back to Python (ResponseCapture) and the shared PayloadStore,
+  // if the page has a web channel.
+  let bridge = null, payloadStore = null;
+  if (typeof QWebChannel !== "undefined" && window.qt && qt.webChannelTransport) {
+    new QWebChannel(qt.webChannelTransport, (channel) => {
+      bridge = channel.objects.bridge;
+      payloadStore = channel.objects.payloads;
+    });
+  }
+
+  // Large prompts are pulled from Python in chunks, all requested at once,
+  // and handed to fill() once complete. fill() says "payload-pending" until
+  // then, which the dispatcher retries like any other not-ready state.
+  const payloads = new Map();
+
+  function payloadText(p) {
+    let entry = payloads.get(p.id);
+    if (!entry) {
+      if (!payloadStore) return { status: "payload-pending" };
+      entry = { parts: new Array(p.chunks), missing: p.chunks, text: null, failed: false };
+      payloads.set(p.id, entry);
+      for (let i = 0; i < p.chunks; i++) {
+        payloadStore.chunk(p.id, i, (part) => {
+          if (!part) { entry.failed = true; return; }
+          entry.parts[i] = part;
+          if (--entry.missing === 0) { entry.text = entry.parts.join(""); entry.parts = null; }
+        });
+      }
+    }
+    if (entry.failed) { payloads.delete(p.id); return { status: "payload-error" }; }
+    if (entry.text === null) return { status: "payload-pending" };
+    return { text: entry.text };
+  }
+
+  let capture = null;
+
+  function lastResponse(sel) {
+    const nodes = document.querySelectorAll(sel);
+    return { count: nodes.length, node: nodes.length ? nodes[nodes.length - 1] : null };
+  }
+
+  function startCapture(req) {
+    if (capture) capture.stop();
+    const base = lastResponse(req.response);
+    const baseText = base.node ? base.node.innerText : "";
+    const started = Date.now();
+    let lastMutation = started, text = "", sent = "", sawStop = false, flushTimer = null;
+
+    const current = () => {
+      const now = lastResponse(req.response);
+      if (!now.node) return "";
+      if (now.count > base.count) return now.node.innerText;
+      if (now.node === base.node && now.node.innerText !== baseText) return now.node.innerText;
+      return "";
+    };
+
+    // Stream only what changed since the last chunk: (offset, text) where
+    // offset is where the new text starts in the full response.
+    const flush = () => {
+      flushTimer = null;
+      text = current();
+      if (!text || text === sent || !bridge) return;
+      const offset = text.startsWith(sent) ? sent.length : 0;
+      bridge.chunk(req.id, offset, text.slice(offset));
+      sent = text;
+    };
+
+    const observer = new MutationObserver(() => {
+      lastMutation = Date.now();
+      if (!flushTimer) flushTimer = setTimeout(flush, 100);
+    });
+    observer.observe(document.body, { childList: true, subtree: true, characterData: true });
+
+    const finish = (reason) => {
+      stop();
+      flush();
+      if (bridge) bridge.done(req.id, text, reason);
+    };
+
+    const poll = setInterval(() => {
+      const now = Date.now();
+      const stopVisible = !!resolve(req.stop, false);
+      sawStop = sawStop || stopVisible;
+      if (now - started > req.timeout) { finish("timeout"); return; }
+      if (!text || stopVisible) return;
+      const quietFor = now - lastMutation;
+      if (sawStop && quietFor >= 300) finish("stop-button");
+      else if (quietFor >= req.quiet) finish("quiet");
+    }, 250);
+
+    const stop = () => {
+      observer.disconnect();
+      clearInterval(poll);
+      if (flushTimer) clearTimeout(flushTimer);
+      if (capture && capture.id === req.id) capture = null;
+    };
+    capture = { id: req.id, stop };
+  }
+
+  window.AiFreesta = {
+    version: 1,
+
+    setDraft(inputSel, text) {
+      const el = resolve(inputSel, false);
+      if (!el || el.disabled) return false;
+      insertText(el, text);
+      return true;
+    },
+
+    // Dispatch is two acknowledged steps driven from Python
+    // (BroadcastDispatcher): fill() once the input is ready, then submit()
+    // once the send button is enabled. Each returns a status string.
+    fill(req) {
+      const el = resolve(req.input);
+      if (!el) return "no-input";
+      if (el.disabled || el.getAttribute("aria-disabled") === "true") return "input-disabled";
+      let text = req.text;
+      if (req.payload) {
+        const got = payloadText(req.payload);
+        if (got.status) return got.status;
+        text = got.text;
+      }
+      if (req.capture) startCapture(req.capture);
+
+      el.focus();
+      insertText(el, text);
+      el.dispatchEvent(new Event("change", { bubbles: true }));
+      if (req.payload) payloads.delete(req.payload.id);
+      return "filled";
+    },
+
+    submit(req) {
+      const btn = resolve(req.send);
+      if (btn && !btn.disabled && btn.getAttribute("aria-disabled") !== "true") {
+        btn.click();
+        return "clicked";
+      }
+      if (!req.force) return "send-disabled";
+      const el = resolve(req.input, false);
+      if (!el) return "no-input";
+      pressEnter(el);
+      return "enter";
+    },
+
+    heapSize() {
+      const m = performance.memory;
+      return m ? { used: m.usedJSHeapSize, total: m.totalJSHeapSize } : null;
+    },
+
+    // Winning selector counts since the last call, keyed by selector list.
+    takeSelectorHits() {
+      const taken = hits;
+      hits = {};
+      return taken;
+    },
+
+    clearChat() {
+      const btn = resolve(CLEAR_SELECTORS.join(", "), false);
+      if (btn) { btn.click(); return true; }
+      console.log("[AiFreesta] Clear attempted");
+      return false;
+    },
+  };
+})();
 """
 
+RUNTIME_MISSING = "__aifreesta_missing__"
 
-def js_clear_chat() -> str:
-    return """
-const clearSelectors = [
-    'button[aria-label*="New chat" i]', 'button[aria-label*="Clear" i]',
-    'a[aria-label*="New chat" i]', '[data-testid*="new-chat"]'
-];
-for (let sel of clearSelectors) {
-    const btn = document.querySelector(sel);
-    if (btn) { btn.click(); break; }
+_qwebchannel_js = None
+
+
+def qwebchannel_source() -> str:
+    global _qwebchannel_js
+    if _qwebchannel_js is None:
+        f = QFile(":/qtwebchannel/qwebchannel.js")
+        if f.open(QIODevice.ReadOnly):
+            _qwebchannel_js = bytes(f.readAll()).decode("utf-8")
+            f.close()
+        else:
+            _qwebchannel_js = ""
+    return _qwebchannel_js
+
+
+def install_runtime(page: QWebEnginePage):
+    scripts = page.scripts()
+    if scripts.find("AiFreesta"):
+        return
+
+    channel_js = QWebEngineScript()
+    channel_js.setName("AiFreesta-qwebchannel")
+    channel_js.setSourceCode(qwebchannel_source())
+    channel_js.setInjectionPoint(QWebEngineScript.DocumentCreation)
+    channel_js.setWorldId(QWebEngineScript.ApplicationWorld)
+    channel_js.setRunsOnSubFrames(False)
+    scripts.insert(channel_js)
+
+    script = QWebEngineScript()
+    script.setName("AiFreesta")
+    script.setSourceCode(AIFREESTA_RUNTIME)
+    script.setInjectionPoint(QWebEngineScript.DocumentReady)
+    script.setWorldId(QWebEngineScript.ApplicationWorld)
+    script.setRunsOnSubFrames(False)
+    scripts.insert(script)
+
+
+def run_runtime(page: QWebEnginePage, method: str, *args, callback=None):
+    """Call AiFreesta.<method>(*args) in the page's isolated world.
+
+    Arguments travel as JSON data, never as generated source. If the page
+    has no runtime yet (e.g. it was still loading when the call arrived),
+    the runtime is injected together with the call."""
+    call = f"AiFreesta.{method}({', '.join(json.dumps(a) for a in args)})"
+    guarded = f"(typeof AiFreesta === 'undefined') ? {json.dumps(RUNTIME_MISSING)} : {call}"
+
+    def on_result(result):
+        if result == RUNTIME_MISSING:
+            page.runJavaScript(AIFREESTA_RUNTIME + ";\n" + call,
+                               QWebEngineScript.ApplicationWorld, callback or (lambda _r: None))
+        elif callback:
+            callback(result)
+
+    page.runJavaScript(guarded, QWebEngineScript.ApplicationWorld, on_result)
+
+
+def process_rss_bytes(pid: int) -> int:
+    """Resident memory of a process in bytes, or 0 if it can't be read."""
+    if pid <= 0:
+        return 0
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil  # optional, used on non-Linux platforms
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        return 0
+
+
+def process_cpu_seconds(pid: int) -> float:
+    """User + system CPU time of a process in seconds, or 0.0."""
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        times = psutil.Process(pid).cpu_times()
+        return times.user + times.system
+    except Exception:
+        return 0.0
+
+
+def descendant_pids(pid: int) -> list:
+    """All child processes of pid, recursively (Chromium's renderers, GPU
+    and utility processes for this app)."""
+    children = {}
+    try:
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat", "r") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, ValueError, IndexError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    except OSError:
+        try:
+            import psutil
+            return [p.pid for p in psutil.Process(pid).children(recursive=True)]
+        except Exception:
+            return []
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def engine_footprint() -> dict:
+    """Memory and CPU time of this process plus every Chromium child."""
+    pids = [os.getpid()] + descendant_pids(os.getpid())
+    return {
+        "processes": len(pids),
+        "rss_bytes": sum(process_rss_bytes(pid) for pid in pids),
+        "cpu_seconds": sum(process_cpu_seconds(pid) for pid in pids),
+    }
+
+
+_chromium_preset = None
+
+
+def apply_chromium_preset(name: str = None) -> str:
+    """Put the preset's flags into QTWEBENGINE_CHROMIUM_FLAGS. Must run
+    before QApplication is created. Returns the preset actually used."""
+    global _chromium_preset
+    settings = QSettings("Ai Freesta", "Ai Freesta")
+    name = name or settings.value("chromium_preset", CHROMIUM_PRESET)
+    if name not in CHROMIUM_PRESETS:
+        name = CHROMIUM_PRESET
+    # The user's own flags, as first seen: pane workers inherit the
+    # environment with the preset already applied.
+    own = os.environ.setdefault("AIFREESTA_USER_CHROMIUM_FLAGS", os.environ.get("QTWEBENGINE_CHROMIUM_FLAGS", ""))
+    flags = CHROMIUM_PRESETS[name] + own.split()
+    if flags:
+        os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = " ".join(flags)
+    _chromium_preset = name
+    return name
+
+
+# ---------------------------- request blocking ----------------------------
+
+_RT = QWebEngineUrlRequestInfo.ResourceType
+RESOURCE_TYPES = {
+    "subframe": _RT.ResourceTypeSubFrame,
+    "stylesheet": _RT.ResourceTypeStylesheet,
+    "script": _RT.ResourceTypeScript,
+    "image": _RT.ResourceTypeImage,
+    "font": _RT.ResourceTypeFontResource,
+    "object": _RT.ResourceTypeObject,
+    "media": _RT.ResourceTypeMedia,
+    "worker": _RT.ResourceTypeWorker,
+    "prefetch": _RT.ResourceTypePrefetch,
+    "favicon": _RT.ResourceTypeFavicon,
+    "xhr": _RT.ResourceTypeXhr,
+    "ping": _RT.ResourceTypePing,
+    "csp_report": _RT.ResourceTypeCspReport,
 }
-console.log('[AiFreesta] Clear attempted');
-"""
+TYPE_NAMES = {value: name for name, value in RESOURCE_TYPES.items()}
+
+
+class Blocklist:
+    """Compiled blocking rules. Domains are a set probed once per label of
+    the host, paths one combined regex, so lookups stay cheap for lists
+    with tens of thousands of entries."""
+
+    def __init__(self, domains=(), paths=(), types=()):
+        self.domains = {d.strip().lower().lstrip(".") for d in domains if d.strip()}
+        self.path_patterns = [p for p in paths if p]
+        self.types = {RESOURCE_TYPES[t] for t in types if t in RESOURCE_TYPES}
+        # Each pattern has to match the whole path; "*" is the only wildcard.
+        self._paths = re.compile(
+            "|".join("(?:" + re.escape(p).replace(r"\*", ".*") + ")" for p in self.path_patterns)
+        ) if self.path_patterns else None
+
+    def merged(self, rules: dict) -> "Blocklist":
+        return Blocklist(
+            self.domains | set(rules.get("domains", [])),
+            self.path_patterns + list(rules.get("paths", [])),
+            [TYPE_NAMES[t] for t in self.types] + list(rules.get("types", [])),
+        )
+
+    def match(self, host: str, path: str, resource_type, third_party: bool) -> str:
+        """Name of the rule kind that blocks this request, or ''."""
+        if third_party and resource_type in self.types:
+            return "type"
+        labels = host.split(".")
+        for i in range(len(labels) - 1):
+            if ".".join(labels[i:]) in self.domains:
+                return "domain"
+        if self._paths is not None and self._paths.fullmatch(path):
+            return "path"
+        return ""
+
+
+def blocklist_path() -> str:
+    return os.path.join(os.path.expanduser("~"), ".aifreesta_blocklist.txt")
+
+
+_base_blocklist = None
+_site_blocklists = {}
+
+
+def site_blocklist(site: dict) -> Blocklist:
+    """BLOCKLIST + the user's blocklist file + the site's own rules, built
+    once per site."""
+    global _base_blocklist
+    if _base_blocklist is None:
+        domains, paths = list(BLOCKLIST["domains"]), list(BLOCKLIST["paths"])
+        try:
+            with open(blocklist_path(), "r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    line = line.split("#", 1)[0].strip()
+                    if not line:
+                        continue
+                    entry = line.split()[-1]   # "0.0.0.0 tracker.example" -> host
+                    (paths if "/" in entry or "*" in entry else domains).append(entry)
+        except OSError:
+            pass
+        _base_blocklist = Blocklist(domains, paths, BLOCKLIST["types"])
+    if site["name"] not in _site_blocklists:
+        _site_blocklists[site["name"]] = _base_blocklist.merged(site.get("block", {}))
+    return _site_blocklists[site["name"]]
+
+
+# Second-level labels under which country-code TLDs register names:
+# "bbc.co.uk" is one party, not everything under "co.uk".
+_PUBLIC_SECOND_LEVEL = {"ac", "co", "com", "edu", "go", "gov", "ne", "net", "or", "org"}
+
+
+def registrable_domain(host: str) -> str:
+    """The domain a host is registered under: "chat.z.ai" -> "z.ai",
+    "chat.example.co.uk" -> "example.co.uk"."""
+    labels = host.lower().rstrip(".").split(".")
+    if labels[-1].isdigit() or len(labels) < 3:
+        return ".".join(labels)   # IP address, or already registrable
+    if len(labels[-1]) == 2 and labels[-2] in _PUBLIC_SECOND_LEVEL:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+class RequestBlocker(QWebEngineUrlRequestInterceptor):
+    """Per-page interceptor that drops tracker, telemetry and heavy
+    third-party requests and counts what it dropped."""
+
+    def __init__(self, site: dict, parent=None):
+        super().__init__(parent)
+        self.rules = site_blocklist(site)
+        # Requests anywhere under the pane's registrable domain are first-party.
+        self.first_party = registrable_domain(QUrl(site["url"]).host())
+        self.enabled = QSettings("Ai Freesta", "Ai Freesta").value("request_blocking", True, type=bool)
+        self.blocked = 0
+        self.saved_bytes = 0
+        self.by_kind = {}
+
+    def interceptRequest(self, info: QWebEngineUrlRequestInfo):
+        resource_type = info.resourceType()
+        if not self.enabled or resource_type == _RT.ResourceTypeMainFrame:
+            return
+        url = info.requestUrl()
+        host = url.host().lower()
+        third_party = host != self.first_party and not host.endswith("." + self.first_party)
+        kind = self.rules.match(host, url.path(), resource_type, third_party)
+        if kind:
+            info.block(True)
+            self.blocked += 1
+            self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+            self.saved_bytes += BLOCKED_BYTES_ESTIMATE.get(TYPE_NAMES.get(resource_type), 1024)
+
+
+def install_blocker(page: QWebEnginePage, site: dict) -> RequestBlocker:
+    blocker = RequestBlocker(site, page)
+    page.setUrlRequestInterceptor(blocker)
+    return blocker
+
+
+# ---------------------------- prompt history ----------------------------
+
+def fts_query(query: str) -> str:
+    """FTS5 MATCH expression that needs every word of `query` as a word
+    prefix ('' if there are no words)."""
+    return " ".join('"%s"*' % w for w in re.findall(r"\w+", query))
+
+
+def _like_pattern(text: str) -> str:
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class PromptHistory:
+    """Append-only prompt log in SQLite with an FTS5 index.
+
+    Every broadcast is one row (timestamp, text, target panes). Navigation
+    walks the primary key and search goes through the full-text index, so
+    both stay fast no matter how long the history grows."""
+
+    def __init__(self, path: str, legacy_path: str = None):
+        # Opened on first use so startup never waits on the database.
+        self.path = path
+        self.legacy_path = legacy_path
+        self.fts = False
+        self.trigram = False
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._open()
+        return self._db
+
+    def _open(self):
+        import sqlite3   # deferred: not needed until the first history access
+
+        self._db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS prompts ("
+            " id INTEGER PRIMARY KEY, ts REAL NOT NULL, text TEXT NOT NULL,"
+            " targets TEXT NOT NULL DEFAULT '[]')"
+        )
+        try:
+            new = not self._has_table("prompts_fts")
+            self.db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS prompts_fts"
+                " USING fts5(text, content='prompts', content_rowid='id', prefix='2 3')"
+            )
+            self.db.execute(
+                "CREATE TRIGGER IF NOT EXISTS prompts_ai AFTER INSERT ON prompts BEGIN"
+                " INSERT INTO prompts_fts(rowid, text) VALUES (new.id, new.text); END"
+            )
+            if new:
+                # Index what was stored before the index existed; runs once.
+                self.db.execute("INSERT INTO prompts_fts(prompts_fts) VALUES ('rebuild')")
+            self.fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: fall back to LIKE scans.
+            self.fts = False
+        if self.fts:
+            try:
+                self._open_trigram()
+            except sqlite3.OperationalError:
+                # The trigram tokenizer needs SQLite 3.34+; prefix search only.
+                self.trigram = False
+        self.db.commit()
+
+        if self.legacy_path and os.path.exists(self.legacy_path) and not self.count():
+            self._import_legacy(self.legacy_path)
+
+    def _open_trigram(self):
+        """Second index over trigrams, so words are also found in the
+        middle of a word without scanning the table."""
+        new = not self._has_table("prompts_tri")
+        self.db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS prompts_tri"
+            " USING fts5(text, content='prompts', content_rowid='id', tokenize='trigram')"
+        )
+        self.db.execute(
+            "CREATE TRIGGER IF NOT EXISTS prompts_ai_tri AFTER INSERT ON prompts BEGIN"
+            " INSERT INTO prompts_tri(rowid, text) VALUES (new.id, new.text); END"
+        )
+        if new:
+            self.db.execute("INSERT INTO prompts_tri(prompts_tri) VALUES ('rebuild')")
+        self.trigram = True
+
+    def _has_table(self, name: str) -> bool:
+        return self.db.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is not None
+
+    def _import_legacy(self, path: str):
+        # The old text file is newest-first, one prompt per line.
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [l.rstrip("\n") for l in f if l.strip()]
+        ts = os.path.getmtime(path)
+        self.db.executemany(
+            "INSERT INTO prompts (ts, text) VALUES (?, ?)",
+            [(ts, line) for line in reversed(lines)],
+        )
+        self.db.commit()
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+
+    def add(self, text: str, targets: list = ()):
+        last = self.db.execute("SELECT text FROM prompts ORDER BY id DESC LIMIT 1").fetchone()
+        if last and last[0] == text:
+            return
+        self.db.execute(
+            "INSERT INTO prompts (ts, text, targets) VALUES (?, ?, ?)",
+            (time.time(), text, json.dumps(list(targets))),
+        )
+        self.db.commit()
+
+    def before(self, cursor: int = None):
+        """Entry just older than `cursor` (the newest if None) as (id, text)."""
+        if cursor is None:
+            return self.db.execute(
+                "SELECT id, text FROM prompts ORDER BY id DESC LIMIT 1").fetchone()
+        return self.db.execute(
+            "SELECT id, text FROM prompts WHERE id < ? ORDER BY id DESC LIMIT 1", (cursor,)
+        ).fetchone()
+
+    def after(self, cursor: int):
+        return self.db.execute(
+            "SELECT id, text FROM prompts WHERE id > ? ORDER BY id ASC LIMIT 1", (cursor,)
+        ).fetchone()
+
+    def recent(self, limit: int) -> list:
+        rows = self.db.execute(
+            "SELECT text FROM prompts ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [r[0] for r in rows]
+
+    def search(self, query: str, limit: int, offset: int = 0) -> list:
+        """Distinct prompts containing every word of `query`, most recently
+        used first. Words match as prefixes through the index; when that
+        finds nothing, words of three or more characters are looked up
+        anywhere inside words through the trigram index. Every lookup is
+        indexed; only SQLite without FTS5 scans the table."""
+        words = re.findall(r"\w+", query)
+        db = self.db
+        if not self.fts:
+            terms = words or [query]
+            return self._distinct(db.execute(
+                "SELECT text FROM prompts WHERE "
+                + " AND ".join(["text LIKE ? ESCAPE '\\'"] * len(terms)) + " ORDER BY id DESC",
+                [_like_pattern(term) for term in terms],
+            ), offset + limit)[offset:]
+        if not words:
+            return []
+        results = self._distinct(db.execute(
+            "SELECT p.text FROM prompts_fts JOIN prompts p ON p.id = prompts_fts.rowid"
+            " WHERE prompts_fts MATCH ? ORDER BY prompts_fts.rowid DESC",
+            (fts_query(query),),
+        ), offset + limit)
+        if not results and self.trigram and min(len(w) for w in words) >= 3:
+            results = self._distinct(db.execute(
+                "SELECT p.text FROM prompts_tri JOIN prompts p ON p.id = prompts_tri.rowid"
+                " WHERE prompts_tri MATCH ? ORDER BY prompts_tri.rowid DESC",
+                (" ".join('"%s"' % w for w in words),),
+            ), offset + limit)
+        return results[offset:]
+
+    @staticmethod
+    def _distinct(cursor, count: int) -> list:
+        # Rows stream newest first; stop as soon as the page is full instead
+        # of grouping every match.
+        seen, results = set(), []
+        for (text,) in cursor:
+            if text in seen:
+                continue
+            seen.add(text)
+            results.append(text)
+            if len(results) >= count:
+                break
+        cursor.close()
+        return results
+
+    def clear(self):
+        self.db.execute("DELETE FROM prompts")
+        if self.fts:
+            self.db.execute("INSERT INTO prompts_fts(prompts_fts) VALUES ('delete-all')")
+        if self.trigram:
+            self.db.execute("INSERT INTO prompts_tri(prompts_tri) VALUES ('delete-all')")
+        self.db.commit()
+
+
+class HistoryCompletionModel(QAbstractListModel):
+    """Completer model over PromptHistory.search(), fetched a page at a
+    time as the popup scrolls instead of holding the whole history."""
+
+    def __init__(self, history: PromptHistory, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self._query = ""
+        self._rows = []
+        self._exhausted = True
+
+    def set_query(self, text: str):
+        self.beginResetModel()
+        self._query = text.strip()
+        self._rows = []
+        self._exhausted = not self._query
+        self.endResetModel()
+        if self._query:
+            self.fetchMore(QModelIndex())
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole):
+            return self._rows[index.row()]
+        return None
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent):
+        if parent.isValid() or self._exhausted:
+            return
+        page = self.history.search(self._query, HISTORY_PAGE_SIZE, len(self._rows))
+        if len(page) < HISTORY_PAGE_SIZE:
+            self._exhausted = True
+        if page:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+            self._rows.extend(page)
+            self.endInsertRows()
+
+
+# ------------------------- conversation archive -------------------------
+
+def archive_path() -> str:
+    return os.path.join(os.path.expanduser("~"), ".aifreesta_archive.db")
+
+
+def _pack(text: str) -> bytes:
+    import zlib
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def _unpack(blob: bytes) -> str:
+    import zlib
+    return zlib.decompress(blob).decode("utf-8") if blob else ""
+
+
+def _archive_connect(path: str):
+    """Connection with the archive schema in place; returns (db, fts)."""
+    import sqlite3
+
+    db = sqlite3.connect(path, timeout=10)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS runs ("
+        " id INTEGER PRIMARY KEY, ts REAL NOT NULL, prompt BLOB NOT NULL,"
+        " targets TEXT NOT NULL DEFAULT '[]')"
+    )
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS answers ("
+        " id INTEGER PRIMARY KEY, run_id INTEGER NOT NULL, pane TEXT NOT NULL,"
+        " ts REAL NOT NULL, status TEXT NOT NULL, ttft_ms REAL, total_ms REAL,"
+        " chars INTEGER NOT NULL DEFAULT 0, body BLOB NOT NULL)"
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS answers_run ON answers (run_id)")
+    # Bodies are compressed, so the indexes are contentless: they hold the
+    # words and row ids only, and searches join back to the tables.
+    try:
+        db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS runs_fts USING fts5(prompt, content='')")
+        db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS answers_fts USING fts5(body, content='')")
+        fts = True
+    except sqlite3.OperationalError:
+        fts = False
+    db.commit()
+    return db, fts
+
+
+class ConversationArchive:
+    """Every broadcast with each pane's final answer, in SQLite.
+
+    Recording only puts items on a queue; a daemon thread writes them in
+    batches, so the GUI thread never waits on disk. Reading (browser,
+    export) uses separate connections, which WAL lets run alongside."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.enabled = QSettings("Ai Freesta", "Ai Freesta").value("archive_enabled", True, type=bool)
+        self.fts = False
+        self._db = None
+        self._pending = None   # queue.Queue, created with the writer thread
+        self._writer = None
+        self._next_token = 0
+
+    # -------------------- recording --------------------
+
+    def begin_run(self, prompt: str, targets: list) -> int:
+        """Record a prompt; returns the token its answers are filed under."""
+        if not self.enabled:
+            return None
+        self._next_token += 1
+        self._put(("run", self._next_token, time.time(), prompt, list(targets)))
+        return self._next_token
+
+    def add_answer(self, token: int, pane: str, text: str, timings: dict = None, status: str = "done"):
+        if token is None:
+            return
+        timings = timings or {}
+        self._put(("answer", token, time.time(), pane, text, status,
+                   timings.get("ttft_ms"), timings.get("total_ms")))
+
+    def _put(self, item):
+        if self._writer is None:
+            import queue
+            import threading
+
+            self._pending = queue.Queue()
+            self._writer = threading.Thread(target=self._write_loop, name="archive", daemon=True)
+            self._writer.start()
+        self._pending.put(item)
+
+    def close(self, timeout_s: float = 5.0):
+        """Write what is still queued and stop the writer."""
+        if self._writer is not None:
+            self._pending.put(None)
+            self._writer.join(timeout_s)
+            self._writer = None
+
+    def _write_loop(self):
+        import queue
+
+        db, fts = _archive_connect(self.path)
+        run_ids = {}   # token -> [runs.id, answers still expected]
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + ARCHIVE_BATCH_MS / 1000
+            while batch[-1] is not None and len(batch) < ARCHIVE_BATCH_MAX:
+                try:
+                    batch.append(self._pending.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            with db:
+                for item in batch:
+                    if item is not None:
+                        self._write(db, fts, run_ids, item)
+            if batch[-1] is None:
+                db.close()
+                return
+
+    @staticmethod
+    def _write(db, fts, run_ids, item):
+        if item[0] == "run":
+            _kind, token, ts, prompt, targets = item
+            cur = db.execute("INSERT INTO runs (ts, prompt, targets) VALUES (?, ?, ?)",
+                             (ts, _pack(prompt), json.dumps(targets)))
+            run_ids[token] = [cur.lastrowid, len(targets)]
+            # Panes removed mid-run never answer; keep the map bounded.
+            while len(run_ids) > ARCHIVE_OPEN_RUNS:
+                del run_ids[next(iter(run_ids))]
+            if fts:
+                db.execute("INSERT INTO runs_fts (rowid, prompt) VALUES (?, ?)", (cur.lastrowid, prompt))
+            return
+        _kind, token, ts, pane, text, status, ttft_ms, total_ms = item
+        entry = run_ids.get(token)
+        if entry is None:
+            return
+        run_id = entry[0]
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del run_ids[token]
+        cur = db.execute(
+            "INSERT INTO answers (run_id, pane, ts, status, ttft_ms, total_ms, chars, body)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, pane, ts, status, ttft_ms, total_ms, len(text), _pack(text)),
+        )
+        if fts and text:
+            db.execute("INSERT INTO answers_fts (rowid, body) VALUES (?, ?)", (cur.lastrowid, text))
+
+    # -------------------- reading --------------------
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db, self.fts = _archive_connect(self.path)
+        return self._db
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def search(self, query: str = "", limit: int = ARCHIVE_PAGE_SIZE, before: int = None) -> list:
+        """Runs matching query in prompt or any answer, newest first, as
+        dicts without answer bodies. Pages are keyed on the run id
+        (`before`), so deep pages cost the same as the first."""
+        db = self.db
+        before = before if before is not None else 2 ** 62
+        match = fts_query(query)
+        columns = ("SELECT r.id, r.ts, r.prompt, r.targets,"
+                   " (SELECT COUNT(*) FROM answers a WHERE a.run_id = r.id) FROM runs r")
+        if match and self.fts:
+            cursor = db.execute(
+                columns + " WHERE r.id < ? AND r.id IN ("
+                " SELECT rowid FROM runs_fts WHERE runs_fts MATCH ?"
+                " UNION SELECT a.run_id FROM answers_fts JOIN answers a ON a.id = answers_fts.rowid"
+                " WHERE answers_fts MATCH ?)"
+                " ORDER BY r.id DESC LIMIT ?",
+                (before, match, match, limit),
+            )
+            rows = cursor.fetchall()
+        elif query.strip():
+            # No FTS5 in this SQLite: decompress and scan, newest first.
+            needles = [w.lower() for w in re.findall(r"\w+", query)] or [query.strip().lower()]
+            found = lambda text: all(n in text.lower() for n in needles)
+            rows = []
+            cursor = db.execute(columns + " WHERE r.id < ? ORDER BY r.id DESC", (before,))
+            for row in cursor:
+                if found(_unpack(row[2])) or any(
+                    found(_unpack(body))
+                    for (body,) in db.execute("SELECT body FROM answers WHERE run_id = ?", (row[0],))
+                ):
+                    rows.append(row)
+                    if len(rows) >= limit:
+                        break
+            cursor.close()
+        else:
+            rows = db.execute(columns + " WHERE r.id < ? ORDER BY r.id DESC LIMIT ?",
+                              (before, limit)).fetchall()
+        return [
+            {"id": i, "ts": ts, "prompt": _unpack(p), "targets": json.loads(t), "answers": n}
+            for i, ts, p, t, n in rows
+        ]
+
+    def run(self, run_id: int) -> dict:
+        row = self.db.execute("SELECT ts, prompt, targets FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        answers = self.db.execute(
+            "SELECT pane, ts, status, ttft_ms, total_ms, body FROM answers WHERE run_id = ? ORDER BY id",
+            (run_id,),
+        ).fetchall()
+        return {
+            "id": run_id, "ts": row[0], "prompt": _unpack(row[1]), "targets": json.loads(row[2]),
+            "answers": [
+                {"pane": pane, "ts": ts, "status": status, "ttft_ms": ttft, "total_ms": total,
+                 "text": _unpack(body)}
+                for pane, ts, status, ttft, total, body in answers
+            ],
+        }
+
+    def export_jsonl(self, path: str, query: str = "") -> int:
+        """Write matching runs, oldest first, one JSON object per line.
+        Streams row by row on its own connection, so it can run in a
+        thread; returns the number of runs written."""
+        db, fts = _archive_connect(self.path)
+        match = fts_query(query)
+        where, params = "", ()
+        if match and fts:
+            where = (" WHERE r.id IN (SELECT rowid FROM runs_fts WHERE runs_fts MATCH ?"
+                     " UNION SELECT a.run_id FROM answers_fts JOIN answers a"
+                     " ON a.id = answers_fts.rowid WHERE answers_fts MATCH ?)")
+            params = (match, match)
+        cursor = db.execute(
+            "SELECT r.id, r.ts, r.prompt, r.targets, a.pane, a.ts, a.status, a.ttft_ms, a.total_ms, a.body"
+            " FROM runs r LEFT JOIN answers a ON a.run_id = r.id" + where + " ORDER BY r.id, a.id",
+            params,
+        )
+        written, current = 0, None
+        with open(path, "w", encoding="utf-8") as f:
+            for run_id, ts, prompt, targets, pane, a_ts, status, ttft, total, body in cursor:
+                if current is None or current["id"] != run_id:
+                    if current is not None:
+                        f.write(json.dumps(current, ensure_ascii=False) + "\n")
+                        written += 1
+                    current = {"id": run_id, "ts": ts, "prompt": _unpack(prompt),
+                               "targets": json.loads(targets), "answers": []}
+                if pane is not None:
+                    current["answers"].append({"pane": pane, "ts": a_ts, "status": status,
+                                               "ttft_ms": ttft, "total_ms": total, "text": _unpack(body)})
+            if current is not None:
+                f.write(json.dumps(current, ensure_ascii=False) + "\n")
+                written += 1
+        db.close()
+        return written
+
+
+# ---------------------------- response capture ----------------------------
+
+class PayloadStore(QObject):
+    """Large prompts, held once and shared by every pane's web channel.
+
+    Each send takes a reference and gives it back when it is acknowledged
+    or has failed, so a payload lives exactly as long as some pane still
+    needs it, however slowly the panes get to it."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._payloads = {}   # id -> [text, refs]
+        self._ids = {}        # text -> id, so one broadcast stores its text once
+        self._next_id = 0
+
+    def acquire(self, text: str) -> dict:
+        """Reference for a fill request: {"id", "chunks"}."""
+        payload_id = self._ids.get(text)
+        if payload_id is None:
+            self._next_id += 1
+            payload_id = self._next_id
+            self._payloads[payload_id] = [text, 0]
+            self._ids[text] = payload_id
+        self._payloads[payload_id][1] += 1
+        return {"id": payload_id, "chunks": max(1, -(-len(text) // PAYLOAD_CHUNK_CHARS))}
+
+    def release(self, payload_id: int):
+        entry = self._payloads.get(payload_id)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._payloads[payload_id]
+            self._ids.pop(entry[0], None)
+
+    @Slot(int, int, result=str)
+    def chunk(self, payload_id: int, index: int) -> str:
+        entry = self._payloads.get(payload_id)
+        if entry is None:
+            return ""   # released; the page reports payload-error
+        start = index * PAYLOAD_CHUNK_CHARS
+        return entry[0][start:start + PAYLOAD_CHUNK_CHARS]
+
+
+_payload_store = None
+
+
+def payload_store() -> PayloadStore:
+    global _payload_store
+    if _payload_store is None:
+        _payload_store = PayloadStore(QApplication.instance())
+    return _payload_store
+
+
+class PaneBridge(QObject):
+    """Web channel object the AiFreesta runtime reports a pane's response to."""
+
+    def __init__(self, capture, view):
+        super().__init__(view)
+        self.capture = capture
+        self.view = view
+
+    @Slot(int, int, str)
+    def chunk(self, capture_id: int, offset: int, text: str):
+        self.capture._on_chunk(self.view, capture_id, offset, text)
+
+    @Slot(int, str, str)
+    def done(self, capture_id: int, text: str, reason: str):
+        self.capture._on_done(self.view, capture_id, text, reason)
+
+
+class ResponseCapture(QObject):
+    """Follows each pane's answer to a broadcast.
+
+    The runtime watches the site's response element with a
+    MutationObserver and streams text back over QWebChannel; completion is
+    the stop button disappearing or the DOM going quiet. Subscribe to the
+    signals below for streamed text and per-pane timings (milliseconds
+    since the broadcast)."""
+
+    started = Signal(object)                # view
+    firstToken = Signal(object, float)      # view, ttft_ms
+    progress = Signal(object, str)          # view, full text so far
+    finished = Signal(object, str, dict)    # view, text, {"ttft_ms", "total_ms", "chars", "reason"}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._next_id = 0
+        self._active = {}      # view -> {"id", "started", "first", "text"}
+        self.last_timings = {}
+
+    def attach(self, view: QWebEngineView):
+        channel = QWebChannel(view.page())
+        channel.registerObject("bridge", PaneBridge(self, view))
+        channel.registerObject("payloads", payload_store())
+        view.page().setWebChannel(channel, QWebEngineScript.ApplicationWorld)
+
+    def forget(self, view: QWebEngineView):
+        self._active.pop(view, None)
+        self.last_timings.pop(view, None)
+
+    def is_capturing(self, view: QWebEngineView) -> bool:
+        return view in self._active
+
+    def cancel(self, view: QWebEngineView):
+        self._active.pop(view, None)
+
+    def begin(self, view: QWebEngineView, site: dict) -> dict:
+        """Start following a pane's next response; returns the runtime's
+        capture request to pass along with the send."""
+        self._next_id += 1
+        self._active[view] = {
+            "id": self._next_id, "started": time.perf_counter(), "first": None, "text": "",
+        }
+        self.started.emit(view)
+        # Backstop in case the page never runs the capture (e.g. navigated away).
+        QTimer.singleShot(RESPONSE_TIMEOUT_MS + 5000,
+                          lambda v=view, i=self._next_id: self._on_done(v, i, "", "lost"))
+        return {
+            "id": self._next_id,
+            "response": site.get("response_selector", DEFAULT_RESPONSE_SELECTOR),
+            "stop": site.get("stop_selector", DEFAULT_STOP_SELECTOR),
+            "quiet": RESPONSE_QUIET_MS,
+            "timeout": RESPONSE_TIMEOUT_MS,
+        }
+
+    def _state(self, view, capture_id):
+        state = self._active.get(view)
+        return state if state and state["id"] == capture_id else None
+
+    def _on_chunk(self, view, capture_id, offset, text):
+        state = self._state(view, capture_id)
+        if state is None:
+            return
+        if state["first"] is None:
+            state["first"] = time.perf_counter()
+            self.firstToken.emit(view, (state["first"] - state["started"]) * 1000)
+        state["text"] = state["text"][:offset] + text
+        self.progress.emit(view, state["text"])
+
+    def _on_done(self, view, capture_id, text, reason):
+        state = self._state(view, capture_id)
+        if state is None:
+            return
+        del self._active[view]
+        text = text or state["text"]
+        now = time.perf_counter()
+        first = state["first"] or now
+        timings = {
+            "ttft_ms": (first - state["started"]) * 1000,
+            "total_ms": (now - state["started"]) * 1000,
+            "chars": len(text),
+            "reason": reason,
+        }
+        self.last_timings[view] = timings
+        self.finished.emit(view, text, timings)
+
+
+# ------------------------------ dispatch ------------------------------
+
+SELECTOR_KEYS = ("input_selector", "send_selector")
+
+
+def split_selectors(selectors: str) -> list:
+    """Split a comma-separated selector list, ignoring commas inside
+    attribute brackets, parentheses and quotes."""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, c in enumerate(selectors):
+        if quote:
+            if c == quote:
+                quote = None
+        elif c in "\"'":
+            quote = c
+        elif c in "[(":
+            depth += 1
+        elif c in "])":
+            depth -= 1
+        elif c == "," and depth == 0:
+            parts.append(selectors[start:i].strip())
+            start = i + 1
+    parts.append(selectors[start:].strip())
+    return [p for p in parts if p]
+
+
+class SelectorStats:
+    """How often each selector of a site's input/send lists was the one
+    that matched, persisted in QSettings so lists can be reordered by hit
+    rate."""
+
+    def __init__(self):
+        self._settings = QSettings("Ai Freesta", "Ai Freesta")
+
+    def hits(self, site: dict) -> dict:
+        raw = self._settings.value(f"selectors/{site['name']}", "")
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError:
+            return {}
+
+    def record(self, site: dict, taken: dict):
+        if not taken:
+            return
+        stats = self.hits(site)
+        for key in SELECTOR_KEYS:
+            counts = taken.get(site.get(key))
+            if not counts:
+                continue
+            per_key = stats.setdefault(key, {})
+            for selector, n in counts.items():
+                per_key[selector] = per_key.get(selector, 0) + int(n)
+        self._settings.setValue(f"selectors/{site['name']}", json.dumps(stats))
+
+    def ranked(self, site: dict, key: str) -> str:
+        """The site's selector list with the most frequent winners first;
+        selectors that never matched keep their relative order."""
+        counts = self.hits(site).get(key, {})
+        parts = split_selectors(site.get(key, ""))
+        order = sorted(range(len(parts)), key=lambda i: (-counts.get(parts[i], 0), i))
+        return ", ".join(parts[i] for i in order)
+
+    def reordered(self, site: dict) -> dict:
+        """A copy of the site with its selector lists ranked by hit rate;
+        the order is saved and reapplied by with_order on later runs."""
+        order = {key: self.ranked(site, key) for key in SELECTOR_KEYS if site.get(key)}
+        self._settings.setValue(f"selector_order/{site['name']}", json.dumps(order))
+        return dict(site, **order)
+
+    def with_order(self, site: dict) -> dict:
+        """The site with its saved selector order, if any. An order saved
+        for a different selector list (the site was edited since) is
+        ignored."""
+        raw = self._settings.value(f"selector_order/{site['name']}", "")
+        try:
+            order = json.loads(raw) if raw else {}
+        except ValueError:
+            return site
+        order = {
+            key: value for key, value in order.items()
+            if key in SELECTOR_KEYS and sorted(split_selectors(value)) == sorted(split_selectors(site.get(key, "")))
+        }
+        return dict(site, **order) if order else site
+
+
+class BroadcastDispatcher(QObject):
+    """Delivers a prompt to a pane as soon as the page is actually ready.
+
+    Waits for loadFinished, then fills the input and clicks send through
+    the runtime. Every step is acknowledged through the runJavaScript
+    callback and retried with backoff while the page is not ready. The
+    fill-to-send gap each site needs is learned and persisted, so later
+    sends try at the right moment straight away."""
+
+    acknowledged = Signal(object, dict)   # view, {"via", "attempts", "total_ms"}
+    failed = Signal(object, str)          # view, reason
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._loaded = {}
+        self._settings = QSettings("Ai Freesta", "Ai Freesta")
+        self.selector_stats = SelectorStats()
+
+    def track(self, view: QWebEngineView):
+        self._loaded[view] = False
+        view.loadStarted.connect(lambda v=view: self._loaded.__setitem__(v, False))
+        view.loadFinished.connect(lambda _ok, v=view: self._loaded.__setitem__(v, True))
+
+    def forget(self, view: QWebEngineView):
+        self._loaded.pop(view, None)
+
+    def learned(self, site: dict) -> dict:
+        raw = self._settings.value(f"dispatch/{site['name']}", "")
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError:
+            return {}
+
+    def _learn(self, site: dict, submit_ms: float, via: str):
+        timings = self.learned(site)
+        previous = timings.get("submit_ms")
+        timings["submit_ms"] = submit_ms if previous is None else 0.7 * previous + 0.3 * submit_ms
+        timings["via"] = via
+        self._settings.setValue(f"dispatch/{site['name']}", json.dumps(timings))
+
+    # -------------------- steps --------------------
+
+    def dispatch(self, view: QWebEngineView, site: dict, text: str, capture: dict = None):
+        job = {
+            "view": view, "site": site, "attempts": 0, "started": time.perf_counter(),
+            "request": {
+                "input": site["input_selector"],
+                "send": site["send_selector"],
+                "capture": capture,
+            },
+        }
+        # Long prompts travel by reference so every retry stays a tiny script.
+        if len(text) > PAYLOAD_INLINE_CHARS:
+            job["request"]["payload"] = payload_store().acquire(text)
+        else:
+            job["request"]["text"] = text
+        if self._loaded.get(view, True):
+            self._fill(job)
+            return
+
+        def on_loaded(_ok, v=view):
+            v.loadFinished.disconnect(on_loaded)
+            self._fill(job)
+        view.loadFinished.connect(on_loaded)
+
+    def _release(self, job: dict):
+        payload = job["request"].pop("payload", None)
+        if payload:
+            payload_store().release(payload["id"])
+
+    def _retry(self, job: dict, step, reason: str):
+        job["attempts"] += 1
+        if job["attempts"] > DISPATCH_MAX_RETRIES:
+            self._release(job)
+            self.failed.emit(job["view"], reason)
+            return
+        delay = DISPATCH_RETRY_MS * (2 ** (job["attempts"] - 1))
+        QTimer.singleShot(delay, lambda: self._alive(job) and step(job))
+
+    def _alive(self, job: dict) -> bool:
+        if job["view"] in self._loaded:
+            return True
+        self._release(job)   # pane closed meanwhile
+        return False
+
+    def _fill(self, job: dict):
+        def on_result(status):
+            if status != "filled":
+                self._retry(job, self._fill, status or "no-runtime")
+                return
+            job["filled"] = time.perf_counter()
+            job["attempts"] = 0
+            self._release(job)
+            learned = self.learned(job["site"])
+            wait = int(learned.get("submit_ms", 0))
+            QTimer.singleShot(wait, lambda: self._alive(job) and self._submit(job))
+
+        run_runtime(job["view"].page(), "fill", job["request"], callback=on_result)
+
+    def _submit(self, job: dict):
+        learned = self.learned(job["site"])
+        request = {
+            "input": job["request"]["input"],
+            "send": job["request"]["send"],
+            # Sites without a usable send button get Enter right away once
+            # that has been learned, otherwise only after the last retry.
+            "force": learned.get("via") == "enter" or job["attempts"] >= DISPATCH_MAX_RETRIES,
+        }
+
+        def on_result(status):
+            if status not in ("clicked", "enter"):
+                self._retry(job, self._submit, status or "no-runtime")
+                return
+            now = time.perf_counter()
+            self._learn(job["site"], (now - job["filled"]) * 1000, status)
+            run_runtime(job["view"].page(), "takeSelectorHits",
+                        callback=lambda taken, s=job["site"]: self.selector_stats.record(s, taken))
+            self.acknowledged.emit(job["view"], {
+                "via": status,
+                "attempts": job["attempts"] + 1,
+                "total_ms": (now - job["started"]) * 1000,
+            })
+
+        run_runtime(job["view"].page(), "submit", request, callback=on_result)
+
+
+# ---------------------------- hibernation ----------------------------
+
+LIFECYCLE_NAMES = {
+    QWebEnginePage.LifecycleState.Active: "live",
+    QWebEnginePage.LifecycleState.Frozen: "frozen",
+    QWebEnginePage.LifecycleState.Discarded: "discarded",
+}
+
+
+class PaneHibernator(QObject):
+    """Keeps renderer memory under a budget by freezing, then discarding,
+    the least-recently-used panes. Hibernated panes wake transparently."""
+
+    stateChanged = Signal(object, str)   # view, "live" | "frozen" | "discarded"
+    memoryChecked = Signal(int)          # total renderer RSS in bytes
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self._last_used = {}
+        settings = QSettings("Ai Freesta", "Ai Freesta")
+        self.budget_mb = settings.value("memory_budget_mb", MEMORY_BUDGET_MB, type=int)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(HIBERNATE_CHECK_MS)
+        self._timer.timeout.connect(self.enforce_budget)
+        self._timer.start()
+
+    # -------------------- bookkeeping --------------------
+
+    def track(self, view: QWebEngineView):
+        self._last_used[view] = time.monotonic()
+        view.page().lifecycleStateChanged.connect(
+            lambda state, v=view: self.stateChanged.emit(v, LIFECYCLE_NAMES[state])
+        )
+
+    def forget(self, view: QWebEngineView):
+        self._last_used.pop(view, None)
+
+    def touch(self, view: QWebEngineView):
+        if view in self._last_used:
+            self._last_used[view] = time.monotonic()
+
+    def set_budget(self, budget_mb: int):
+        self.budget_mb = max(0, budget_mb)
+        QSettings("Ai Freesta", "Ai Freesta").setValue("memory_budget_mb", self.budget_mb)
+        self.enforce_budget()
+
+    def state(self, view: QWebEngineView) -> str:
+        return LIFECYCLE_NAMES[view.page().lifecycleState()]
+
+    def is_hibernated(self, view: QWebEngineView) -> bool:
+        return view.page().lifecycleState() != QWebEnginePage.LifecycleState.Active
+
+    def pane_memory(self, view: QWebEngineView) -> int:
+        return process_rss_bytes(view.page().renderProcessPid())
+
+    def total_memory(self) -> int:
+        # Several panes may share one renderer process, count each PID once.
+        pids = {view.page().renderProcessPid() for view in self._last_used}
+        return sum(process_rss_bytes(pid) for pid in pids)
+
+    # -------------------- state transitions --------------------
+
+    def hibernate(self, view: QWebEngineView, state: QWebEnginePage.LifecycleState):
+        page = view.page()
+        # Chromium refuses to freeze or discard a visible page.
+        view.hide()
+        page.setVisible(False)
+        page.setLifecycleState(state)
+        if page.lifecycleState() != state:
+            view.show()
+
+    def wake(self, view: QWebEngineView, then=None):
+        """Bring a pane back to Active. `then` runs once the page is usable,
+        which for a discarded pane means after it has reloaded."""
+        page = view.page()
+        was_discarded = page.lifecycleState() == QWebEnginePage.LifecycleState.Discarded
+        self.touch(view)
+
+        if was_discarded:
+            def on_loaded(_ok, v=view):
+                v.loadFinished.disconnect(on_loaded)
+                v.setZoomFactor(self.window.zoom_level)
+                if then:
+                    then()
+            view.loadFinished.connect(on_loaded)
+
+        if page.lifecycleState() != QWebEnginePage.LifecycleState.Active:
+            page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        view.show()
+        view.setZoomFactor(self.window.zoom_level)
+
+        if not was_discarded and then:
+            then()
+
+    def enforce_budget(self):
+        total = self.total_memory()
+        self.memoryChecked.emit(total)
+        if not self.budget_mb or total <= self.budget_mb * 1024 * 1024:
+            return
+
+        # The most recently used pane, the focused pane and panes still
+        # answering always stay live.
+        focus = QApplication.focusWidget()
+        by_age = sorted(self._last_used, key=self._last_used.get)
+        candidates = [
+            v for v in by_age[:-1]
+            if not (focus is not None and (focus is v or v.isAncestorOf(focus)))
+            and not self.window.capture.is_capturing(v)
+            and v.page().lifecycleState() != QWebEnginePage.LifecycleState.Discarded
+        ]
+        if not candidates:
+            return
+
+        victim = candidates[0]
+        if victim.page().lifecycleState() == QWebEnginePage.LifecycleState.Active:
+            self.hibernate(victim, QWebEnginePage.LifecycleState.Frozen)
+        else:
+            self.hibernate(victim, QWebEnginePage.LifecycleState.Discarded)
+
+
+class ViewportThrottler(QObject):
+    """Throttles, then freezes, panes scrolled out of the scroll area and
+    resumes them when they come back into view. Panes with a prompt or a
+    response in flight are never throttled."""
+
+    changed = Signal(object)   # view
+
+    def __init__(self, window, scroll_area: QScrollArea):
+        super().__init__(window)
+        self.window = window
+        self.scroll_area = scroll_area
+        self.enabled = QSettings("Ai Freesta", "Ai Freesta").value("viewport_throttling", True, type=bool)
+        self._offscreen = {}   # view -> monotonic time it left the viewport
+        self._frozen = set()   # views frozen by us, not by the memory budget
+
+        self._check = QTimer(self)
+        self._check.setSingleShot(True)
+        self._check.setInterval(VIEWPORT_CHECK_MS)
+        self._check.timeout.connect(self.update)
+        # Offscreen panes are frozen on a later pass, not while scrolling.
+        self._sweep = QTimer(self)
+        self._sweep.timeout.connect(self.update)
+        if VIEWPORT_FREEZE_MS:
+            self._sweep.start(max(1000, VIEWPORT_FREEZE_MS // 4))
+
+        scroll_area.horizontalScrollBar().valueChanged.connect(self.schedule)
+        scroll_area.verticalScrollBar().valueChanged.connect(self.schedule)
+        scroll_area.viewport().installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Resize:
+            self.schedule()
+        return False
+
+    def schedule(self, *_):
+        self._check.start()
+
+    def forget(self, view: QWebEngineView):
+        self._offscreen.pop(view, None)
+        self._frozen.discard(view)
+
+    def is_throttled(self, view: QWebEngineView) -> bool:
+        return view in self._offscreen
+
+    def is_visible(self, view: QWebEngineView) -> bool:
+        container = view.parentWidget()
+        if container is None or not container.isVisible():
+            return False
+        viewport = self.scroll_area.viewport()
+        rect = QRect(container.mapTo(viewport, QPoint(0, 0)), container.size())
+        m = VIEWPORT_MARGIN_PX
+        return rect.adjusted(-m, -m, m, m).intersects(viewport.rect())
+
+    def update(self):
+        now = time.monotonic()
+        hibernator = self.window.hibernator
+        for view in self.window.views:
+            if hibernator.is_hibernated(view) and view not in self._frozen:
+                # Hibernated for the memory budget; that stays click-to-wake.
+                self._offscreen.pop(view, None)
+                continue
+            if (not self.enabled or self.is_visible(view)
+                    or self.window.capture.is_capturing(view)):
+                self.resume(view)
+                continue
+            if self.window.loader.is_pending(view):
+                continue
+
+            page = view.page()
+            if view not in self._offscreen:
+                self._offscreen[view] = now
+                self.changed.emit(view)
+            if view in self._frozen:
+                continue
+            if page.isVisible():
+                # Re-applied every pass: layout changes re-show the view.
+                page.setVisible(False)
+            if VIEWPORT_FREEZE_MS and (now - self._offscreen[view]) * 1000 >= VIEWPORT_FREEZE_MS:
+                hibernator.hibernate(view, QWebEnginePage.LifecycleState.Frozen)
+                if page.lifecycleState() == QWebEnginePage.LifecycleState.Frozen:
+                    self._frozen.add(view)
+
+    def resume(self, view: QWebEngineView):
+        if view in self._frozen:
+            self._frozen.discard(view)
+            if self.window.hibernator.state(view) == "frozen":
+                self.window.hibernator.wake(view)
+        if self._offscreen.pop(view, None) is not None:
+            if not self.window.hibernator.is_hibernated(view):
+                view.page().setVisible(True)
+            self.changed.emit(view)
+
+
+# ------------------------------ metrics ------------------------------
+
+METRIC_COLUMNS = [
+    ("name", "Pane"),
+    ("state", "State"),
+    ("load_ms", "Load (ms)"),
+    ("pid", "PID"),
+    ("rss_mb", "RSS (MB)"),
+    ("js_heap_mb", "JS heap (MB)"),
+    ("sent", "Sent"),
+    ("acked", "Acked"),
+    ("failed", "Failed"),
+    ("blocked", "Blocked"),
+    ("saved_kb", "Saved (KB)"),
+    ("ttft_s", "First text (s)"),
+    ("total_s", "Answer (s)"),
+]
+
+
+class PaneMetrics(QObject):
+    """Per-pane load, process and broadcast counters for the metrics dock
+    and JSON/CSV export."""
+
+    updated = Signal()
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self._panes = {}   # view -> counters
+
+        settings = QSettings("Ai Freesta", "Ai Freesta")
+        self.export_path = settings.value("metrics_export_path", "")
+        self.export_interval_s = settings.value(
+            "metrics_export_interval_s", METRICS_EXPORT_INTERVAL_S, type=int)
+        self._last_export = 0.0
+        self.sampling = False
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(METRICS_SAMPLE_MS)
+        self._timer.timeout.connect(self.sample)
+        self._update_timer()
+
+    def track(self, view: QWebEngineView, site: dict):
+        self._panes[view] = {
+            "site": site, "nav_started": time.perf_counter(), "load_ms": None,
+            "js_heap": None, "sent": 0, "acked": 0, "failed": 0,
+        }
+        view.loadStarted.connect(lambda v=view: self._on_load_started(v))
+        view.loadFinished.connect(lambda _ok, v=view: self._on_load_finished(v))
+
+    def forget(self, view: QWebEngineView):
+        self._panes.pop(view, None)
+
+    def replace(self, old: QWebEngineView, new: QWebEngineView):
+        """Keep a pane's counters when its view is swapped for a standby."""
+        pane = self._panes.pop(old, None)
+        if pane is None:
+            return
+        self._panes[new] = pane
+        new.loadStarted.connect(lambda v=new: self._on_load_started(v))
+        new.loadFinished.connect(lambda _ok, v=new: self._on_load_finished(v))
+
+    def _on_load_started(self, view):
+        if view in self._panes:
+            self._panes[view]["nav_started"] = time.perf_counter()
+
+    def _on_load_finished(self, view):
+        pane = self._panes.get(view)
+        if pane:
+            pane["load_ms"] = (time.perf_counter() - pane["nav_started"]) * 1000
+
+    def count(self, view: QWebEngineView, key: str):
+        if view in self._panes:
+            self._panes[view][key] += 1
+
+    # -------------------- sampling / export --------------------
+
+    def set_sampling(self, on: bool):
+        self.sampling = on
+        self._update_timer()
+        if on:
+            self.sample()
+
+    def set_export(self, path: str, interval_s: int = None):
+        self.export_path = path
+        if interval_s is not None:
+            self.export_interval_s = interval_s
+        settings = QSettings("Ai Freesta", "Ai Freesta")
+        settings.setValue("metrics_export_path", path)
+        settings.setValue("metrics_export_interval_s", self.export_interval_s)
+        self._update_timer()
+
+    def _update_timer(self):
+        if self.sampling or self.export_path:
+            self._timer.start()
+        else:
+            self._timer.stop()
+
+    def sample(self):
+        for view, pane in self._panes.items():
+            if self.window.hibernator.is_hibernated(view):
+                pane["js_heap"] = None
+                continue
+            run_runtime(view.page(), "heapSize",
+                        callback=lambda heap, p=pane: p.__setitem__("js_heap", heap))
+        self.updated.emit()
+
+        if self.export_path and time.monotonic() - self._last_export >= self.export_interval_s:
+            self._last_export = time.monotonic()
+            try:
+                self.export(self.export_path)
+            except OSError as e:
+                self.window.statusBar().showMessage(f"⚠️ Metrics export failed: {e}", 5000)
+
+    def snapshot(self) -> list:
+        rows = []
+        for view, pane in self._panes.items():
+            pid = view.page().renderProcessPid()
+            rss = process_rss_bytes(pid)
+            heap = pane["js_heap"]
+            timings = self.window.capture.last_timings.get(view, {})
+            blocker = self.window.blockers.get(view)
+            rows.append({
+                "name": pane["site"]["name"],
+                "url": view.url().toString(),
+                "state": self.window.hibernator.state(view),
+                "load_ms": round(pane["load_ms"]) if pane["load_ms"] is not None else None,
+                "pid": pid or None,
+                "rss_mb": round(rss / (1024 * 1024), 1) if rss else None,
+                "js_heap_mb": round(heap["used"] / (1024 * 1024), 1) if heap else None,
+                "sent": pane["sent"],
+                "acked": pane["acked"],
+                "failed": pane["failed"],
+                "blocked": blocker.blocked if blocker else None,
+                "saved_kb": blocker.saved_bytes // 1024 if blocker else None,
+                "ttft_s": round(timings["ttft_ms"] / 1000, 2) if timings else None,
+                "total_s": round(timings["total_ms"] / 1000, 2) if timings else None,
+            })
+        return rows
+
+    def export(self, path: str):
+        import csv
+
+        rows = self.snapshot()
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        if path.lower().endswith(".csv"):
+            fields = ["timestamp", "url"] + [key for key, _ in METRIC_COLUMNS]
+            new_file = not os.path.exists(path)
+            # CSV exports append, so periodic exports build a time series.
+            with open(path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                if new_file:
+                    writer.writeheader()
+                for row in rows:
+                    writer.writerow({"timestamp": stamp, **row})
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"timestamp": stamp, "panes": rows}, f, indent=2)
+
+
+# ---------------------------- latency stats ----------------------------
+
+LATENCY_METRICS = [
+    ("submit_ms", "Submit (ms)"),
+    ("ttft_ms", "First text (ms)"),
+    ("total_ms", "Answer (ms)"),
+    ("chars_per_s", "Chars/s"),
+]
+
+
+def percentile(values: list, p: float):
+    """Nearest-rank percentile of a sorted list (None if empty)."""
+    if not values:
+        return None
+    return values[min(len(values), max(1, math.ceil(p / 100 * len(values)))) - 1]
+
+
+def histogram(values: list, lo: float, hi: float, bins: int = LATENCY_HISTOGRAM_BINS) -> str:
+    """One line of block characters counting values in log-spaced bins
+    from lo to hi; rows drawn with the same bounds line up."""
+    if not values:
+        return ""
+    lo = max(lo, 1e-3)
+    span = math.log(max(hi, lo) / lo) or 1.0
+    counts = [0] * bins
+    for value in values:
+        counts[min(bins - 1, int(math.log(max(value, lo) / lo) / span * bins))] += 1
+    peak = max(counts)
+    return "".join(" ▁▂▃▄▅▆▇█"[math.ceil(n / peak * 8)] for n in counts)
+
+
+class LatencyStats(QObject):
+    """Rolling per-site latency samples, persisted in QSettings so they
+    build up across sessions (and across pane workers).
+
+    Per send: time from send_to_pane to the submit acknowledgement. Per
+    completed answer: time to first text, time to the end and characters
+    per second while it streamed. Timed-out and lost answers are left out."""
+
+    recorded = Signal(str)   # site name
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._settings = QSettings("Ai Freesta", "Ai Freesta")
+        self._pending = {}   # view -> (site name, perf_counter at send)
+
+    def begin(self, view: QWebEngineView, site: dict):
+        self._pending[view] = (site["name"], time.perf_counter())
+
+    def forget(self, view: QWebEngineView, *_args):
+        self._pending.pop(view, None)
+
+    def on_acknowledged(self, view: QWebEngineView, _info: dict):
+        pending = self._pending.get(view)
+        if pending:
+            name, started = pending
+            self.record(name, submit_ms=(time.perf_counter() - started) * 1000)
+
+    def on_finished(self, view: QWebEngineView, _text: str, timings: dict):
+        pending = self._pending.pop(view, None)
+        if pending is None or timings.get("reason") in ("timeout", "lost"):
+            return
+        streamed_s = (timings["total_ms"] - timings["ttft_ms"]) / 1000
+        # Answers that arrived in one chunk have no meaningful rate.
+        rate = timings["chars"] / streamed_s if streamed_s >= 0.25 and timings["chars"] else None
+        self.record(pending[0], ttft_ms=timings["ttft_ms"], total_ms=timings["total_ms"], chars_per_s=rate)
+
+    def samples(self, name: str) -> dict:
+        raw = self._settings.value(f"latency/{name}", "")
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError:
+            return {}
+
+    def record(self, name: str, **values):
+        samples = self.samples(name)
+        for key, value in values.items():
+            if value is None:
+                continue
+            ring = samples.setdefault(key, [])
+            ring.append(round(value) if key.endswith("_ms") else round(value, 1))
+            del ring[:-LATENCY_SAMPLES]
+        self._settings.setValue(f"latency/{name}", json.dumps(samples, separators=(",", ":")))
+        self.recorded.emit(name)
+
+    def sites(self) -> list:
+        # Pane workers write the same settings; pick up their samples too.
+        self._settings.sync()
+        self._settings.beginGroup("latency")
+        names = self._settings.childKeys()
+        self._settings.endGroup()
+        return names
+
+    def summary(self) -> dict:
+        """{site: {metric: {"n", "p50", "p95", "p99"}}} over the stored samples."""
+        result = {}
+        for name in self.sites():
+            samples = self.samples(name)
+            result[name] = {}
+            for key, _title in LATENCY_METRICS:
+                values = sorted(samples.get(key, []))
+                if values:
+                    result[name][key] = {"n": len(values), **{
+                        f"p{p}": percentile(values, p) for p in (50, 95, 99)
+                    }}
+        return result
+
+    def reset(self):
+        self._settings.remove("latency")
+        self.recorded.emit("")
+
+
+# ---------------------------- typing mirror ----------------------------
+
+class TypingMirror(QObject):
+    """Mirrors the input bar draft into every live pane.
+
+    Edits are coalesced and flushed at most once per frame with one small
+    script per pane, instead of replaying every key event into every view."""
+
+    latencyMeasured = Signal(float, float)   # last ms, rolling average ms
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        settings = QSettings("Ai Freesta", "Ai Freesta")
+        mode = settings.value("mirror_mode", "submit")
+        self.mode = mode if mode in MIRROR_MODES else "submit"
+        self._pending = None
+        self._first_edit = 0.0
+        self._latencies = []
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(MIRROR_FRAME_MS)
+        self._timer.timeout.connect(self.flush)
+
+    def set_mode(self, mode: str):
+        self.mode = mode
+        QSettings("Ai Freesta", "Ai Freesta").setValue("mirror_mode", mode)
+        self.cancel()
+
+    def queue(self, text: str):
+        if self.mode != "live" or len(text) > PAYLOAD_INLINE_CHARS:
+            return
+        if self._pending is None:
+            self._first_edit = time.perf_counter()
+        self._pending = text
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def cancel(self):
+        self._timer.stop()
+        self._pending = None
+
+    def flush(self):
+        if self._pending is None:
+            return
+        text, started = self._pending, self._first_edit
+        self._pending = None
+        if self.window.pool is not None:
+            self.window.pool.send({"cmd": "draft", "text": text})
+        self.apply(text, started)
+
+    def apply(self, text: str, started: float):
+        window = self.window
+        targets = [
+            (view, window.ai_sites[i]) for i, view in enumerate(window.views)
+            if i < len(window.ai_sites) and not window.hibernator.is_hibernated(view)
+        ]
+        if not targets:
+            return
+
+        # Latency is measured from the oldest keystroke in the batch until
+        # the last pane has applied the draft.
+        remaining = [len(targets)]
+
+        def applied(_ok):
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                self._record((time.perf_counter() - started) * 1000)
+
+        for view, site in targets:
+            run_runtime(view.page(), "setDraft", site["input_selector"], text, callback=applied)
+
+    def _record(self, latency_ms: float):
+        self._latencies = (self._latencies + [latency_ms])[-50:]
+        self.latencyMeasured.emit(latency_ms, sum(self._latencies) / len(self._latencies))
+
+
+# ---------------------------- prompt queue ----------------------------
+
+QUEUE_COLUMNS = [
+    ("name", "Pane"),
+    ("status", "Status"),
+    ("done", "Done"),
+    ("failed", "Failed"),
+    ("per_min", "Per min"),
+    ("avg_s", "Avg answer (s)"),
+    ("eta", "ETA"),
+]
+
+
+def read_prompt_file(path: str) -> list:
+    """Prompts from a text file (one per line) or JSONL (a string or an
+    object with a "prompt" key per line)."""
+    prompts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.lower().endswith((".jsonl", ".ndjson")):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                line = entry.get("prompt", "") if isinstance(entry, dict) else str(entry)
+            if line.strip():
+                prompts.append(line.strip())
+    return prompts
+
+
+class PromptQueue(QObject):
+    """Batch of prompts that every pane works through at its own pace.
+
+    A pane is sent its next prompt as soon as its previous answer has been
+    captured (or its send failed), so slow sites never hold up fast ones.
+    `concurrency` caps how many panes may be busy at once; 0 means all."""
+
+    progressed = Signal()
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.prompts = []
+        self.paused = False
+        self.concurrency = QSettings("Ai Freesta", "Ai Freesta").value("queue_concurrency", 0, type=int)
+        self._panes = {}   # view -> progress
+        self._runs = {}    # prompt index -> archive run token
+        self.generation = 0   # bumped by clear(), so stale run keys are ignored
+        self._held = {}    # view -> manual sends waiting for its queued prompt
+        window.capture.finished.connect(self._on_finished)
+        window.dispatcher.failed.connect(self._on_failed)
+
+    def _pane(self, view: QWebEngineView) -> dict:
+        if view not in self._panes:
+            self._panes[view] = {
+                "next": 0, "done": 0, "failed": 0, "busy": False, "manual": False,
+                "first": None, "answer_s": [],
+            }
+        return self._panes[view]
+
+    def add(self, prompts: list):
+        self.prompts += [p for p in prompts if p.strip()]
+        self.pump()
+
+    def clear(self):
+        self.prompts = []
+        self._runs = {}
+        self.generation += 1
+        for pane in self._panes.values():
+            pane.update(next=0, done=0, failed=0, first=None, answer_s=[])
+        self.progressed.emit()
+
+    def forget(self, view: QWebEngineView):
+        self._panes.pop(view, None)
+        self._held.pop(view, None)
+
+    def replace(self, old: QWebEngineView, new: QWebEngineView):
+        if old in self._panes:
+            self._panes[new] = self._panes.pop(old)
+        if old in self._held:
+            self._held[new] = self._held.pop(old)
+
+    def hold(self, view: QWebEngineView, send):
+        """Run send once the pane has answered its queued prompt, so a manual
+        send neither takes over that capture nor is counted as its answer."""
+        self._held.setdefault(view, []).append(send)
+
+    def set_paused(self, paused: bool):
+        self.paused = paused
+        self.pump()
+
+    def set_concurrency(self, concurrency: int):
+        self.concurrency = max(0, concurrency)
+        QSettings("Ai Freesta", "Ai Freesta").setValue("queue_concurrency", self.concurrency)
+        self.pump()
+
+    def is_busy(self, view: QWebEngineView) -> bool:
+        return view in self._panes and self._panes[view]["busy"]
+
+    def remaining(self) -> int:
+        views = self.window.views
+        return sum(len(self.prompts) - self._pane(v)["next"] for v in views)
+
+    def pump(self):
+        if not self.paused:
+            busy = sum(1 for v in self.window.views if self._pane(v)["busy"] or self._pane(v)["manual"])
+            # Panes furthest behind get free slots first.
+            idle = sorted(
+                (v for v in self.window.views
+                 if not self._pane(v)["busy"] and not self._pane(v)["manual"]
+                 and self._pane(v)["next"] < len(self.prompts)),
+                key=lambda v: self._pane(v)["next"],
+            )
+            for view in idle:
+                if self.concurrency and busy >= self.concurrency:
+                    break
+                self._send(view)
+                busy += 1
+        self.progressed.emit()
+
+    def _send(self, view: QWebEngineView):
+        window = self.window
+        pane = self._pane(view)
+        pane["busy"] = True
+        pane["sent_at"] = time.perf_counter()
+        if pane["first"] is None:
+            pane["first"] = pane["sent_at"]
+        site = window.ai_sites[window.views.index(view)]
+        index = pane["next"]
+        window.send_to_pane(view, site, self.prompts[index], self.run(index), queued=True)
+
+    def run(self, index: int):
+        """Archive run shared by every pane's answer to queued prompt index.
+        In a pane worker it's a key the main process resolves to its own run."""
+        window = self.window
+        if index not in self._runs:
+            if window.archive_sink is not None:
+                self._runs[index] = ["queue", self.generation, index]
+            else:
+                names = [s["name"] for s in window.ai_sites[:len(window.views)]]
+                if window.pool is not None:
+                    names += window.pool.site_names()
+                self._runs[index] = window.archive.begin_run(self.prompts[index], names)
+        return self._runs[index]
+
+    def _advance(self, view: QWebEngineView, key: str):
+        pane = self._panes.get(view)
+        if not pane:
+            return
+        if pane["busy"]:
+            pane["busy"] = False
+            pane["next"] += 1
+            pane[key] += 1
+            pane["last"] = time.perf_counter()
+            if key == "done":
+                pane["answer_s"] = (pane["answer_s"] + [time.perf_counter() - pane["sent_at"]])[-20:]
+        elif not pane["manual"]:
+            return   # a manual send to a pane with no queued prompt in flight
+        # Held manual sends go next, one at a time; later, so this answer is
+        # archived before the pane starts another one.
+        pane["manual"] = view in self._held
+        if pane["manual"]:
+            QTimer.singleShot(0, lambda v=view: self._send_held(v))
+        else:
+            QTimer.singleShot(0, self.pump)
+
+    def _send_held(self, view: QWebEngineView):
+        held = self._held.get(view)
+        if not held:
+            return   # pane closed meanwhile
+        send = held.pop(0)
+        if not held:
+            del self._held[view]
+        send()
+
+    def _on_finished(self, view: QWebEngineView, _text: str, _timings: dict):
+        self._advance(view, "done")
+
+    def _on_failed(self, view: QWebEngineView, _reason: str):
+        self._advance(view, "failed")
+
+    def snapshot(self) -> list:
+        total = len(self.prompts)
+        rows = []
+        for i, view in enumerate(self.window.views):
+            pane = self._pane(view)
+            finished = pane["done"] + pane["failed"]
+            # Rates run up to the last finished prompt, so they hold still once a pane is done.
+            elapsed = pane["last"] - pane["first"] if pane["first"] and finished else 0
+            per_min = finished / elapsed * 60 if elapsed and finished else None
+            left = total - pane["next"]
+            if pane["busy"]:
+                status = "answering" if self.window.capture.is_capturing(view) else "sending"
+            elif left > 0:
+                status = "paused" if self.paused else "waiting"
+            else:
+                status = "done" if total else "idle"
+            eta = elapsed / finished * left if finished and left else None
+            rows.append({
+                "name": self.window.ai_sites[i]["name"] if i < len(self.window.ai_sites) else "?",
+                "status": status,
+                "done": f"{pane['done']}/{total}",
+                "failed": pane["failed"],
+                "per_min": round(per_min, 1) if per_min else None,
+                "avg_s": round(sum(pane["answer_s"]) / len(pane["answer_s"]), 1) if pane["answer_s"] else None,
+                "eta": f"{int(eta // 60)}m {int(eta % 60):02d}s" if eta is not None else None,
+            })
+        return rows
+
+
+# -------------------------- engine footprint --------------------------
+
+class EngineFootprint(QObject):
+    """Samples memory and CPU of the whole app (browser process plus all
+    Chromium children) and keeps the latest numbers per preset in
+    QSettings, so presets can be compared from the toolbar."""
+
+    sampled = Signal(dict)
+
+    def __init__(self, preset: str, parent=None):
+        super().__init__(parent)
+        self.preset = preset
+        self.peak_rss = 0
+        self._first = None   # (wall time, cpu seconds) at the first sample
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.sample)
+        self._timer.start(FOOTPRINT_SAMPLE_MS)
+        self.sample()
+
+    def sample(self) -> dict:
+        footprint = engine_footprint()
+        now = time.perf_counter()
+        if self._first is None:
+            self._first = (now, footprint["cpu_seconds"])
+        wall = now - self._first[0]
+        self.peak_rss = max(self.peak_rss, footprint["rss_bytes"])
+        result = {
+            "processes": footprint["processes"],
+            "rss_mb": round(footprint["rss_bytes"] / (1024 * 1024), 1),
+            "peak_rss_mb": round(self.peak_rss / (1024 * 1024), 1),
+            # Average over the session, 100 = one core fully busy.
+            "cpu_percent": round((footprint["cpu_seconds"] - self._first[1]) / wall * 100, 1)
+            if wall > 0 else 0.0,
+        }
+        if wall > 0:
+            QSettings("Ai Freesta", "Ai Freesta").setValue(
+                f"chromium_presets/{self.preset}", json.dumps(result)
+            )
+        self.sampled.emit(result)
+        return result
+
+    @staticmethod
+    def measured(preset: str) -> dict:
+        raw = QSettings("Ai Freesta", "Ai Freesta").value(f"chromium_presets/{preset}")
+        try:
+            return json.loads(raw) if raw else {}
+        except (TypeError, ValueError):
+            return {}
+
+
+# ------------------------------ startup ------------------------------
+
+class PaneLoader(QObject):
+    """Loads pane URLs in priority order with a concurrency limit."""
+
+    paneStarted = Signal(QWebEngineView)
+    allLoaded = Signal(float)   # ms since the loader started
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        settings = QSettings("Ai Freesta", "Ai Freesta")
+        self.concurrency = max(1, settings.value("startup_concurrency", STARTUP_CONCURRENCY, type=int))
+        self._pending = {}    # view -> url, in config order
+        self._deferred = {}   # view -> url, only loaded on demand
+        self._loading = {}    # view -> (timeout timer, loadFinished connection)
+        self._started = None
+
+    def enqueue(self, view: QWebEngineView, url: str, deferred: bool = False):
+        (self._deferred if deferred else self._pending)[view] = url
+
+    def is_pending(self, view: QWebEngineView) -> bool:
+        return view in self._pending or view in self._deferred
+
+    def is_deferred(self, view: QWebEngineView) -> bool:
+        return view in self._deferred
+
+    def pending_url(self, view: QWebEngineView) -> str:
+        return self._pending.get(view) or self._deferred.get(view)
+
+    def forget(self, view: QWebEngineView):
+        self._pending.pop(view, None)
+        self._deferred.pop(view, None)
+        self._release(view)
+        self._pump()
+
+    def start(self, priority=None):
+        """Begin loading; priority(view) sorts the queue, lowest first."""
+        if priority:
+            self._pending = dict(sorted(self._pending.items(), key=lambda kv: priority(kv[0])))
+        if self._started is None:
+            self._started = time.perf_counter()
+        self._pump()
+
+    def defer(self, view: QWebEngineView):
+        """Stop waiting to load view; it loads on demand (load_now) or
+        once resumed."""
+        if view in self._pending:
+            self._deferred[view] = self._pending.pop(view)
+
+    def resume(self, view: QWebEngineView):
+        if view in self._deferred:
+            self._pending[view] = self._deferred.pop(view)
+
+    def load_now(self, view: QWebEngineView):
+        """Jump the queue, e.g. when a prompt is sent to a pane still waiting."""
+        if view in self._deferred:
+            self._pending[view] = self._deferred.pop(view)
+        if view in self._pending:
+            self._start(view)
+
+    def _pump(self):
+        if self._started is None:
+            return
+        while self._pending and len(self._loading) < self.concurrency:
+            self._start(next(iter(self._pending)))
+        if not self._pending and not self._loading:
+            started, self._started = self._started, None
+            self.allLoaded.emit((time.perf_counter() - started) * 1000)
+
+    def _start(self, view: QWebEngineView):
+        url = self._pending.pop(view)
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.timeout.connect(lambda v=view: self._done(v))
+        timer.start(STARTUP_LOAD_TIMEOUT_MS)
+        finished = view.loadFinished.connect(lambda _ok, v=view: self._done(v))
+        self._loading[view] = (timer, finished)
+        view.setUrl(QUrl(url))
+        self.paneStarted.emit(view)
+
+    def _done(self, view: QWebEngineView):
+        if view in self._loading:
+            self._release(view)
+            self._pump()
+
+    def _release(self, view: QWebEngineView):
+        timer, finished = self._loading.pop(view, (None, None))
+        if timer:
+            timer.stop()
+            timer.deleteLater()
+            # A re-queued view must not report its next load twice.
+            QObject.disconnect(finished)
+
+
+# ---------------------------- diagnostics ----------------------------
+
+def stall_log_path() -> str:
+    return os.path.join(os.path.expanduser("~"), ".aifreesta_stalls.jsonl")
+
+
+def profiles_dir() -> str:
+    return os.path.join(os.path.expanduser("~"), ".aifreesta_profiles")
+
+
+class StallWatchdog(QObject):
+    """Measures GUI event-loop latency and records what Python was doing
+    whenever the loop stalls.
+
+    The heartbeat timer notes when it last ran; a daemon thread watches
+    that time and, once the loop is overdue, samples the main thread's
+    stack until it beats again. The stall is then logged with the stacks
+    seen most often."""
+
+    stalled = Signal(dict)   # {"ts", "stall_ms", "samples", "stacks"}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        settings = QSettings("Ai Freesta", "Ai Freesta")
+        self.threshold_ms = settings.value("stall_threshold_ms", WATCHDOG_STALL_MS, type=int)
+        self.stalls = 0
+        self.worst_ms = 0.0
+        self._beat = time.monotonic()
+        self._samples = []
+        self._sampler = None
+
+        import threading
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(WATCHDOG_HEARTBEAT_MS)
+        self._timer.timeout.connect(self._on_beat)
+
+    def start(self):
+        import threading
+
+        self._beat = time.monotonic()
+        self._timer.start()
+        self._stop.clear()
+        self._sampler = threading.Thread(
+            target=self._sample_loop, args=(threading.main_thread().ident,), name="stall-sampler", daemon=True
+        )
+        self._sampler.start()
+
+    def stop(self):
+        self._timer.stop()
+        self._stop.set()
+
+    def _on_beat(self):
+        now = time.monotonic()
+        late_ms = (now - self._beat) * 1000 - WATCHDOG_HEARTBEAT_MS
+        self._beat = now
+        with self._lock:
+            samples, self._samples = self._samples, []
+        if late_ms < self.threshold_ms:
+            return
+        self.stalls += 1
+        self.worst_ms = max(self.worst_ms, late_ms)
+        stacks = {}
+        for stack in samples:
+            stacks[stack] = stacks.get(stack, 0) + 1
+        stall = {
+            "ts": time.time(),
+            "stall_ms": round(late_ms, 1),
+            "samples": len(samples),
+            "stacks": [
+                {"count": n, "stack": list(stack)}
+                for stack, n in sorted(stacks.items(), key=lambda kv: -kv[1])[:5]
+            ],
+        }
+        self._log(stall)
+        self.stalled.emit(stall)
+
+    def _sample_loop(self, ident: int):
+        import traceback
+
+        while not self._stop.wait(WATCHDOG_SAMPLE_MS / 1000):
+            if (time.monotonic() - self._beat) * 1000 - WATCHDOG_HEARTBEAT_MS < self.threshold_ms:
+                continue
+            frame = sys._current_frames().get(ident)
+            if frame is None:
+                continue
+            # Innermost frames last, like a traceback.
+            stack = tuple(
+                f"{os.path.basename(f.filename)}:{f.lineno} {f.name}"
+                for f in traceback.extract_stack(frame, limit=16)
+            )
+            del frame
+            with self._lock:
+                self._samples.append(stack)
+
+    def _log(self, stall: dict):
+        path = stall_log_path()
+        try:
+            if os.path.exists(path) and os.path.getsize(path) > WATCHDOG_LOG_MAX_BYTES:
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(stall) + "\n")
+        except OSError:
+            pass
+
+
+class ChromiumTracer(QObject):
+    """Records a Chromium trace over the DevTools protocol.
+
+    Only works when the DevTools endpoint is open (run with --profile).
+    Events are streamed straight into a Chrome trace JSON file, which
+    chrome://tracing and Perfetto open."""
+
+    finished = Signal(str)   # trace file, or "" if nothing was recorded
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.active = False
+        self._socket = None
+        self._file = None
+        self._events = 0
+
+    @staticmethod
+    def available() -> bool:
+        return bool(os.environ.get("QTWEBENGINE_REMOTE_DEBUGGING"))
+
+    def start(self, path: str):
+        from PySide6.QtNetwork import QNetworkAccessManager, QNetworkRequest
+
+        self.active = True
+        self._path = path
+        # "host:port" or just "port", as QtWebEngine accepts it.
+        address = os.environ["QTWEBENGINE_REMOTE_DEBUGGING"]
+        host, _, port = address.rpartition(":")
+        self._manager = QNetworkAccessManager(self)
+        reply = self._manager.get(QNetworkRequest(QUrl(f"http://{host or '127.0.0.1'}:{port}/json/version")))
+        reply.finished.connect(lambda: self._connect(reply))
+
+    def _connect(self, reply):
+        from PySide6.QtWebSockets import QWebSocket
+
+        try:
+            endpoint = json.loads(bytes(reply.readAll()).decode())["webSocketDebuggerUrl"]
+        except (ValueError, KeyError):
+            endpoint = None
+        reply.deleteLater()
+        if not endpoint or not self.active:
+            self._finish()
+            return
+        self._socket = QWebSocket()
+        self._socket.setParent(self)
+        self._socket.textMessageReceived.connect(self._on_message)
+        self._socket.connected.connect(lambda: self._send("Tracing.start", {
+            "transferMode": "ReportEvents",
+            "traceConfig": {"includedCategories": PROFILER_TRACE_CATEGORIES},
+        }))
+        self._socket.disconnected.connect(self._finish)
+        self._socket.open(QUrl(endpoint))
+
+    def stop(self):
+        if self._socket is not None and self.active:
+            self._send("Tracing.end", {})
+        else:
+            self._finish()
+
+    def _send(self, method: str, params: dict):
+        self._socket.sendTextMessage(json.dumps({"id": 1, "method": method, "params": params}))
+
+    def _on_message(self, message: str):
+        msg = json.loads(message)
+        if msg.get("method") == "Tracing.dataCollected":
+            if self._file is None:
+                self._file = open(self._path, "w", encoding="utf-8")
+                self._file.write('{"traceEvents": [\n')
+            for event in msg["params"]["value"]:
+                self._file.write((",\n" if self._events else "") + json.dumps(event))
+                self._events += 1
+        elif msg.get("method") == "Tracing.tracingComplete":
+            self._socket.close()
+
+    def _finish(self):
+        if not self.active:
+            return
+        self.active = False
+        path = ""
+        if self._file is not None:
+            self._file.write("\n]}\n")
+            self._file.close()
+            self._file = None
+            path = self._path
+        self._events = 0
+        if self._socket is not None:
+            self._socket.deleteLater()
+            self._socket = None
+        self.finished.emit(path)
+
+
+class ProfilerSession(QObject):
+    """cProfile of the GUI thread, the stalls seen meanwhile and, when
+    available, a Chromium trace, written to one folder on stop()."""
+
+    finished = Signal(str)   # output folder
+
+    def __init__(self, watchdog: StallWatchdog, parent=None):
+        super().__init__(parent)
+        self.watchdog = watchdog
+        self.tracer = ChromiumTracer(self)
+        self.tracer.finished.connect(self._on_trace_finished)
+        self.active = False
+        self.folder = None
+        self._profile = None
+        self._stalls = []
+        self._started = 0.0
+
+    def start(self, seconds: int = 0):
+        import cProfile
+
+        self.folder = os.path.join(profiles_dir(), time.strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(self.folder, exist_ok=True)
+        self._stalls = []
+        self.watchdog.stalled.connect(self._on_stall)
+        self._started = time.perf_counter()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        if ChromiumTracer.available():
+            self.tracer.start(os.path.join(self.folder, "chromium.json"))
+        self.active = True
+        if seconds:
+            QTimer.singleShot(seconds * 1000, lambda: self.active and self.stop())
+
+    def stop(self):
+        import pstats
+
+        if not self.active:
+            return
+        self.active = False
+        self._profile.disable()
+        self.watchdog.stalled.disconnect(self._on_stall)
+        self._profile.dump_stats(os.path.join(self.folder, "python.prof"))
+        with open(os.path.join(self.folder, "python.txt"), "w", encoding="utf-8") as f:
+            stats = pstats.Stats(self._profile, stream=f)
+            stats.sort_stats("cumulative").print_stats(60)
+        self._profile = None
+        with open(os.path.join(self.folder, "stalls.jsonl"), "w", encoding="utf-8") as f:
+            for stall in self._stalls:
+                f.write(json.dumps(stall) + "\n")
+        with open(os.path.join(self.folder, "session.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "seconds": round(time.perf_counter() - self._started, 1),
+                "stalls": len(self._stalls),
+                "worst_stall_ms": max((s["stall_ms"] for s in self._stalls), default=0),
+                "chromium_trace": self.tracer.active,
+            }, f, indent=2)
+        if self.tracer.active:
+            self.tracer.stop()   # finished once Chromium has flushed the trace
+        else:
+            self.finished.emit(self.folder)
+
+    def _on_stall(self, stall: dict):
+        self._stalls.append(stall)
+
+    def _on_trace_finished(self, _path: str):
+        if not self.active and self.folder:
+            self.finished.emit(self.folder)
+
+
+# ---------------------------- standby views ----------------------------
+
+class StandbyPool(QObject):
+    """Hidden, fully loaded views waiting to replace a pane.
+
+    Warms one view at a time, frozen once loaded so it costs memory but no
+    CPU. take() hands a ready view over; the caller wires it up and the
+    pool starts warming a replacement."""
+
+    BLANK = None   # key of the blank standby
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.size = max(0, QSettings("Ai Freesta", "Ai Freesta").value(
+            "standby_pool_size", STANDBY_POOL_SIZE, type=int))
+        self._entries = {}      # site name or BLANK -> entry
+        self._warming = None    # key being loaded
+        self._last_used = time.monotonic()
+
+        self._warm_timer = QTimer(self)
+        self._warm_timer.setSingleShot(True)
+        self._warm_timer.timeout.connect(self._warm_next)
+        self._idle_timer = QTimer(self)
+        self._idle_timer.timeout.connect(self.evict_idle)
+        self._idle_timer.start(min(STANDBY_IDLE_MS, 60000))
+
+    # -------------------- use --------------------
+
+    def touch(self):
+        """The app is in use: keep the pool topped up."""
+        self._last_used = time.monotonic()
+        self.schedule()
+
+    def schedule(self, delay_ms: int = STANDBY_WARM_DELAY_MS):
+        if self.size and not self._warm_timer.isActive() and self._warming is None:
+            self._warm_timer.start(delay_ms)
+
+    def take(self, site: dict = None):
+        """A ready standby for site (None: the blank one), or None."""
+        key = site["name"] if site else self.BLANK
+        entry = self._entries.get(key)
+        if entry is None or not entry["ready"]:
+            return None
+        del self._entries[key]
+        view = entry["view"]
+        view.page().setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        self.touch()
+        return entry
+
+    def ready_count(self) -> int:
+        return sum(1 for e in self._entries.values() if e["ready"])
+
+    def clear(self):
+        for key in list(self._entries):
+            self._drop(key)
+        self._warming = None
+
+    def evict_idle(self):
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            if entry["ready"] and (now - entry["ready_at"]) * 1000 >= STANDBY_IDLE_MS:
+                self._drop(key)
+        if (now - self._last_used) * 1000 < STANDBY_IDLE_MS:
+            self.schedule()
+
+    # -------------------- warming --------------------
+
+    def _wanted(self) -> list:
+        """Blank first, then the sites of live panes in load priority."""
+        if not self.size:
+            return []
+        window = self.window
+        keys = [self.BLANK]
+        live = [v for v in window.views if not window.hibernator.is_hibernated(v)]
+        for view in sorted(live, key=window._load_priority):
+            keys.append(window.ai_sites[window.views.index(view)]["name"])
+        return keys[:self.size]
+
+    def _over_budget(self) -> bool:
+        budget = self.window.hibernator.budget_mb
+        return bool(budget) and self.window.hibernator.total_memory() >= budget * 1024 * 1024
+
+    def _warm_next(self):
+        if (time.monotonic() - self._last_used) * 1000 >= STANDBY_IDLE_MS or self._over_budget():
+            return
+        wanted = self._wanted()
+        for key in list(self._entries):
+            if key not in wanted:
+                self._drop(key)
+        missing = [k for k in wanted if k not in self._entries]
+        if not missing:
+            return
+        key = missing[0]
+        sites = {s["name"]: s for s in self.window.ai_sites}
+        site = sites[key] if key is not self.BLANK else {"name": "", "profile": ADDED_PANES_PROFILE}
+
+        view = make_view(site, load=False)
+        view.setParent(self.window)
+        view.hide()
+        # The web channel has to be in place before the page loads.
+        self.window.capture.attach(view)
+        entry = {"view": view, "site": site, "ready": False, "ready_at": None, "blocker": None}
+        if key is not self.BLANK:
+            entry["blocker"] = install_blocker(view.page(), site)
+        self._entries[key] = entry
+        self._warming = key
+        view.loadFinished.connect(lambda ok, k=key, e=entry: self._on_loaded(k, e, ok))
+        QTimer.singleShot(STARTUP_LOAD_TIMEOUT_MS, lambda k=key, e=entry: self._on_loaded(k, e, False))
+        view.setUrl(QUrl(site["url"]) if key is not self.BLANK else QUrl("about:blank"))
+
+    def _on_loaded(self, key, entry: dict, ok: bool):
+        if self._entries.get(key) is not entry or entry["ready"]:
+            return
+        if self._warming == key:
+            self._warming = None
+        if not ok:
+            self._drop(key)
+            self.schedule()
+            return
+        entry["ready"] = True
+        entry["ready_at"] = time.monotonic()
+        entry["view"].page().setLifecycleState(QWebEnginePage.LifecycleState.Frozen)
+        self.schedule(0)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        if self._warming == key:
+            self._warming = None
+        self.window.capture.forget(entry["view"])
+        entry["view"].setParent(None)
+        entry["view"].deleteLater()
+
+
+# ------------------------------ session ------------------------------
+
+class Workspace:
+    """A named pane set with its own layout, grid and zoom.
+
+    Until it is first shown (or sent a prompt) a workspace is only its
+    saved snapshot; views, containers and splitters are created then."""
+
+    def __init__(self, name: str, snapshot: dict):
+        self.name = name
+        self.sites = list(snapshot.get("sites", []))
+        self.layout = snapshot.get("layout", "horizontal")
+        self.columns = int(snapshot.get("columns", 0))   # grid columns, 0: auto
+        self.zoom = float(snapshot.get("zoom", 1.0))
+        self.snapshot = snapshot   # urls, states and sizes to restore
+        self.views = []
+        self.engine = None         # PaneLayoutEngine, once instantiated
+        self.suspended = []        # views discarded when it was switched away
+
+    @property
+    def instantiated(self) -> bool:
+        return self.engine is not None
+
+
+def session_path() -> str:
+    return os.path.join(os.path.expanduser("~"), ".aifreesta_session.json")
+
+
+def load_session(path: str, builtin_sites: list) -> dict:
+    """Read a session snapshot, or None if there is none or it is unusable.
+    Built-in sites are stored by name and resolved against builtin_sites."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(session, dict) or session.get("version") != SESSION_VERSION:
+        return None
+    builtin = {site["name"]: site for site in builtin_sites}
+
+    def resolve(part: dict):
+        sites = []
+        for entry in part.get("sites", []):
+            if isinstance(entry, str) and entry in builtin:
+                sites.append(dict(builtin[entry]))
+            elif isinstance(entry, dict) and entry.get("name") and entry.get("url"):
+                sites.append(entry)
+        part["sites"] = sites
+        if part.get("layout") not in ("horizontal", "vertical", "grid"):
+            part.pop("layout", None)
+        if not isinstance(part.get("sizes"), dict):
+            part.pop("sizes", None)
+
+    resolve(session)
+    workspaces = [w for w in session.get("workspaces", []) if isinstance(w, dict) and w.get("name")]
+    for workspace in workspaces:
+        resolve(workspace)
+    session["workspaces"] = workspaces
+    if not session["sites"] and not workspaces:
+        return None
+    return session
+
+
+def _same_site(site: dict, builtin: dict) -> bool:
+    """site is the built-in one, apart from selector order (that is kept
+    in QSettings, see SelectorStats.with_order)."""
+    if builtin is None or site.keys() != builtin.keys():
+        return False
+    return all(
+        sorted(split_selectors(value)) == sorted(split_selectors(builtin[key]))
+        if key in SELECTOR_KEYS else value == builtin[key]
+        for key, value in site.items()
+    )
+
+
+def save_session(path: str, session: dict, builtin_sites: list):
+    builtin = {site["name"]: site for site in builtin_sites}
+
+    def compact(part: dict) -> dict:
+        part = dict(part)
+        # Built-in sites go by name, so later changes to AI_SITES apply.
+        part["sites"] = [
+            site["name"] if _same_site(site, builtin.get(site["name"])) else site for site in part["sites"]
+        ]
+        return part
+
+    session = compact(session)
+    if session.get("workspaces"):
+        session["workspaces"] = [compact(w) for w in session["workspaces"]]
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(session, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+# --------------------------- pane workers ---------------------------
+
+class IpcChannel(QObject):
+    """Newline-delimited JSON messages over a QLocalSocket."""
+
+    message = Signal(dict)
+    closed = Signal()
+
+    def __init__(self, socket, parent=None):
+        super().__init__(parent)
+        self.socket = socket
+        self._buffer = b""
+        socket.readyRead.connect(self._read)
+        socket.disconnected.connect(self.closed)
+
+    def send(self, msg: dict):
+        self.socket.write(json.dumps(msg).encode("utf-8") + b"\n")
+
+    def wait_for(self, kind: str, timeout_ms: int) -> bool:
+        """Block until an event of this kind arrives (used at shutdown,
+        when the event loop no longer runs)."""
+        seen = []
+        on_message = lambda msg: msg.get("event") == kind and seen.append(msg)
+        self.message.connect(on_message)
+        deadline = time.monotonic() + timeout_ms / 1000
+        if self.socket.bytesAvailable():
+            self._read()
+        while not seen and time.monotonic() < deadline:
+            if not self.socket.waitForReadyRead(int((deadline - time.monotonic()) * 1000)):
+                break
+            self._read()
+        self.message.disconnect(on_message)
+        return bool(seen)
+
+    def _read(self):
+        self._buffer += bytes(self.socket.readAll())
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(msg, dict):
+                self.message.emit(msg)
+
+
+class PaneWorkerPool(QObject):
+    """Main-process side: spawns one worker process per pane group and fans
+    commands out to them. Commands sent before a worker has connected are
+    queued and delivered once it says hello."""
+
+    def __init__(self, window, count: int, sites: list, session: dict):
+        super().__init__(window)
+        from PySide6.QtNetwork import QLocalServer
+
+        self.window = window
+        urls, states = session.get("urls", []), session.get("states", [])
+        size = -(-len(sites) // count)   # ceil
+        self.groups = []
+        for start in range(0, len(sites), size):
+            self.groups.append({
+                "sites": sites[start:start + size],
+                "urls": urls[start:start + size],
+                "states": states[start:start + size],
+            })
+        self._channels = {}
+        self._queued = {i: [] for i in range(len(self.groups))}
+
+        self.server = QLocalServer(self)
+        self.server_name = f"aifreesta-{os.getpid()}"
+        QLocalServer.removeServer(self.server_name)
+        self.server.newConnection.connect(self._on_connection)
+        self.server.listen(self.server_name)
+        self._processes = [self._spawn(i) for i in range(len(self.groups))]
+
+    def _spawn(self, index: int):
+        from PySide6.QtCore import QProcess
+
+        process = QProcess(self)
+        process.setProcessChannelMode(QProcess.ForwardedChannels)
+        args = ["--worker", self.server_name, "--worker-index", str(index)]
+        if _chromium_preset:
+            args += ["--chromium-preset", _chromium_preset]
+        if not getattr(sys, "frozen", False):   # packaged builds are their own interpreter
+            args.insert(0, os.path.abspath(__file__))
+        process.start(sys.executable, args)
+        return process
+
+    def site_names(self) -> list:
+        return [site["name"] for group in self.groups for site in group["sites"]]
+
+    def snapshot(self) -> dict:
+        """Sites, URLs and states of all worker panes, in group order."""
+        merged = {"sites": [], "urls": [], "states": []}
+        for group in self.groups:
+            for key in merged:
+                values = group[key]
+                if key != "sites":
+                    values = (values + [""] * len(group["sites"]))[:len(group["sites"])]
+                merged[key] += values
+        return merged
+
+    def send(self, msg: dict):
+        for index in range(len(self.groups)):
+            channel = self._channels.get(index)
+            if channel:
+                channel.send(msg)
+            elif index in self._queued:
+                self._queued[index].append(msg)
+
+    def _on_connection(self):
+        while self.server.hasPendingConnections():
+            channel = IpcChannel(self.server.nextPendingConnection(), self)
+            channel.message.connect(lambda msg, c=channel: self._on_message(c, msg))
+
+    def _on_message(self, channel: IpcChannel, msg: dict):
+        event = msg.get("event")
+        index = msg.get("index")
+        if event == "hello" and index in self._queued:
+            self._channels[index] = channel
+            channel.closed.connect(lambda i=index: self._on_closed(i))
+            channel.send({
+                "cmd": "init", **self.groups[index],
+                "zoom": self.window.zoom_level, "layout": self.window._current_layout,
+            })
+            for queued in self._queued.pop(index):
+                channel.send(queued)
+        elif event in ("session", "bye") and index in self._channels:
+            self.groups[index]["urls"] = msg.get("urls", [])
+            self.groups[index]["states"] = msg.get("states", [])
+        elif event == "answer":
+            self.window._archive_forwarded(msg)
+        elif event == "status":
+            self.window.statusBar().showMessage(msg.get("text", ""), msg.get("timeout", 4000))
+
+    def _on_closed(self, index: int):
+        if self._channels.pop(index, None) is not None:
+            self.window.statusBar().showMessage(f"⚠️ Pane worker {index + 1} exited", 5000)
+
+    def shutdown(self):
+        channels = dict(self._channels)
+        for channel in channels.values():
+            channel.send({"cmd": "quit"})
+        for channel in channels.values():
+            channel.socket.flush()
+            channel.wait_for("bye", WORKER_SHUTDOWN_MS)
+        for process in self._processes:
+            if not process.waitForFinished(WORKER_SHUTDOWN_MS):
+                process.kill()
+        self.server.close()
+
+
+class PaneWorker(QObject):
+    """Worker-process side: hosts one pane group in its own window and
+    carries out the main window's commands."""
+
+    def __init__(self, channel: IpcChannel, index: int):
+        super().__init__()
+        self.channel = channel
+        self.index = index
+        self.window = None
+        channel.message.connect(self._on_message)
+        channel.closed.connect(QApplication.instance().quit)   # main process is gone
+        QApplication.instance().aboutToQuit.connect(self._say_bye)
+        channel.send({"event": "hello", "index": index})
+
+    def _on_message(self, msg: dict):
+        cmd = msg.get("cmd")
+        window = self.window
+        if cmd == "init" and window is None:
+            session = {key: msg.get(key) for key in ("urls", "states", "zoom", "layout")}
+            session["sites"] = msg.get("sites") or []
+            self.window = window = DynamicAIWindow([], session=session, worker=True)
+            window.session_sink = self._send_session
+            window.archive_sink = self._send_answer
+            window.capture.finished.connect(self._on_answered)
+            window.dispatcher.failed.connect(self._on_failed)
+            window.show()
+        elif window is None:
+            return
+        elif cmd == "broadcast":
+            window.deliver_prompt(msg.get("text", ""), msg.get("run"))
+        elif cmd == "draft":
+            window.mirror.apply(msg.get("text", ""), time.perf_counter())
+        elif cmd == "zoom":
+            window.zoom_level = float(msg.get("level", 1.0))
+            window._apply_zoom()
+        elif cmd == "refresh":
+            window.refresh_all_panes()
+        elif cmd == "stop":
+            window.stop_all_panes()
+        elif cmd == "clear":
+            window.clear_panes()
+        elif cmd == "queue":
+            window.queue_prompts(msg.get("prompts", []))
+        elif cmd == "queue_pause":
+            window.set_queue_paused(bool(msg.get("paused")))
+        elif cmd == "queue_clear":
+            window.clear_queue()
+        elif cmd == "quit":
+            QApplication.instance().quit()
+
+    def _pane_name(self, view: QWebEngineView) -> str:
+        views = self.window.views
+        return self.window.ai_sites[views.index(view)]["name"] if view in views else "?"
+
+    def _on_answered(self, view: QWebEngineView, _text: str, timings: dict):
+        self.channel.send({"event": "status", "text": (
+            f"✅ {self._pane_name(view)} answered in {timings['total_ms'] / 1000:.1f}s "
+            f"(first text after {timings['ttft_ms'] / 1000:.1f}s)"
+        )})
+
+    def _on_failed(self, view: QWebEngineView, reason: str):
+        self.channel.send({"event": "status", "timeout": 5000,
+                           "text": f"⚠️ {self._pane_name(view)}: prompt not sent ({reason})"})
+
+    def _send_session(self, snapshot: dict, event: str = "session"):
+        self.channel.send({"event": event, "index": self.index,
+                           "urls": snapshot["urls"], "states": snapshot["states"]})
+
+    def _send_answer(self, run, pane: str, prompt: str, text: str, timings: dict, status: str):
+        self.channel.send({"event": "answer", "run": run, "pane": pane, "prompt": prompt,
+                           "text": text, "timings": timings, "status": status})
+
+    def _say_bye(self):
+        if self.window is not None:
+            self._send_session(self.window.session_snapshot(), "bye")
+        else:
+            self.channel.send({"event": "bye", "index": self.index})
+        self.channel.socket.flush()
+        self.channel.socket.waitForBytesWritten(1000)
+
+
+def run_worker(server_name: str, index: int) -> int:
+    from PySide6.QtNetwork import QLocalSocket
+
+    app = QApplication(sys.argv[:1])
+    app.setStyle("Fusion")
+    socket = QLocalSocket()
+    socket.connectToServer(server_name)
+    if not socket.waitForConnected(WORKER_CONNECT_TIMEOUT_MS):
+        return 1
+    worker = PaneWorker(IpcChannel(socket), index)
+    code = app.exec()
+    # Pages have to go before the per-site profiles they use.
+    worker.window = None
+    return code
+
+
+# ---------------------------- control API ----------------------------
+
+def _is_str_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+class ControlBridge(QObject):
+    """GUI-thread side of the control API. The server thread emits `called`
+    (a queued connection, so the call runs on the GUI thread) and gets the
+    result back through the job's deliver callback. Pane events are pushed
+    to the server as they happen."""
+
+    called = Signal(object)   # (method, params, deliver)
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.server = None
+        self.called.connect(self._execute)
+
+        capture, dispatcher = window.capture, window.dispatcher
+        capture.started.connect(lambda v: self._publish(v, "started"))
+        capture.firstToken.connect(lambda v, ms: self._publish(v, "first_token", ttft_ms=ms))
+        capture.progress.connect(lambda v, text: self._publish(v, "progress", text=text))
+        capture.finished.connect(lambda v, text, t: self._publish(v, "finished", text=text, timings=t))
+        dispatcher.acknowledged.connect(lambda v, r: self._publish(v, "sent", **r))
+        dispatcher.failed.connect(lambda v, reason: self._publish(v, "failed", reason=reason))
+
+    def _publish(self, view: QWebEngineView, event: str, **data):
+        views = self.window.views
+        if self.server is not None and view in views:
+            name = self.window.ai_sites[views.index(view)]["name"]
+            self.server.publish({"event": event, "pane": name, **data})
+
+    @Slot(object)
+    def _execute(self, job):
+        method, params, deliver = job
+        try:
+            result = getattr(self, "op_" + method)(params)
+        except Exception as e:
+            result = (500, {"error": str(e)})
+        deliver(result)
+
+    # -------------------- operations --------------------
+
+    def op_status(self, _params):
+        w = self.window
+        panes = [{
+            "name": site["name"],
+            "url": view.url().toString(),
+            "state": w.hibernator.state(view),
+            "busy": w.capture.is_capturing(view) or w.queue.is_busy(view),
+        } for site, view in zip(w.ai_sites, w.views)]
+        if w.pool is not None:
+            panes += [{"name": name, "worker": True} for name in w.pool.site_names()]
+        return 200, {
+            "panes": panes,
+            "layout": w._current_layout,
+            "workspace": w.workspace.name,
+            "queue": {"prompts": len(w.queue.prompts), "remaining": w.queue.remaining(),
+                      "paused": w.queue.paused},
+        }
+
+    def op_broadcast(self, params):
+        w = self.window
+        text = str(params.get("text", "")).strip()
+        if not text:
+            return 400, {"error": "text is required"}
+        names = params.get("panes")
+        if names is not None and not _is_str_list(names):
+            return 400, {"error": "panes must be a list of pane names"}
+        local = [site["name"] for site in w.ai_sites]
+        if names is not None:
+            unknown = [n for n in names if n not in local]
+            if unknown:
+                return 404, {"error": "unknown panes", "panes": unknown}
+
+        targets, busy = [], []
+        for site, view in zip(list(w.ai_sites), list(w.views)):
+            if names is not None and site["name"] not in names:
+                continue
+            if not params.get("force") and (w.capture.is_capturing(view) or w.queue.is_busy(view)):
+                busy.append(site["name"])
+                continue
+            targets.append((view, site))
+        sent = [site["name"] for _view, site in targets]
+        if names is None and w.pool is not None:
+            sent += w.pool.site_names()
+        # One run for the whole broadcast; pane workers file into it over IPC.
+        run = w.archive.begin_run(text, sent) if sent else None
+        for view, site in targets:
+            w.send_to_pane(view, site, text, run)
+        if names is None and w.pool is not None:
+            w.pool.send({"cmd": "broadcast", "text": text, "run": run})
+        if sent:
+            w.history.add(text, sent)
+        # Nothing sent because every target is still answering: try again later.
+        return (202 if sent else 429), {"sent": sent, "busy": busy}
+
+    def op_batch(self, params):
+        w = self.window
+        prompts = params.get("prompts")
+        if not _is_str_list(prompts):
+            return 400, {"error": "prompts must be a list of strings"}
+        prompts = [p.strip() for p in prompts if p.strip()]
+        if not prompts:
+            return 400, {"error": "prompts is required"}
+        pending = w.queue.remaining() + len(prompts) * max(1, len(w.views))
+        if pending > CONTROL_MAX_PENDING:
+            return 429, {"error": "queue full", "remaining": w.queue.remaining()}
+        w.queue_prompts(prompts)
+        return 202, {"queued": len(prompts), "remaining": w.queue.remaining()}
+
+    def op_add_pane(self, params):
+        name, url = str(params.get("name", "")).strip(), str(params.get("url", "")).strip()
+        if not url:
+            return 400, {"error": "url is required"}
+        if name in self.window.pane_names():
+            return 409, {"error": "pane exists", "name": name}
+        site = self.window.add_pane(url, name)
+        return 201, {"name": site["name"], "url": site["url"]}
+
+    def op_remove_pane(self, params):
+        name = params.get("name", "")
+        if not self.window.remove_pane(name):
+            return 404, {"error": "unknown pane", "name": name}
+        return 200, {"removed": name}
+
+    def op_layout(self, params):
+        style = params.get("layout")
+        if style not in ("horizontal", "vertical", "grid"):
+            return 400, {"error": "layout must be horizontal, vertical or grid"}
+        self.window.set_layout(style)
+        return 200, {"layout": style}
+
+
+HTTP_REASONS = {
+    200: "OK", 201: "Created", 202: "Accepted", 400: "Bad Request", 401: "Unauthorized",
+    404: "Not Found", 409: "Conflict", 413: "Payload Too Large", 429: "Too Many Requests",
+    500: "Internal Server Error", 504: "Gateway Timeout",
+}
+CONTROL_ROUTES = {
+    ("GET", "/status"): "status",
+    ("POST", "/broadcast"): "broadcast",
+    ("POST", "/batch"): "batch",
+    ("POST", "/panes"): "add_pane",
+    ("POST", "/layout"): "layout",
+}
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def ws_frame(payload: bytes, opcode: int = 1) -> bytes:
+    n = len(payload)
+    if n < 126:
+        header = bytes([0x80 | opcode, n])
+    elif n < 65536:
+        header = bytes([0x80 | opcode, 126]) + n.to_bytes(2, "big")
+    else:
+        header = bytes([0x80 | opcode, 127]) + n.to_bytes(8, "big")
+    return header + payload
+
+
+class WebSocketClient:
+    """One subscriber. Streamed text is coalesced per pane (only the newest
+    text is kept while the socket is busy); other events queue up to
+    CONTROL_WS_BACKLOG, after which the client counts as too slow."""
+
+    def __init__(self, writer, wake):
+        from collections import deque
+
+        self.writer = writer
+        self.wake = wake
+        self.panes = None          # None: all panes
+        self.events = deque()
+        self.progress = {}         # pane -> newest full text
+        self.sent_text = {}        # pane -> text the client already has
+        self.too_slow = False
+
+    def push(self, event: dict):
+        pane = event.get("pane")
+        if self.panes is not None and pane not in self.panes:
+            return
+        if event["event"] == "progress":
+            self.progress[pane] = event["text"]
+        else:
+            self.progress.pop(pane, None)   # "finished" carries the full text
+            if event["event"] in ("started", "finished"):
+                self.sent_text.pop(pane, None)
+            if len(self.events) >= CONTROL_WS_BACKLOG:
+                self.too_slow = True
+            self.events.append(event)
+        self.wake.set()
+
+    def progress_messages(self) -> list:
+        messages = []
+        for pane, text in self.progress.items():
+            previous = self.sent_text.get(pane, "")
+            if text.startswith(previous):
+                messages.append({"event": "progress", "pane": pane, "delta": text[len(previous):]})
+            else:
+                messages.append({"event": "progress", "pane": pane, "text": text, "reset": True})
+            self.sent_text[pane] = text
+        self.progress.clear()
+        return messages
+
+
+class ControlServer:
+    """Localhost HTTP + WebSocket server on its own asyncio loop.
+
+    The loop runs in a daemon thread; every operation on the window goes
+    through ControlBridge on the GUI thread, so the Qt event loop never
+    waits on a client and a slow client never touches the UI."""
+
+    def __init__(self, bridge: ControlBridge, port: int, token: str):
+        self.bridge = bridge
+        self.port = port
+        self.token = token
+        self.loop = None
+        self._server = None
+        self._clients = set()
+        self._error = None
+        bridge.server = self
+
+    def start(self):
+        import asyncio
+        import threading
+
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        threading.Thread(target=self._run, args=(ready,), name="control-api", daemon=True).start()
+        ready.wait(5)
+        if self._error is not None:
+            raise self._error
+
+    def _run(self, ready):
+        import asyncio
+
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle, "127.0.0.1", self.port)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+        except OSError as e:
+            self._error = e
+            ready.set()
+            return
+        ready.set()
+        self.loop.run_forever()
+
+    def stop(self):
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.bridge.server = None
+
+    def publish(self, event: dict):
+        """Thread-safe: hand a pane event to every subscriber."""
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self._fanout, event)
+
+    def _fanout(self, event: dict):
+        for client in list(self._clients):
+            client.push(event)
+
+    async def _call(self, method: str, params: dict):
+        import asyncio
+
+        future = self.loop.create_future()
+
+        def deliver(result):
+            self.loop.call_soon_threadsafe(lambda: future.done() or future.set_result(result))
+
+        self.bridge.called.emit((method, params, deliver))
+        try:
+            return await asyncio.wait_for(future, CONTROL_CALL_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            return 504, {"error": "the window did not answer in time"}
+
+    # -------------------- HTTP --------------------
+
+    def _authorized(self, headers: dict, query: str) -> bool:
+        token = headers.get("authorization", "").removeprefix("Bearer ").strip()
+        token = token or parse_qs(query).get("token", [""])[0]
+        # Bytes: comparing str raises TypeError for non-ASCII input.
+        return hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+
+    async def _handle(self, reader, writer):
+        import asyncio
+
+        try:
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+            lines = head.split("\r\n")
+            method, target, _version = lines[0].split(" ", 2)
+            headers = {
+                k.strip().lower(): v.strip()
+                for k, v in (line.split(":", 1) for line in lines[1:] if ":" in line)
+            }
+            path, _, query = target.partition("?")
+            if not self._authorized(headers, query):
+                await self._respond(writer, 401, {"error": "missing or wrong token"})
+                return
+            if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self._websocket(reader, writer, headers)
+                return
+
+            length = int(headers.get("content-length") or 0)
+            if length > CONTROL_MAX_BODY:
+                await self._respond(writer, 413, {"error": "body too large"})
+                return
+            body = await reader.readexactly(length) if length else b""
+            params = json.loads(body) if body else {}
+            if not isinstance(params, dict):
+                raise ValueError("body must be a JSON object")
+
+            if method == "DELETE" and path.startswith("/panes/"):
+                operation, params = "remove_pane", {"name": unquote(path[len("/panes/"):])}
+            else:
+                operation = CONTROL_ROUTES.get((method, path))
+            if operation is None:
+                await self._respond(writer, 404, {"error": f"no route for {method} {path}"})
+                return
+            status, payload = await self._call(operation, params)
+            await self._respond(writer, status, payload)
+        except ValueError as e:
+            await self._respond(writer, 400, {"error": str(e)})
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Connection: close",
+        ]
+        if status == 429:
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    # -------------------- WebSocket --------------------
+
+    async def _websocket(self, reader, writer, headers: dict):
+        import asyncio
+        import base64
+        import hashlib
+
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode("latin-1"))
+        await writer.drain()
+
+        client = WebSocketClient(writer, asyncio.Event())
+        self._clients.add(client)
+        sender = asyncio.ensure_future(self._ws_send_loop(client))
+        try:
+            while not sender.done():
+                opcode, data = await self._ws_read(reader)
+                if opcode == 8:      # close
+                    break
+                if opcode == 9:      # ping
+                    writer.write(ws_frame(data, 10))
+                elif opcode == 1:
+                    self._ws_command(client, data)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._clients.discard(client)
+            sender.cancel()
+
+    def _ws_command(self, client: WebSocketClient, data: bytes):
+        try:
+            msg = json.loads(data)
+        except ValueError:
+            return
+        if isinstance(msg, dict) and "subscribe" in msg:
+            panes = msg["subscribe"]
+            if panes in ("*", None):
+                client.panes = None
+            elif _is_str_list(panes):
+                client.panes = set(panes)
+            else:
+                # Not through push(): the pane filter would drop it.
+                client.events.append({"event": "error", "error": "subscribe takes a list of pane names or \"*\""})
+                client.wake.set()
+
+    async def _ws_read(self, reader):
+        b1, b2 = await reader.readexactly(2)
+        length = b2 & 0x7F
+        if length == 126:
+            length = int.from_bytes(await reader.readexactly(2), "big")
+        elif length == 127:
+            length = int.from_bytes(await reader.readexactly(8), "big")
+        if length > CONTROL_MAX_BODY:
+            raise ValueError("frame too large")
+        mask = await reader.readexactly(4) if b2 & 0x80 else b""
+        data = await reader.readexactly(length)
+        if mask:
+            data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+        return b1 & 0x0F, data
+
+    async def _ws_send_loop(self, client: WebSocketClient):
+        writer = client.writer
+        while True:
+            await client.wake.wait()
+            client.wake.clear()
+            if client.too_slow:
+                writer.write(ws_frame((1008).to_bytes(2, "big") + b"client too slow", 8))
+                await writer.drain()
+                writer.close()
+                return
+            # drain() is the backpressure: while a client is slow, events
+            # pile up in its queue and streamed text is coalesced.
+            while client.events:
+                writer.write(ws_frame(json.dumps(client.events.popleft()).encode("utf-8")))
+                await writer.drain()
+            for message in client.progress_messages():
+                writer.write(ws_frame(json.dumps(message).encode("utf-8")))
+                await writer.drain()
+
+
+def control_info_path() -> str:
+    return os.path.join(os.path.expanduser("~"), ".aifreesta_control.json")
 
 
 # ------------------------------ widgets ------------------------------
@@ -285,93 +4068,747 @@ class BroadcastLineEdit(QLineEdit):
         super().__init__(*args, **kwargs)
         self.parent_window = parent_window
         self.setClearButtonEnabled(True)
-        self._hist_idx = -1
+        self._hist_cursor = None   # history row id while browsing with ↑/↓
+        self.textEdited.connect(self.parent_window.mirror.queue)
 
     def keyPressEvent(self, event: QKeyEvent):
-        history = self.parent_window.prompt_history
+        history = self.parent_window.history
+        mirror = self.parent_window.mirror
 
         # Up / Down arrow: navigate history
         if event.key() == Qt.Key_Up:
-            if history and self._hist_idx < len(history) - 1:
-                self._hist_idx += 1
-                self.setText(history[self._hist_idx])
+            entry = history.before(self._hist_cursor)
+            if entry:
+                self._hist_cursor, text = entry
+                self.setText(text)
                 self.selectAll()
+                mirror.queue(self.text())
             return
 
         if event.key() == Qt.Key_Down:
-            if self._hist_idx > 0:
-                self._hist_idx -= 1
-                self.setText(history[self._hist_idx])
+            if self._hist_cursor is None:
+                return
+            entry = history.after(self._hist_cursor)
+            if entry:
+                self._hist_cursor, text = entry
+                self.setText(text)
                 self.selectAll()
-            elif self._hist_idx == 0:
-                self._hist_idx = -1
+            else:
+                self._hist_cursor = None
                 self.clear()
+            mirror.queue(self.text())
             return
 
-        # Enter: broadcast
+        # Multi-line pastes would lose their newlines here, and QLineEdit
+        # truncates at 32767 characters; open the editor instead.
+        if event.matches(QKeySequence.Paste):
+            pasted = QApplication.clipboard().text()
+            if "\n" in pasted or len(pasted) > PAYLOAD_INLINE_CHARS:
+                self.parent_window.open_prompt_editor(self.text() + pasted)
+                self.clear()
+                return
+
+        # Enter: broadcast, Ctrl+Enter: add to the prompt queue
         if event.key() in (Qt.Key_Return, Qt.Key_Enter):
             text = self.text().strip()
+            mirror.cancel()
             if text:
-                if not history or history[0] != text:
-                    history.insert(0, text)
-                    if len(history) > MAX_HISTORY:
-                        history.pop()
-                    self.parent_window._save_history()
-                    self.parent_window._refresh_completer()
-                self._hist_idx = -1
-
-                for view in self.parent_window.views:
-                    if view is None:
-                        continue
-                    target = view.focusProxy() or view
-                    ev = QKeyEvent(event.type(), event.key(), event.modifiers(),
-                                   event.text(), event.isAutoRepeat(), event.count())
-                    QApplication.postEvent(target, ev)
-
-                for i, view in enumerate(self.parent_window.views):
-                    if view is None or i >= len(self.parent_window.ai_sites):
-                        continue
-                    site = self.parent_window.ai_sites[i]
-                    view.page().runJavaScript(
-                        js_fill_and_send(text, site["input_selector"],
-                                         site["send_selector"], site["delay_ms"])
-                    )
+                history.add(text, self.parent_window.pane_names())
+                self._hist_cursor = None
+                if event.modifiers() & Qt.ControlModifier:
+                    self.parent_window.queue_prompts([text])
+                else:
+                    self.parent_window.broadcast_prompt(text)
 
             super().keyPressEvent(event)
             self.clear()
             return
 
-        # All other keys: broadcast
-        for view in self.parent_window.views:
-            if view is None:
-                continue
-            target = view.focusProxy() or view
-            ev = QKeyEvent(event.type(), event.key(), event.modifiers(),
-                           event.text(), event.isAutoRepeat(), event.count())
-            QApplication.postEvent(target, ev)
+        # All other keys only edit the draft; the typing mirror picks the
+        # change up through textEdited.
+        super().keyPressEvent(event)
+
+
+class PromptEditor(QPlainTextEdit):
+    """Multi-line prompt editor for long prompts, logs and files.
+
+    Ctrl+Enter broadcasts, Ctrl+Shift+Enter queues, Esc goes back to the
+    single-line bar. The text is handed over as is, newlines included."""
+
+    def __init__(self, parent_window, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.parent_window = parent_window
+        self.setPlaceholderText(
+            "✨ Long prompt  |  Ctrl+Enter to send  |  Ctrl+Shift+Enter to queue  |  Esc to close"
+        )
+        self.textChanged.connect(self._on_changed)
+
+    def _on_changed(self):
+        mirror = self.parent_window.mirror
+        # Checking the size first keeps big documents from being copied out
+        # on every keystroke just to be skipped by the mirror.
+        if mirror.mode == "live" and self.document().characterCount() <= PAYLOAD_INLINE_CHARS:
+            mirror.queue(self.toPlainText())
+
+    def load_file(self, path: str):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            self.setPlainText(f.read())
+
+    def keyPressEvent(self, event: QKeyEvent):
+        window = self.parent_window
+        if event.key() == Qt.Key_Escape:
+            window.close_prompt_editor()
+            return
+
+        if event.key() in (Qt.Key_Return, Qt.Key_Enter) and event.modifiers() & Qt.ControlModifier:
+            text = self.toPlainText().strip()
+            window.mirror.cancel()
+            if text:
+                # Huge prompts stay out of the history and its completer.
+                if len(text) <= PAYLOAD_INLINE_CHARS:
+                    window.history.add(text, window.pane_names())
+                if event.modifiers() & Qt.ShiftModifier:
+                    window.queue_prompts([text])
+                else:
+                    window.broadcast_prompt(text)
+            self.clear()
+            return
 
         super().keyPressEvent(event)
 
 
+class PaneContainer(QWidget):
+    """One pane: label bar, hibernation placeholder and the web view.
+
+    Created once per view and moved between splitter trees on layout
+    changes, so the view itself never has to be reparented."""
+
+    wakeRequested = Signal(object)   # view
+
+    def __init__(self, view: QWebEngineView, name: str, parent=None):
+        super().__init__(parent)
+        self.view = view
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+
+        bar = QFrame()
+        bar.setObjectName("pane_label_bar")
+        bar.setFixedHeight(26)
+        bar_layout = QHBoxLayout(bar)
+        bar_layout.setContentsMargins(8, 0, 4, 0)
+
+        self.name_label = QLabel(name)
+        self.name_label.setStyleSheet("color: #cccccc; font-size: 12px; font-weight: bold;")
+        bar_layout.addWidget(self.name_label)
+        bar_layout.addStretch()
+
+        self.state_label = QLabel()
+        self.state_label.setStyleSheet("color: #888888; font-size: 11px;")
+        bar_layout.addWidget(self.state_label)
+
+        self.placeholder = QPushButton("💤 Hibernated — click to wake")
+        self.placeholder.setObjectName("pane_placeholder")
+        self.placeholder.setMinimumWidth(MIN_PANE_WIDTH)
+        self.placeholder.hide()
+        self.placeholder.clicked.connect(lambda _checked=False: self.wakeRequested.emit(self.view))
+
+        layout.addWidget(bar)
+        layout.addWidget(self.placeholder, 1)
+        layout.addWidget(view, 1)
+
+    def set_state(self, state: str, text: str):
+        self.state_label.setText(text)
+        self.placeholder.setVisible(state != "live")
+        self.view.setVisible(state == "live")
+
+    def swap_view(self, view: QWebEngineView) -> QWebEngineView:
+        """Put view where the current one is; returns the old view."""
+        old, self.view = self.view, view
+        self.layout().replaceWidget(old, view)
+        old.setParent(None)
+        return old
+
+
+class PaneLayoutEngine:
+    """Arranges persistent pane containers into splitter trees.
+
+    Switching layouts only moves existing containers into a new tree and
+    drops the old, by then empty, splitters. Splitter sizes are remembered
+    per layout and restored while the pane count is unchanged. The grid
+    has `columns` columns, or about as many as rows when that is 0."""
+
+    def __init__(self, host_layout: QVBoxLayout):
+        self.host_layout = host_layout
+        self.root = None
+        self.style = None
+        self.columns = 0
+        self._arranged = []
+        self._sizes = {}
+
+    @staticmethod
+    def grid_columns(count: int, columns: int = 0) -> int:
+        if columns > 0:
+            return min(columns, max(1, count))
+        return max(1, math.ceil(math.sqrt(count)))
+
+    def arrange(self, containers: list, style: str, columns: int = 0):
+        if style == self.style and containers == self._arranged and columns == self.columns:
+            return
+        self.columns = columns
+        if self.root is not None:
+            self._save_sizes()
+
+        host = self.host_layout.parentWidget()
+        host.setUpdatesEnabled(False)
+        try:
+            if self.root is not None and style == self.style and style != "grid":
+                self._reorder(containers)
+            else:
+                self._replace_root(containers, style)
+            self.style = style
+            self._arranged = list(containers)
+            self._restore_sizes()
+        finally:
+            host.setUpdatesEnabled(True)
+
+    # -------------------- tree building --------------------
+
+    def _reorder(self, containers: list):
+        # Same linear layout: insertWidget() moves a container that is
+        # already in the splitter, so only out-of-place panes are touched.
+        for i, container in enumerate(containers):
+            if self.root.indexOf(container) != i:
+                self.root.insertWidget(i, container)
+
+    def _replace_root(self, containers: list, style: str):
+        old_root = self.root
+        self.root = None
+
+        if containers:
+            if style == "vertical":
+                root = QSplitter(Qt.Vertical)
+                for c in containers:
+                    root.addWidget(c)
+            elif style == "grid":
+                # Row-major: pane i goes to column i % n.
+                root = QSplitter(Qt.Horizontal)
+                n = self.grid_columns(len(containers), self.columns)
+                columns = [QSplitter(Qt.Vertical) for _ in range(n)]
+                for i, c in enumerate(containers):
+                    columns[i % n].addWidget(c)
+                for column in columns:
+                    column.setChildrenCollapsible(False)
+                    root.addWidget(column)
+            else:
+                root = QSplitter(Qt.Horizontal)
+                for c in containers:
+                    root.addWidget(c)
+            root.setChildrenCollapsible(False)
+            self.root = root
+
+        if old_root is not None:
+            # Every live container has been moved out, so this only frees
+            # the splitters themselves.
+            self.host_layout.removeWidget(old_root)
+            old_root.deleteLater()
+        if self.root is not None:
+            self.host_layout.addWidget(self.root)
+
+    # -------------------- splitter sizes --------------------
+
+    def saved_sizes(self) -> dict:
+        """Sizes per layout, including the current one: {style: [count, [sizes...]]}."""
+        if self.root is not None:
+            self._save_sizes()
+        return {style: [count, sizes] for style, (count, sizes) in self._sizes.items()}
+
+    def load_sizes(self, saved: dict):
+        self._sizes.update({style: (count, sizes) for style, (count, sizes) in saved.items()})
+
+    def _splitters(self) -> list:
+        if self.root is None:
+            return []
+        return [self.root] + [self.root.widget(i) for i in range(self.root.count())
+                              if isinstance(self.root.widget(i), QSplitter)]
+
+    def _save_sizes(self):
+        self._sizes[self.style] = (
+            len(self._arranged), [s.sizes() for s in self._splitters()]
+        )
+
+    def _restore_sizes(self):
+        saved = self._sizes.get(self.style)
+        splitters = self._splitters()
+        if saved and saved[0] == len(self._arranged) and len(saved[1]) == len(splitters):
+            for splitter, sizes in zip(splitters, saved[1]):
+                splitter.setSizes(sizes)
+        else:
+            for splitter in splitters:
+                splitter.setSizes([1] * splitter.count())
+
+
+class MetricsDock(QDockWidget):
+    """Table of PaneMetrics with on-demand and periodic export."""
+
+    def __init__(self, metrics: PaneMetrics, parent=None):
+        super().__init__("📊 Pane Metrics", parent)
+        self.metrics = metrics
+        self.setObjectName("metrics_dock")
+
+        body = QWidget()
+        layout = QVBoxLayout(body)
+        layout.setContentsMargins(6, 6, 6, 6)
+
+        self.table = QTableWidget(0, len(METRIC_COLUMNS))
+        self.table.setHorizontalHeaderLabels([title for _, title in METRIC_COLUMNS])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        export_btn = QPushButton("Export…")
+        export_btn.clicked.connect(self._export_now)
+        buttons.addWidget(export_btn)
+        self.auto_export = QCheckBox()
+        self.auto_export.setChecked(bool(metrics.export_path))
+        self.auto_export.toggled.connect(self._toggle_auto_export)
+        buttons.addWidget(self.auto_export)
+        buttons.addStretch()
+        layout.addLayout(buttons)
+        self._update_auto_export_label()
+
+        self.setWidget(body)
+        metrics.updated.connect(self.refresh)
+        self.visibilityChanged.connect(metrics.set_sampling)
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        rows = self.metrics.snapshot()
+        self.table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, (key, _title) in enumerate(METRIC_COLUMNS):
+                value = row[key]
+                self.table.setItem(r, c, QTableWidgetItem("—" if value is None else str(value)))
+
+    def _ask_path(self) -> str:
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export Pane Metrics", os.path.expanduser("~/aifreesta_metrics.json"),
+            "JSON (*.json);;CSV (*.csv)"
+        )
+        return path
+
+    def _export_now(self):
+        path = self._ask_path()
+        if not path:
+            return
+        try:
+            self.metrics.export(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Export failed", str(e))
+
+    def _toggle_auto_export(self, on: bool):
+        if on:
+            path = self.metrics.export_path or self._ask_path()
+            if not path:
+                self.auto_export.setChecked(False)
+                return
+            self.metrics.set_export(path)
+        else:
+            self.metrics.set_export("")
+        self._update_auto_export_label()
+
+    def _update_auto_export_label(self):
+        text = f"Auto-export every {self.metrics.export_interval_s} s"
+        if self.metrics.export_path:
+            text += f" to {os.path.basename(self.metrics.export_path)}"
+        self.auto_export.setText(text)
+
+
+class QueueDock(QDockWidget):
+    """Prompt queue controls and per-pane progress."""
+
+    def __init__(self, window, parent=None):
+        super().__init__("📋 Prompt Queue", parent)
+        self.window = window
+        self.queue = window.queue
+        self.setObjectName("queue_dock")
+
+        body = QWidget()
+        layout = QVBoxLayout(body)
+        layout.setContentsMargins(6, 6, 6, 6)
+
+        self.summary = QLabel()
+        layout.addWidget(self.summary)
+
+        self.table = QTableWidget(0, len(QUEUE_COLUMNS))
+        self.table.setHorizontalHeaderLabels([title for _, title in QUEUE_COLUMNS])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        load_btn = QPushButton("Load…")
+        load_btn.clicked.connect(self._load)
+        buttons.addWidget(load_btn)
+        self.pause_btn = QPushButton("⏸ Pause")
+        self.pause_btn.setCheckable(True)
+        self.pause_btn.toggled.connect(self._toggle_pause)
+        buttons.addWidget(self.pause_btn)
+        clear_btn = QPushButton("Clear")
+        clear_btn.clicked.connect(window.clear_queue)
+        buttons.addWidget(clear_btn)
+        buttons.addWidget(QLabel("Max busy panes (0 = all):"))
+        self.concurrency = QSpinBox()
+        self.concurrency.setRange(0, 64)
+        self.concurrency.setValue(self.queue.concurrency)
+        self.concurrency.valueChanged.connect(self.queue.set_concurrency)
+        buttons.addWidget(self.concurrency)
+        buttons.addStretch()
+        layout.addLayout(buttons)
+
+        self.setWidget(body)
+        self.queue.progressed.connect(self.refresh)
+        # ETAs and rates move even when no pane finishes.
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self.visibilityChanged.connect(lambda on: self._timer.start(1000) if on else self._timer.stop())
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        rows = self.queue.snapshot()
+        self.table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, (key, _title) in enumerate(QUEUE_COLUMNS):
+                value = row[key]
+                self.table.setItem(r, c, QTableWidgetItem("—" if value is None else str(value)))
+        state = "paused" if self.queue.paused else "running"
+        self.summary.setText(
+            f"{len(self.queue.prompts)} prompts × {len(rows)} panes — "
+            f"{self.queue.remaining()} sends left ({state})"
+        )
+
+    def _load(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Load Prompts", os.path.expanduser("~"), "Prompts (*.txt *.jsonl *.ndjson);;All files (*)"
+        )
+        if not path:
+            return
+        try:
+            prompts = read_prompt_file(path)
+        except (OSError, UnicodeDecodeError) as e:
+            QMessageBox.warning(self, "Load failed", str(e))
+            return
+        self.window.queue_prompts(prompts)
+
+    def _toggle_pause(self, paused: bool):
+        self.pause_btn.setText("▶ Resume" if paused else "⏸ Pause")
+        self.window.set_queue_paused(paused)
+
+
+class ArchiveDock(QDockWidget):
+    """Search past broadcasts and read the panes' answers side by side."""
+
+    exported = Signal(int, str)   # runs written, path or error
+
+    def __init__(self, window, parent=None):
+        super().__init__("🗄 Archive", parent)
+        self.window = window
+        self.archive = window.archive
+        self.setObjectName("archive_dock")
+        self._runs = []
+        self._exhausted = True
+
+        body = QWidget()
+        layout = QVBoxLayout(body)
+        layout.setContentsMargins(6, 6, 6, 6)
+
+        top = QHBoxLayout()
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("🔍 Search prompts and answers")
+        self.search.setClearButtonEnabled(True)
+        top.addWidget(self.search, 1)
+        self.summary = QLabel()
+        top.addWidget(self.summary)
+        record = QCheckBox("Record")
+        record.setChecked(self.archive.enabled)
+        record.toggled.connect(self._set_recording)
+        top.addWidget(record)
+        export_btn = QPushButton("Export JSONL…")
+        export_btn.clicked.connect(self._export)
+        top.addWidget(export_btn)
+        layout.addLayout(top)
+
+        split = QSplitter(Qt.Vertical)
+        self.table = QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(["When", "Prompt", "Answers"])
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        self.table.itemSelectionChanged.connect(self._show_selected)
+        self.table.verticalScrollBar().valueChanged.connect(self._maybe_fetch_more)
+        split.addWidget(self.table)
+        self.answers = QSplitter(Qt.Horizontal)
+        split.addWidget(self.answers)
+        layout.addWidget(split)
+
+        self.setWidget(body)
+
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(250)
+        self._search_timer.timeout.connect(self.reload)
+        self.search.textChanged.connect(self._search_timer.start)
+        self.visibilityChanged.connect(lambda on: on and self.reload())
+        self.exported.connect(self._on_exported)
+
+    def reload(self):
+        if not self.isVisible():
+            return
+        self._runs = []
+        self._exhausted = False
+        self.table.setRowCount(0)
+        self._fetch_more()
+        self.summary.setText(f"{self.archive.count()} runs")
+
+    def _maybe_fetch_more(self, value: int):
+        if value >= self.table.verticalScrollBar().maximum() - 2:
+            self._fetch_more()
+
+    def _fetch_more(self):
+        if self._exhausted:
+            return
+        before = self._runs[-1]["id"] if self._runs else None
+        page = self.archive.search(self.search.text(), ARCHIVE_PAGE_SIZE, before)
+        self._exhausted = len(page) < ARCHIVE_PAGE_SIZE
+        first = len(self._runs)
+        self._runs += page
+        self.table.setRowCount(len(self._runs))
+        for r, run in enumerate(page, first):
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["ts"]))
+            prompt = " ".join(run["prompt"].split())
+            self.table.setItem(r, 0, QTableWidgetItem(when))
+            self.table.setItem(r, 1, QTableWidgetItem(prompt[:200]))
+            self.table.setItem(r, 2, QTableWidgetItem(f"{run['answers']}/{len(run['targets'])}"))
+
+    def _show_selected(self):
+        rows = self.table.selectionModel().selectedRows()
+        for i in reversed(range(self.answers.count())):
+            column = self.answers.widget(i)
+            column.setParent(None)
+            column.deleteLater()
+        if not rows:
+            return
+        run = self.archive.run(self._runs[rows[0].row()]["id"])
+        if run is None:
+            return
+        columns = [("🗨 Prompt", run["prompt"])]
+        for answer in run["answers"]:
+            timing = f" · {answer['total_ms'] / 1000:.1f}s" if answer["total_ms"] else ""
+            columns.append((f"{answer['pane']} ({answer['status']}{timing})", answer["text"]))
+        for title, text in columns:
+            column = QWidget()
+            column_layout = QVBoxLayout(column)
+            column_layout.setContentsMargins(0, 0, 0, 0)
+            label = QLabel(title)
+            label.setStyleSheet("color: #cccccc; font-weight: bold;")
+            column_layout.addWidget(label)
+            view = QPlainTextEdit(text)
+            view.setReadOnly(True)
+            column_layout.addWidget(view)
+            self.answers.addWidget(column)
+
+    def _set_recording(self, on: bool):
+        self.archive.enabled = on
+        QSettings("Ai Freesta", "Ai Freesta").setValue("archive_enabled", on)
+
+    def _export(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export Archive", os.path.expanduser("~/aifreesta_archive.jsonl"), "JSON Lines (*.jsonl)"
+        )
+        if not path:
+            return
+        import threading
+
+        query = self.search.text()
+
+        def export():
+            try:
+                self.exported.emit(self.archive.export_jsonl(path, query), path)
+            except Exception as e:
+                self.exported.emit(-1, str(e))
+
+        threading.Thread(target=export, name="archive-export", daemon=True).start()
+        self.window.statusBar().showMessage("🗄 Exporting archive…", 2000)
+
+    def _on_exported(self, runs: int, detail: str):
+        if runs < 0:
+            QMessageBox.warning(self, "Export failed", detail)
+            return
+        self.window.statusBar().showMessage(f"🗄 {runs} runs exported to {detail}", 4000)
+
+
+class LatencyDock(QDockWidget):
+    """Compares sites on one latency metric: percentiles over the stored
+    samples and a histogram drawn on shared bounds."""
+
+    def __init__(self, stats: LatencyStats, parent=None):
+        super().__init__("⏱ Latency", parent)
+        self.stats = stats
+        self.setObjectName("latency_dock")
+
+        body = QWidget()
+        layout = QVBoxLayout(body)
+        layout.setContentsMargins(6, 6, 6, 6)
+
+        row = QHBoxLayout()
+        self.metric = QComboBox()
+        for _key, title in LATENCY_METRICS:
+            self.metric.addItem(title)
+        self.metric.currentIndexChanged.connect(self.refresh)
+        row.addWidget(self.metric)
+        row.addWidget(QLabel(f"last {LATENCY_SAMPLES} sends per site"))
+        row.addStretch()
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self._reset)
+        row.addWidget(reset_btn)
+        layout.addLayout(row)
+
+        self.table = QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(["Site", "Samples", "p50", "p95", "p99", "Histogram"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        self.setWidget(body)
+        stats.recorded.connect(self.refresh)
+        # Pane workers record in their own processes.
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self.visibilityChanged.connect(lambda on: self._timer.start(5000) if on else self._timer.stop())
+        self.visibilityChanged.connect(lambda on: on and self.refresh())
+
+    def refresh(self, *_args):
+        if not self.isVisible():
+            return
+        key = LATENCY_METRICS[self.metric.currentIndex()][0]
+        rows = []
+        for name in self.stats.sites():
+            values = sorted(self.stats.samples(name).get(key, []))
+            if values:
+                rows.append((name, values))
+        # Best first: lowest times, highest rate.
+        rows.sort(key=lambda r: percentile(r[1], 50), reverse=key == "chars_per_s")
+        lo = min((values[0] for _n, values in rows), default=0)
+        hi = max((values[-1] for _n, values in rows), default=0)
+        self.table.horizontalHeaderItem(5).setText(f"Histogram ({lo:g} … {hi:g}, log)" if rows else "Histogram")
+
+        mono = QFontDatabase.systemFont(QFontDatabase.FixedFont)
+        self.table.setRowCount(len(rows))
+        for r, (name, values) in enumerate(rows):
+            cells = [name, len(values)] + [percentile(values, p) for p in (50, 95, 99)]
+            for c, value in enumerate(cells):
+                self.table.setItem(r, c, QTableWidgetItem(str(value)))
+            item = QTableWidgetItem(histogram(values, lo, hi))
+            item.setFont(mono)
+            self.table.setItem(r, 5, item)
+
+    def _reset(self):
+        if QMessageBox.question(self, "Reset latency", "Forget all latency samples?") == QMessageBox.Yes:
+            self.stats.reset()
+
+
 # --------------------------- main window -----------------------------
 
 class DynamicAIWindow(QMainWindow):
-    def __init__(self, ai_sites):
+    def __init__(self, ai_sites, session: dict = None, workers: int = 0, worker: bool = False):
         super().__init__()
 
         self.setWindowTitle("🤖 Ai Freesta - Multi-AI Chat Interface")
         self.resize(1800, 950)
 
-        self.ai_sites = ai_sites.copy()
-        self.views = []
-        self.zoom_level = 1.0
+        self.session = session or {}
+        sites = self.session.get("sites") or ai_sites.copy()
+        self.worker = worker
+        self.session_sink = None   # set in worker processes, see PaneWorker
+        self.archive_sink = None   # likewise: answers are archived by the main process
+        self.pool = None
+        if workers > 0 and sites:
+            # All configured panes move to worker processes; panes added
+            # later with ➕ live in this window.
+            self.pool = PaneWorkerPool(self, workers, sites, self.session)
+            sites = []
+        # Workspaces only apply to panes hosted by this window.
+        saved = self.session.get("workspaces") if self.pool is None and not worker else None
+        if saved:
+            self.workspaces = [Workspace(w["name"], w) for w in saved]
+            active = self.session.get("workspace", 0)
+        else:
+            keys = ("urls", "states", "layout", "sizes", "zoom")
+            main = {key: self.session[key] for key in keys if key in self.session}
+            self.workspaces = [Workspace("Main", dict(main, sites=sites))]
+            active = 0
+        self.workspace = self.workspaces[active if 0 <= active < len(self.workspaces) else 0]
+        self.broadcast_to = set(self.session.get("broadcast_to", []))   # other workspaces
         self._always_on_top = False
-        self.prompt_history: list = []
-        self._current_layout = "horizontal"
+        self._containers = {}
+        self.blockers = {}
+        self.control = None
+
+        self.hibernator = PaneHibernator(self)
+        self.hibernator.stateChanged.connect(self._on_pane_state_changed)
+        self.hibernator.memoryChecked.connect(self._on_memory_checked)
+
+        self.mirror = TypingMirror(self)
+        self.mirror.latencyMeasured.connect(self._on_mirror_latency)
+
+        self.capture = ResponseCapture(self)
+        self.capture.finished.connect(self._on_response_finished)
+
+        self.dispatcher = BroadcastDispatcher(self)
+        self.dispatcher.failed.connect(self._on_dispatch_failed)
+
+        self.startup_timings = {}
+        self.footprint = EngineFootprint(_chromium_preset or "custom", self)
+        self.watchdog = StallWatchdog(self)
+        self.watchdog.stalled.connect(self._on_stall)
+        self.profiler = ProfilerSession(self.watchdog, self)
+        self.profiler.finished.connect(
+            lambda folder: self.statusBar().showMessage(f"🔬 Profile saved to {folder}", 8000)
+        )
+        self.loader = PaneLoader(self)
+        self.loader.paneStarted.connect(self._on_pane_load_started)
+        self.loader.allLoaded.connect(self._on_all_panes_loaded)
+
+        self.queue = PromptQueue(self)
+        self.standby = StandbyPool(self)
+
+        self.metrics = PaneMetrics(self)
+        self.dispatcher.acknowledged.connect(lambda v, _r: self.metrics.count(v, "acked"))
+        self.dispatcher.failed.connect(lambda v, _r: self.metrics.count(v, "failed"))
+        QApplication.instance().focusChanged.connect(self._on_focus_changed)
 
         self.setStyleSheet(DARK_STYLESHEET)
         self._set_app_icon()
-        self._load_history()
+        self.history = PromptHistory(self._history_path(), legacy_path=self._legacy_history_path())
+        self.archive = ConversationArchive(archive_path())
+        self._pane_runs = {}   # view -> (archive run token, pane name, prompt)
+        self.capture.finished.connect(self._archive_answer)
+        self.capture.finished.connect(self._resuspend)
+        self.dispatcher.failed.connect(self._resuspend)
+        self.latency = LatencyStats(self)
+        self.dispatcher.acknowledged.connect(self.latency.on_acknowledged)
+        self.dispatcher.failed.connect(self.latency.forget)
+        self.capture.finished.connect(self.latency.on_finished)
+        self.dispatcher.failed.connect(lambda view, reason: self._archive_answer(view, "", {}, "failed"))
 
         # Central widget
         self.central = QWidget()
@@ -383,6 +4820,9 @@ class DynamicAIWindow(QMainWindow):
 
         # Status bar
         self.status_label = QLabel()
+        self.mirror_label = QLabel()
+        self.mirror_label.setStyleSheet("color: #888888;")
+        self.statusBar().addPermanentWidget(self.mirror_label)
         self.statusBar().addPermanentWidget(self.status_label)
         self.statusBar().setStyleSheet(
             "QStatusBar { background-color: #2d2d30; color: #ffffff; border-top: 1px solid #3e3e42; }"
@@ -404,19 +4844,58 @@ class DynamicAIWindow(QMainWindow):
         # Input row
         self._create_input_row()
 
+        self.viewport = ViewportThrottler(self, self.scroll_area)
+        self.viewport.changed.connect(self._on_viewport_changed)
+        self.capture.finished.connect(self.viewport.schedule)
+        self.dispatcher.failed.connect(self.viewport.schedule)
+
+        # Metrics dock (hidden until toggled from the toolbar)
+        self.metrics_dock = MetricsDock(self.metrics, self)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.metrics_dock)
+        self.metrics_dock.hide()
+
+        self.queue_dock = QueueDock(self, self)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.queue_dock)
+        self.queue_dock.hide()
+
+        self.archive_dock = ArchiveDock(self, self)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.archive_dock)
+        self.archive_dock.hide()
+
+        self.latency_dock = LatencyDock(self.latency, self)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.latency_dock)
+        self.latency_dock.hide()
+
         # Toolbar
-        self.current_root_splitter = None
         self._create_toolbar()
 
         # Keyboard shortcuts
         self._setup_shortcuts()
 
         # Build
-        self._initialize_views()
+        self._instantiate(self.workspace)
         self._rebuild_layout()
         self._update_status()
 
-        self.show_startup_notice_once()
+        if self.worker:
+            names = ", ".join(site["name"] for site in self.ai_sites)
+            self.setWindowTitle(f"🤖 Ai Freesta — {names}")
+            self.toolbar.hide()
+            self.input_edit.hide()
+            for button in self.input_buttons:
+                button.hide()
+        elif self.pool is not None:
+            # Controller only: the panes are in the worker windows.
+            self.scroll_area.hide()
+            self.resize(1100, 160)
+
+        self._session_timer = QTimer(self)
+        self._session_timer.timeout.connect(self.save_session)
+        self._session_timer.start(SESSION_SAVE_MS)
+
+        # Panes, the history database and the notice wait until the window
+        # has been painted once.
+        QTimer.singleShot(0, self._after_first_show)
 
     # -------------------- setup helpers --------------------
 
@@ -428,31 +4907,323 @@ class DynamicAIWindow(QMainWindow):
                 QApplication.instance().setWindowIcon(icon)
                 break
 
-    def _initialize_views(self):
-        for site in self.ai_sites:
-            view = make_view(site["url"], mobile=site["mobile"])
-            self.views.append(view)
+    # -------------------- workspaces --------------------
+    # Everything else works on the active workspace's panes through these.
+
+    @property
+    def views(self) -> list:
+        return self.workspace.views
+
+    @property
+    def ai_sites(self) -> list:
+        return self.workspace.sites
+
+    @property
+    def layout_engine(self) -> PaneLayoutEngine:
+        return self.workspace.engine
+
+    @property
+    def zoom_level(self) -> float:
+        return self.workspace.zoom
+
+    @zoom_level.setter
+    def zoom_level(self, level: float):
+        self.workspace.zoom = level
+
+    @property
+    def _current_layout(self) -> str:
+        return self.workspace.layout
+
+    @_current_layout.setter
+    def _current_layout(self, style: str):
+        self.workspace.layout = style
+
+    def _instantiate(self, ws: Workspace):
+        """Create a workspace's views. Only the active workspace loads
+        them; a background one only loads panes that are sent a prompt."""
+        ws.engine = PaneLayoutEngine(self.splitter_layout)
+        ws.engine.load_sizes(ws.snapshot.get("sizes", {}))
+        urls = ws.snapshot.get("urls", [])
+        states = ws.snapshot.get("states", [])
+        active = ws is self.workspace
+        ws.sites[:] = [self.dispatcher.selector_stats.with_order(site) for site in ws.sites]
+        for i, site in enumerate(ws.sites):
+            view = make_view(site, load=False)
+            if ws.zoom != 1.0:
+                view.setZoomFactor(ws.zoom)
+            self._register_view(view, site)
+            url = urls[i] if i < len(urls) and urls[i] else site["url"]
+            # Panes that were hibernated when the session was saved stay
+            # unloaded until they are focused or sent a prompt.
+            hibernated = i < len(states) and states[i] in ("frozen", "discarded")
+            self.loader.enqueue(view, url, deferred=hibernated or not active)
+            ws.views.append(view)
+        if not active:
+            self._arrange(ws)
+            if ws.engine.root is not None:
+                ws.engine.root.hide()
+
+    def _arrange(self, ws: Workspace):
+        containers = [self._pane_container(view, site["name"]) for view, site in zip(ws.views, ws.sites)]
+        ws.engine.arrange(containers, ws.layout, ws.columns)
+
+    def _workspace_of(self, view: QWebEngineView) -> Workspace:
+        return next((ws for ws in self.workspaces if view in ws.views), None)
+
+    def switch_workspace(self, index: int):
+        target = self.workspaces[index]
+        old = self.workspace
+        if target is old:
+            return
+        started = time.perf_counter()
+        self._suspend(old)
+        self.workspace = target
+        if not target.instantiated:
+            self._instantiate(target)
+        else:
+            for view in target.suspended:
+                self.hibernator.wake(view)
+            target.suspended = []
+            for view in target.views:
+                self.loader.resume(view)
+        self._rebuild_layout()
+        if target.engine.root is not None:
+            target.engine.root.show()
+        if any(self.loader.is_pending(v) and not self.loader.is_deferred(v) for v in self.views):
+            self.loader.start(self._load_priority)
+
+        self.workspace_combo.blockSignals(True)
+        self.workspace_combo.setCurrentIndex(index)
+        self.workspace_combo.blockSignals(False)
+        self.layout_combo.blockSignals(True)
+        self.layout_combo.setCurrentIndex(["horizontal", "vertical", "grid"].index(self._current_layout))
+        self.layout_combo.blockSignals(False)
+        self._update_placeholder()
+        self._update_status()
+        self.standby.schedule()
+        self.statusBar().showMessage(
+            f"🗂 {target.name} ({(time.perf_counter() - started) * 1000:.0f} ms)", 2000
+        )
+
+    def _suspend(self, ws: Workspace):
+        """Hide a workspace and discard its renderers. Panes still busy
+        with a prompt are discarded once they have answered."""
+        if ws.engine is not None and ws.engine.root is not None:
+            ws.engine.root.hide()
+        for view in ws.views:
+            self.viewport.forget(view)
+            if self.loader.is_pending(view):
+                self.loader.defer(view)
+            elif not self._busy(view):
+                self._discard(view, ws)
+
+    def _busy(self, view: QWebEngineView) -> bool:
+        return self.capture.is_capturing(view) or self.queue.is_busy(view)
+
+    def _discard(self, view: QWebEngineView, ws: Workspace):
+        # Only panes that were live come back live; hibernated ones stay so.
+        if not self.hibernator.is_hibernated(view) and view not in ws.suspended:
+            ws.suspended.append(view)
+        page = view.page()
+        if page.lifecycleState() == QWebEnginePage.LifecycleState.Active:
+            self.hibernator.hibernate(view, QWebEnginePage.LifecycleState.Frozen)
+        if page.lifecycleState() == QWebEnginePage.LifecycleState.Frozen:
+            self.hibernator.hibernate(view, QWebEnginePage.LifecycleState.Discarded)
+
+    def _resuspend(self, view: QWebEngineView, *_args):
+        """A background workspace's pane has answered: discard it again."""
+        ws = self._workspace_of(view)
+        if ws is not None and ws is not self.workspace and not self._busy(view):
+            QTimer.singleShot(0, lambda: ws is not self.workspace and self._discard(view, ws))
+
+    def _target_panes(self) -> list:
+        """(view, site) for the active workspace and the ones in broadcast_to."""
+        panes = []
+        for ws in self.workspaces:
+            if ws is not self.workspace and ws.name not in self.broadcast_to:
+                continue
+            if not ws.instantiated:
+                self._instantiate(ws)
+            panes += [(v, s) for v, s in zip(ws.views, ws.sites) if v]
+        return panes
+
+    def new_workspace(self):
+        name, ok = QInputDialog.getText(self, "New Workspace", "Workspace name:")
+        name = name.strip()
+        if not ok or not name:
+            return
+        if any(ws.name == name for ws in self.workspaces):
+            QMessageBox.warning(self, "New Workspace", f"There is already a workspace called {name}.")
+            return
+        known = {}
+        for site in AI_SITES + [s for ws in self.workspaces for s in ws.sites]:
+            known.setdefault(site["name"], site)
+        chosen = self._pick_names("New Workspace", f"Panes in {name}:", list(known), [])
+        if chosen is None:
+            return
+        self.workspaces.append(Workspace(name, {"sites": [dict(known[n]) for n in chosen]}))
+        self.workspace_combo.addItem(f"🗂 {name}")
+        self.switch_workspace(len(self.workspaces) - 1)
+
+    def rename_workspace(self):
+        name, ok = QInputDialog.getText(self, "Rename Workspace", "Workspace name:", text=self.workspace.name)
+        name = name.strip()
+        if not ok or not name or any(ws.name == name for ws in self.workspaces):
+            return
+        if self.workspace.name in self.broadcast_to:
+            self.broadcast_to.discard(self.workspace.name)
+            self.broadcast_to.add(name)
+        self.workspace.name = name
+        self.workspace_combo.setItemText(self.workspaces.index(self.workspace), f"🗂 {name}")
+
+    def delete_workspace(self):
+        if len(self.workspaces) < 2:
+            return
+        ws = self.workspace
+        reply = QMessageBox.question(
+            self, "Delete Workspace", f"Close all panes in {ws.name} and delete it?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        index = self.workspaces.index(ws)
+        self.switch_workspace(1 if index == 0 else index - 1)
+        for view in list(ws.views):
+            self._dispose_view(view)
+        if ws.engine is not None and ws.engine.root is not None:
+            self.splitter_layout.removeWidget(ws.engine.root)
+            ws.engine.root.deleteLater()
+        self.workspaces.remove(ws)
+        self.broadcast_to.discard(ws.name)
+        self.workspace_combo.removeItem(index)
+
+    def set_grid_columns(self):
+        columns, ok = QInputDialog.getInt(
+            self, "Grid Columns", "Columns in the grid layout (0 = automatic, about square):",
+            self.workspace.columns, 0, 16
+        )
+        if ok:
+            self.workspace.columns = columns
+            self._rebuild_layout("grid")
+            self.layout_combo.setCurrentIndex(2)
+
+    def choose_broadcast_workspaces(self):
+        others = [ws.name for ws in self.workspaces if ws is not self.workspace]
+        if not others:
+            QMessageBox.information(self, "Broadcast To", "There is only one workspace.")
+            return
+        chosen = self._pick_names(
+            "Broadcast To", f"Besides {self.workspace.name}, also send prompts to:",
+            others, [n for n in others if n in self.broadcast_to]
+        )
+        if chosen is not None:
+            self.broadcast_to = (self.broadcast_to - set(others)) | set(chosen)
+            self._update_placeholder()
+
+    def _pick_names(self, title: str, label: str, names: list, checked: list):
+        """Checklist dialog; the ticked names, or None if cancelled."""
+        dialog = QDialog(self)
+        dialog.setWindowTitle(title)
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel(label))
+        items = QListWidget()
+        for name in names:
+            item = QListWidgetItem(name)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if name in checked else Qt.Unchecked)
+            items.addItem(item)
+        layout.addWidget(items)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        if dialog.exec() != QDialog.Accepted:
+            return None
+        return [items.item(i).text() for i in range(items.count())
+                if items.item(i).checkState() == Qt.Checked]
+
+    # -------------------- startup --------------------
+
+    def _after_first_show(self):
+        interactive_ms = (time.perf_counter() - PROCESS_STARTED) * 1000
+        self.startup_timings["interactive_ms"] = interactive_ms
+        self.statusBar().showMessage(f"⚡ Interactive in {interactive_ms:.0f} ms — loading panes…", 3000)
+        self.loader.start(self._load_priority)
+        self.viewport.schedule()
+        if QSettings("Ai Freesta", "Ai Freesta").value("stall_watchdog", True, type=bool):
+            self.watchdog.start()
+        if self.worker:
+            return
+        QTimer.singleShot(0, self.history.count)   # opens the database
+        QTimer.singleShot(0, self.show_startup_notice_once)
+
+    def _load_priority(self, view: QWebEngineView) -> tuple:
+        """Visible panes first, then the most recently focused, then config order."""
+        container = self._containers.get(view)
+        visible = bool(container and not container.visibleRegion().isEmpty())
+        name = self.ai_sites[self.views.index(view)]["name"]
+        recent = QSettings("Ai Freesta", "Ai Freesta").value("recent_panes", []) or []
+        if isinstance(recent, str):
+            recent = [recent]
+        rank = recent.index(name) if name in recent else len(recent)
+        return (not visible, rank, self.views.index(view))
+
+    def _on_pane_load_started(self, view: QWebEngineView):
+        self.viewport.schedule()
+        container = self._containers.get(view)
+        if container:
+            container.state_label.setText(self._pane_state_text(view))
+
+    # -------------------- diagnostics --------------------
+
+    def _on_stall(self, stall: dict):
+        where = stall["stacks"][0]["stack"][-1] if stall["stacks"] else "outside Python (Qt/Chromium)"
+        self.statusBar().showMessage(f"🐢 UI stalled {stall['stall_ms']:.0f} ms — {where}", 5000)
+
+    def toggle_profiling(self):
+        if self.profiler.active:
+            self.profiler.stop()
+            self.statusBar().showMessage("🔬 Profiling stopped — writing results…", 3000)
+            return
+        self.profiler.start()
+        trace = "" if ChromiumTracer.available() else " (no Chromium trace: start with --profile)"
+        self.statusBar().showMessage(f"🔬 Profiling… Ctrl+Shift+P to stop{trace}", 5000)
+
+    def _on_all_panes_loaded(self, elapsed_ms: float):
+        total_ms = (time.perf_counter() - PROCESS_STARTED) * 1000
+        # Later rounds are workspaces being opened, not startup.
+        self.startup_timings.setdefault("all_loaded_ms", total_ms)
+        self.statusBar().showMessage(
+            f"✅ All panes loaded in {elapsed_ms / 1000:.1f}s ({total_ms / 1000:.1f}s since launch)", 4000
+        )
+        self.standby.schedule()
+
+    def _register_view(self, view: QWebEngineView, site: dict):
+        self.blockers[view] = install_blocker(view.page(), site)
+        self.capture.attach(view)
+        self._track_view(view, site)
+
+    def _track_view(self, view: QWebEngineView, site: dict):
+        self.hibernator.track(view)
+        self.dispatcher.track(view)
+        self.metrics.track(view, site)
 
     # -------------------- prompt history --------------------
 
     def _history_path(self) -> str:
-        return os.path.join(os.path.expanduser("~"), ".aifreesta_history.txt")
+        return os.path.join(os.path.expanduser("~"), ".aifreesta_history.db")
 
-    def _load_history(self):
-        path = self._history_path()
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                self.prompt_history = [l.rstrip("\n") for l in f if l.strip()][:MAX_HISTORY]
-
-    def _save_history(self):
-        with open(self._history_path(), "w", encoding="utf-8") as f:
-            f.write("\n".join(self.prompt_history[:MAX_HISTORY]))
+    def _legacy_history_path(self) -> str:
+        return os.path.join(os.path.expanduser("~"), ".aifreesta_history.txt")
 
-    def _refresh_completer(self):
-        completer = QCompleter(self.prompt_history, self)
+    def _create_completer(self):
+        self.history_model = HistoryCompletionModel(self.history, self)
+        completer = QCompleter(self.history_model, self)
+        # The model is already filtered by the history search.
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
         completer.setCaseSensitivity(Qt.CaseInsensitive)
-        completer.setFilterMode(Qt.MatchContains)
         self.input_edit.setCompleter(completer)
+        self.input_edit.textEdited.connect(self.history_model.set_query)
 
     # -------------------- input row --------------------
 
@@ -465,23 +5236,319 @@ class DynamicAIWindow(QMainWindow):
         self.input_edit.setPlaceholderText(
             "✨ Type your message — broadcasts to all AIs  |↑↓ history  | Enter to send"
         )
-        self._refresh_completer()
+        self._create_completer()
+
+        self.prompt_editor = PromptEditor(self)
+        self.prompt_editor.setFont(f)
+        self.prompt_editor.setMinimumHeight(160)
+        self.prompt_editor.hide()
+
+        self.editor_button = QPushButton("⤢")
+        self.editor_button.setToolTip("Multi-line editor (Ctrl+E)")
+        self.editor_button.setCheckable(True)
+        self.editor_button.setFixedSize(40, 50)
+        self.editor_button.toggled.connect(self._set_prompt_editor)
+
+        file_button = QPushButton("📎")
+        file_button.setToolTip("Load a file into the editor")
+        file_button.setFixedSize(40, 50)
+        file_button.clicked.connect(self.attach_file)
 
         hbox = QHBoxLayout()
         hbox.setContentsMargins(8, 6, 8, 8)
         hbox.addWidget(self.input_edit)
+        hbox.addWidget(self.prompt_editor)
+        hbox.addWidget(self.editor_button, alignment=Qt.AlignBottom)
+        hbox.addWidget(file_button, alignment=Qt.AlignBottom)
         self.vlayout.addLayout(hbox)
+        self.input_buttons = [self.editor_button, file_button]
+
+    def open_prompt_editor(self, text: str = None):
+        if text is not None:
+            self.prompt_editor.setPlainText(text)
+            self.prompt_editor.moveCursor(QTextCursor.End)
+        self.editor_button.setChecked(True)
+
+    def close_prompt_editor(self):
+        self.editor_button.setChecked(False)
+
+    def toggle_prompt_editor(self):
+        self.editor_button.toggle()
+
+    def _set_prompt_editor(self, on: bool):
+        if on:
+            if not self.prompt_editor.toPlainText() and self.input_edit.text():
+                self.prompt_editor.setPlainText(self.input_edit.text())
+                self.prompt_editor.moveCursor(QTextCursor.End)
+                self.input_edit.clear()
+            self.input_edit.hide()
+            self.prompt_editor.show()
+            self.prompt_editor.setFocus()
+        else:
+            self.prompt_editor.hide()
+            self.input_edit.show()
+            self.input_edit.setFocus()
+
+    def attach_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Load file into prompt")
+        if not path:
+            return
+        try:
+            self.prompt_editor.load_file(path)
+        except OSError as e:
+            self.statusBar().showMessage(f"⚠️ Could not read file: {e}", 5000)
+            return
+        self.open_prompt_editor()
+        self.prompt_editor.moveCursor(QTextCursor.End)
+        size = len(self.prompt_editor.toPlainText())
+        self.statusBar().showMessage(f"📎 {os.path.basename(path)} loaded ({size // 1024} KB)", 3000)
 
     def _update_placeholder(self):
+        others = [ws.name for ws in self.workspaces if ws is not self.workspace and ws.name in self.broadcast_to]
+        extra = f" (+ {', '.join(others)})" if others else ""
         self.input_edit.setPlaceholderText(
-            f"✨ Broadcasting to {len(self.views)} panes  |↑↓ history  | Enter to send"
+            f"✨ Broadcasting to {len(self.pane_names())} panes{extra}  |↑↓ history  | Enter to send"
         )
 
-    def _update_status(self):
+    def pane_names(self) -> list:
+        """Names of every pane, including those hosted by pane workers."""
+        names = self.pool.site_names() if self.pool is not None else []
+        return names + [site["name"] for site in self.ai_sites]
+
+    def _update_status(self, total_memory: int = None):
+        if total_memory is None:
+            total_memory = self.hibernator.total_memory()
+        live = sum(1 for v in self.views if not self.hibernator.is_hibernated(v))
+        budget = self.hibernator.budget_mb
+        memory = f"RAM {total_memory // (1024 * 1024)} MB"
+        if budget:
+            memory += f" / {budget} MB"
+        blocked = sum(b.blocked for b in self.blockers.values())
+        saved_mb = sum(b.saved_bytes for b in self.blockers.values()) / (1024 * 1024)
+        workers = f"🧩 {len(self.pool.groups)} workers   |   " if self.pool is not None else ""
         self.status_label.setText(
-            f"   🤖 {len(self.views)} AI Chats Active   |   Zoom {int(self.zoom_level * 100)}%   |   Ready"
+            f"   {workers}🤖 {live}/{len(self.views)} AI Chats Active   |   Zoom {int(self.zoom_level * 100)}%"
+            f"   |   {memory}   |   🛡 {blocked} blocked (~{saved_mb:.1f} MB)   |   Ready"
         )
 
+    # -------------------- broadcast --------------------
+
+    def broadcast_prompt(self, text: str):
+        self.deliver_prompt(text)
+
+    def deliver_prompt(self, text: str, run=None):
+        """Send text to every target pane, local and in pane workers, with
+        all answers archived as one run."""
+        targets = self._target_panes()
+        names = [site["name"] for _v, site in targets]
+        if self.pool is not None:
+            names += self.pool.site_names()
+        if run is None and names and self.archive_sink is None:
+            run = self.archive.begin_run(text, names)
+        if self.pool is not None:
+            self.pool.send({"cmd": "broadcast", "text": text, "run": run})
+        for view, site in targets:
+            self.send_to_pane(view, site, text, run)
+
+    def send_to_pane(self, view: QWebEngineView, site: dict, text: str, run: int = None, queued: bool = False):
+        """Send text to one pane; its answer is archived under run (a new
+        run of its own if None). A manual send to a pane still answering a
+        queued prompt waits for that answer."""
+        if not queued and self.queue.is_busy(view):
+            self.queue.hold(view, lambda: self.send_to_pane(view, site, text, run))
+            return
+        if run is None and self.archive_sink is None:
+            run = self.archive.begin_run(text, [site["name"]])
+        self._pane_runs[view] = (run, site["name"], text)
+        capture = self.capture.begin(view, site)
+        self.latency.begin(view, site)
+        send = lambda v=view, s=site, c=capture: self.dispatcher.dispatch(v, s, text, c)
+        self.metrics.count(view, "sent")
+        self.standby.touch()
+        self.loader.load_now(view)
+        self.viewport.resume(view)
+        if self.hibernator.is_hibernated(view):
+            self.hibernator.wake(view, then=send)
+        else:
+            send()
+
+    # -------------------- prompt queue --------------------
+
+    def queue_prompts(self, prompts: list):
+        if not prompts:
+            return
+        if self.pool is not None:
+            self.pool.send({"cmd": "queue", "prompts": prompts})
+        self.queue.add(prompts)
+        self.queue_dock.show()
+        self.statusBar().showMessage(f"📋 {len(prompts)} prompt(s) queued", 2000)
+
+    def set_queue_paused(self, paused: bool):
+        if self.pool is not None:
+            self.pool.send({"cmd": "queue_pause", "paused": paused})
+        self.queue.set_paused(paused)
+
+    def clear_queue(self):
+        if self.pool is not None:
+            self.pool.send({"cmd": "queue_clear"})
+        self.queue.clear()
+
+    def _archive_answer(self, view: QWebEngineView, text: str, timings: dict, status: str = None):
+        run, name, prompt = self._pane_runs.pop(view, (None, None, None))
+        status = status or timings.get("reason", "done")
+        if self.archive_sink is not None and name is not None:
+            self.archive_sink(run, name, prompt, text, timings, status)
+        elif run is not None:
+            self.archive.add_answer(run, name, text, timings, status)
+
+    def _archive_forwarded(self, msg: dict):
+        """File an answer a pane worker forwarded into the main process's run."""
+        run = msg.get("run")
+        if isinstance(run, list):
+            # ["queue", generation, index]: the queued prompt's shared run.
+            _tag, generation, index = run
+            if generation != self.queue.generation or not 0 <= index < len(self.queue.prompts):
+                return   # queue cleared since the prompt was sent
+            run = self.queue.run(index)
+        elif run is None:
+            run = self.archive.begin_run(msg.get("prompt", ""), [msg.get("pane", "")])
+        if run is not None:
+            self.archive.add_answer(
+                run, msg.get("pane", ""), msg.get("text", ""),
+                msg.get("timings") or {}, msg.get("status", "done"),
+            )
+
+    def _on_dispatch_failed(self, view: QWebEngineView, reason: str):
+        self.capture.cancel(view)
+        if view in self.views and self.views.index(view) < len(self.ai_sites):
+            name = self.ai_sites[self.views.index(view)]["name"]
+            self.statusBar().showMessage(f"⚠️ {name}: prompt not sent ({reason})", 5000)
+
+    def _on_mirror_mode(self, index: int):
+        mode = MIRROR_MODES[index]
+        self.mirror.set_mode(mode)
+        self.mirror_label.clear()
+        self._update_placeholder()
+        self.statusBar().showMessage(f"⌨ Typing mirror: {mode}", 1500)
+
+    def _on_mirror_latency(self, last_ms: float, avg_ms: float):
+        self.mirror_label.setText(f"⌨ {last_ms:.0f} ms (avg {avg_ms:.0f} ms)   ")
+
+    # -------------------- hibernation --------------------
+
+    def _pane_state_text(self, view: QWebEngineView) -> str:
+        if self.loader.is_deferred(view):
+            return "💤 not loaded"
+        if self.loader.is_pending(view):
+            return "⏳ queued"
+        state = self.hibernator.state(view)
+        icon = {"live": "●", "frozen": "❄", "discarded": "💤"}[state]
+        text = f"{icon} {state}"
+        if state == "live" and self.viewport.is_throttled(view):
+            text = "◌ offscreen"
+        memory = self.hibernator.pane_memory(view)
+        if memory:
+            text += f" · {memory // (1024 * 1024)} MB"
+        timings = self.capture.last_timings.get(view)
+        if timings:
+            text += f" · ⏱ {timings['ttft_ms'] / 1000:.1f}s / {timings['total_ms'] / 1000:.1f}s"
+        return text
+
+    def _on_response_finished(self, view: QWebEngineView, _text: str, timings: dict):
+        container = self._containers.get(view)
+        if container:
+            container.state_label.setText(self._pane_state_text(view))
+        if view in self.views and self.views.index(view) < len(self.ai_sites):
+            name = self.ai_sites[self.views.index(view)]["name"]
+            self.statusBar().showMessage(
+                f"✅ {name} answered in {timings['total_ms'] / 1000:.1f}s "
+                f"(first text after {timings['ttft_ms'] / 1000:.1f}s)", 4000
+            )
+
+    def _on_pane_state_changed(self, view: QWebEngineView, state: str):
+        container = self._containers.get(view)
+        if container:
+            container.set_state(state, self._pane_state_text(view))
+        self._update_status()
+
+    def _on_viewport_changed(self, view: QWebEngineView):
+        container = self._containers.get(view)
+        if container:
+            container.state_label.setText(self._pane_state_text(view))
+
+    def _on_memory_checked(self, total: int):
+        for view, container in self._containers.items():
+            container.state_label.setText(self._pane_state_text(view))
+        self._update_status(total)
+
+    def _on_focus_changed(self, _old, new):
+        if new is None:
+            return
+        for i, view in enumerate(self.views):
+            if new is view or view.isAncestorOf(new):
+                self.hibernator.touch(view)
+                self.loader.load_now(view)
+                self._remember_focus(self.ai_sites[i]["name"])
+                return
+
+    def _remember_focus(self, name: str):
+        settings = QSettings("Ai Freesta", "Ai Freesta")
+        recent = settings.value("recent_panes", []) or []
+        if isinstance(recent, str):
+            recent = [recent]
+        if recent[:1] != [name]:
+            settings.setValue("recent_panes", [name] + [n for n in recent if n != name][:9])
+
+    def _wake_pane(self, view: QWebEngineView):
+        self.hibernator.wake(view, then=view.setFocus)
+
+    def set_memory_budget(self):
+        budget, ok = QInputDialog.getInt(
+            self, "Memory Budget",
+            "Total renderer memory (MB) before idle panes hibernate:\n(0 disables hibernation)",
+            self.hibernator.budget_mb, 0, 1024 * 1024, 256
+        )
+        if not ok:
+            return
+        self.hibernator.set_budget(budget)
+        self._update_status()
+        self.statusBar().showMessage(
+            f"🧠 Memory budget: {budget} MB" if budget else "🧠 Hibernation disabled", 2000
+        )
+
+    def set_request_blocking(self, on: bool):
+        QSettings("Ai Freesta", "Ai Freesta").setValue("request_blocking", on)
+        for blocker in self.blockers.values():
+            blocker.enabled = on
+        self.statusBar().showMessage(
+            "🛡 Request blocking on" if on else "🛡 Request blocking off", 2000
+        )
+
+    def choose_chromium_preset(self):
+        self.footprint.sample()
+        current = _chromium_preset or "custom"
+        items = []
+        for name, flags in CHROMIUM_PRESETS.items():
+            m = EngineFootprint.measured(name)
+            measured = (
+                f"{m['peak_rss_mb']:.0f} MB peak, {m['cpu_percent']:.1f}% CPU, {m['processes']} procs"
+                if m else "not measured yet"
+            )
+            marker = "● " if name == current else ""
+            items.append(f"{marker}{name} — {measured} — {' '.join(flags) or 'Chromium defaults'}")
+        names = list(CHROMIUM_PRESETS)
+        index = names.index(current) if current in names else 0
+        item, ok = QInputDialog.getItem(
+            self, "Chromium Preset",
+            "Process model / rendering preset (applies after restart):", items, index, False
+        )
+        if not ok:
+            return
+        name = names[items.index(item)]
+        QSettings("Ai Freesta", "Ai Freesta").setValue("chromium_preset", name)
+        if name != current:
+            self.statusBar().showMessage(f"⚙️ Preset '{name}' will be used after restart", 4000)
+
     # -------------------- keyboard shortcuts --------------------
 
     def _setup_shortcuts(self):
@@ -489,13 +5556,18 @@ class DynamicAIWindow(QMainWindow):
         QShortcut(QKeySequence("Ctrl+-"), self, self.zoom_out)
         QShortcut(QKeySequence("Ctrl+0"), self, self.zoom_reset)
         QShortcut(QKeySequence("Ctrl+L"), self, self.input_edit.setFocus)
+        QShortcut(QKeySequence("Ctrl+E"), self, self.toggle_prompt_editor)
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self, self.toggle_profiling)
         QShortcut(QKeySequence("Ctrl+R"), self, self.refresh_all_panes)
         QShortcut(QKeySequence("Ctrl+T"), self, self.toggle_always_on_top)
+        for n in range(1, 10):
+            QShortcut(QKeySequence(f"Alt+{n}"), self,
+                      lambda i=n - 1: i < len(self.workspaces) and self.workspace_combo.setCurrentIndex(i))
 
     # -------------------- toolbar --------------------
 
     def _create_toolbar(self):
-        toolbar = QToolBar("Main Controls")
+        self.toolbar = toolbar = QToolBar("Main Controls")
         toolbar.setMovable(False)
         toolbar.setIconSize(toolbar.iconSize() * 1.2)
         self.addToolBar(toolbar)
@@ -512,12 +5584,47 @@ class DynamicAIWindow(QMainWindow):
 
         toolbar.addSeparator()
 
+        self.workspace_combo = QComboBox()
+        self.workspace_combo.addItems([f"🗂 {ws.name}" for ws in self.workspaces])
+        self.workspace_combo.setCurrentIndex(self.workspaces.index(self.workspace))
+        self.workspace_combo.setToolTip("Switch workspace (Alt+1…9); only the shown one keeps live panes")
+        self.workspace_combo.currentIndexChanged.connect(self.switch_workspace)
+        toolbar.addWidget(self.workspace_combo)
+
+        menu = QMenu(self)
+        menu.addAction("New workspace…", self.new_workspace)
+        menu.addAction("Rename…", self.rename_workspace)
+        menu.addAction("Delete", self.delete_workspace)
+        menu.addSeparator()
+        menu.addAction("Grid columns…", self.set_grid_columns)
+        menu.addAction("Broadcast to…", self.choose_broadcast_workspaces)
+        workspace_button = QToolButton()
+        workspace_button.setText("⋯")
+        workspace_button.setToolTip("Workspace options")
+        workspace_button.setMenu(menu)
+        workspace_button.setPopupMode(QToolButton.InstantPopup)
+        toolbar.addWidget(workspace_button)
+        if self.pool is not None:
+            # With pane workers the panes live in the worker windows.
+            self.workspace_combo.setEnabled(False)
+            workspace_button.setEnabled(False)
+
         self.layout_combo = QComboBox()
         self.layout_combo.addItems(["▬ Horizontal", "▥ Vertical", "⊞ Grid"])
         self.layout_combo.setToolTip("Switch pane layout")
+        self.layout_combo.setCurrentIndex(["horizontal", "vertical", "grid"].index(self._current_layout))
         self.layout_combo.currentIndexChanged.connect(self._on_layout_combo)
         toolbar.addWidget(self.layout_combo)
 
+        self.mirror_combo = QComboBox()
+        self.mirror_combo.addItems(["⌨ On submit", "⌨ Live typing"])
+        self.mirror_combo.setCurrentIndex(MIRROR_MODES.index(self.mirror.mode))
+        self.mirror_combo.setToolTip(
+            "Mirror the draft into the panes while typing, or only send it on Enter"
+        )
+        self.mirror_combo.currentIndexChanged.connect(self._on_mirror_mode)
+        toolbar.addWidget(self.mirror_combo)
+
         toolbar.addSeparator()
 
         act_zin = QAction("🔍+", self)
@@ -542,6 +5649,25 @@ class DynamicAIWindow(QMainWindow):
         act_refresh_all.setToolTip("Open all AI sites fresh  (Ctrl+R)")
         toolbar.addAction(act_refresh_all)
 
+        act_memory = QAction("🧠 Memory", self)
+        act_memory.triggered.connect(self.set_memory_budget)
+        act_memory.setToolTip("Set the memory budget for pane hibernation")
+        toolbar.addAction(act_memory)
+
+        self.act_block = QAction("🛡 Block", self)
+        self.act_block.setCheckable(True)
+        self.act_block.setChecked(
+            QSettings("Ai Freesta", "Ai Freesta").value("request_blocking", True, type=bool)
+        )
+        self.act_block.setToolTip("Block trackers, telemetry and heavy third-party media")
+        self.act_block.toggled.connect(self.set_request_blocking)
+        toolbar.addAction(self.act_block)
+
+        act_engine = QAction("⚙️ Engine", self)
+        act_engine.triggered.connect(self.choose_chromium_preset)
+        act_engine.setToolTip("Chromium process/rendering preset and its measured footprint")
+        toolbar.addAction(act_engine)
+
         act_stop = QAction("🛑 Stop", self)
         act_stop.triggered.connect(self.stop_all_panes)
         act_stop.setToolTip("Stop loading all pages")
@@ -567,6 +5693,31 @@ class DynamicAIWindow(QMainWindow):
         act_hist.setToolTip("View / clear prompt history")
         toolbar.addAction(act_hist)
 
+        act_metrics = self.metrics_dock.toggleViewAction()
+        act_metrics.setText("📊 Metrics")
+        act_metrics.setToolTip("Per-pane load, memory and broadcast metrics")
+        toolbar.addAction(act_metrics)
+
+        act_queue = self.queue_dock.toggleViewAction()
+        act_queue.setText("📋 Queue")
+        act_queue.setToolTip("Batch prompts: each pane takes the next one when it finishes  (Ctrl+Enter adds)")
+        toolbar.addAction(act_queue)
+
+        act_archive = self.archive_dock.toggleViewAction()
+        act_archive.setText("🗄 Archive")
+        act_archive.setToolTip("Search past prompts and every pane's answer; JSONL export")
+        toolbar.addAction(act_archive)
+
+        act_latency = self.latency_dock.toggleViewAction()
+        act_latency.setText("⏱ Latency")
+        act_latency.setToolTip("Per-site submit, first-text and answer times (p50/p95/p99) across sessions")
+        toolbar.addAction(act_latency)
+
+        act_selectors = QAction("🎯 Selectors", self)
+        act_selectors.triggered.connect(self.show_selector_report)
+        act_selectors.setToolTip("Which input/send selectors matched on each site")
+        toolbar.addAction(act_selectors)
+
         act_help = QAction("❓ Help", self)
         act_help.triggered.connect(self.show_help)
         toolbar.addAction(act_help)
@@ -575,12 +5726,18 @@ class DynamicAIWindow(QMainWindow):
         styles = ["horizontal", "vertical", "grid"]
         self._rebuild_layout(styles[index])
 
+    def set_layout(self, style: str):
+        # Goes through the combo so the toolbar stays in sync.
+        self.layout_combo.setCurrentIndex(["horizontal", "vertical", "grid"].index(style))
+
     # -------------------- zoom --------------------
 
     def _apply_zoom(self):
         for view in self.views:
             if view:
                 view.setZoomFactor(self.zoom_level)
+        if self.pool is not None:
+            self.pool.send({"cmd": "zoom", "level": self.zoom_level})
         self._update_status()
 
     def zoom_in(self):
@@ -623,63 +5780,168 @@ class DynamicAIWindow(QMainWindow):
             self, "Remove AI Pane", "Select pane to remove:",
             names, len(names) - 1, False
         )
-        if not ok:
-            return
+        if ok:
+            self.remove_pane(name)
+
+    def remove_pane(self, name: str) -> bool:
         idx = next((i for i, s in enumerate(self.ai_sites) if s["name"] == name), None)
         if idx is None:
-            return
+            return False
         view = self.views.pop(idx)
         self.ai_sites.pop(idx)
-        view.setParent(None)
-        view.deleteLater()
+        self._dispose_view(view)
         self._rebuild_layout(self._current_layout)
         self._update_placeholder()
         self._update_status()
         self.statusBar().showMessage(f"Removed {name}", 3000)
+        return True
+
+    def _dispose_view(self, view: QWebEngineView):
+        self.hibernator.forget(view)
+        self.capture.forget(view)
+        self.dispatcher.forget(view)
+        self.metrics.forget(view)
+        self.latency.forget(view)
+        self.loader.forget(view)
+        self.viewport.forget(view)
+        self.queue.forget(view)
+        self.blockers.pop(view, None)
+        self._pane_runs.pop(view, None)
+        container = self._containers.pop(view, None)
+        if container is not None:
+            container.setParent(None)
+            container.deleteLater()
+        else:
+            view.setParent(None)
+            view.deleteLater()
 
     # -------------------- prompt history UI --------------------
 
     def show_history(self):
-        if not self.prompt_history:
+        total = self.history.count()
+        if not total:
             QMessageBox.information(self, "Prompt History", "No history yet.")
             return
-        preview = "\n".join(f"{i+1}. {p[:80]}" for i, p in enumerate(self.prompt_history[:20]))
+        recent = self.history.recent(20)
+        preview = "\n".join(f"{i+1}. {p[:80]}" for i, p in enumerate(recent))
         reply = QMessageBox.question(
             self, "Prompt History",
-            f"Last {min(20, len(self.prompt_history))} prompts:\n\n{preview}\n\nClear all history?",
+            f"Last {len(recent)} of {total} prompts:\n\n{preview}\n\nClear all history?",
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No
         )
         if reply == QMessageBox.Yes:
-            self.prompt_history.clear()
-            self._save_history()
-            self._refresh_completer()
+            self.history.clear()
+            self.history_model.set_query("")
             self.statusBar().showMessage("🗑️ Prompt history cleared", 2000)
 
+    # -------------------- selector report --------------------
+
+    def show_selector_report(self):
+        stats = self.dispatcher.selector_stats
+        lines = []
+        for site in self.ai_sites:
+            hits = stats.hits(site)
+            lines.append(f"<b>{html.escape(site['name'])}</b>")
+            for key in SELECTOR_KEYS:
+                counts = hits.get(key, {})
+                total = sum(counts.values())
+                ranked = sorted(counts.items(), key=lambda kv: -kv[1])
+                summary = ", ".join(
+                    f"<code>{html.escape(sel)}</code> {n * 100 // total}%" for sel, n in ranked[:3]
+                )
+                lines.append(f"&nbsp;&nbsp;{key.split('_')[0]}: {summary or 'no sends yet'}")
+
+        msg = QMessageBox(self)
+        msg.setWindowTitle("Selector Hit Rates")
+        msg.setText("Winning selectors per site")
+        msg.setInformativeText("<br>".join(lines))
+        reorder = msg.addButton("Reorder by hit rate", QMessageBox.AcceptRole)
+        msg.addButton(QMessageBox.Close)
+        msg.exec()
+        if msg.clickedButton() is reorder:
+            # New dicts: without a session the sites are the AI_SITES entries.
+            for site in self.ai_sites:
+                stats.reordered(site)
+            for ws in self.workspaces:
+                ws.sites[:] = [stats.with_order(site) for site in ws.sites]
+            self.statusBar().showMessage("🎯 Selector lists reordered by hit rate", 3000)
+
     # -------------------- refresh / stop / clear --------------------
 
     def refresh_all_panes(self):
         for i, view in enumerate(self.views):
             if view and i < len(self.ai_sites):
                 view.setUrl(QUrl(self.ai_sites[i]["url"]))
+        if self.pool is not None:
+            self.pool.send({"cmd": "refresh"})
         self.statusBar().showMessage("♻️ Opening all sites fresh...", 3000)
 
     def stop_all_panes(self):
         for view in self.views:
             if view:
                 view.stop()
+        if self.pool is not None:
+            self.pool.send({"cmd": "stop"})
         self.statusBar().showMessage("🛑 Stopped all loading", 2000)
 
     def clear_all_chats(self):
         reply = QMessageBox.question(
             self, "Clear All Chats",
-            "This will try to click 'New Chat' on all sites.\nProceed?",
+            "This will start a new chat on all sites.\nProceed?",
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No
         )
         if reply == QMessageBox.Yes:
-            for view in self.views:
-                if view:
-                    view.page().runJavaScript(js_clear_chat())
-            self.statusBar().showMessage("🗑️ Clear attempted on all panes", 3000)
+            swapped = self.clear_panes()
+            self.statusBar().showMessage(
+                f"🗑️ New chat in all panes ({swapped} swapped in instantly)", 3000
+            )
+
+    def clear_panes(self) -> int:
+        """Swap a fresh standby page into every pane that has one, click
+        'New chat' in the rest. Returns the number of panes swapped."""
+        swapped = 0
+        for i, view in enumerate(list(self.views)):
+            if not view or i >= len(self.ai_sites):
+                continue
+            busy = self.queue.is_busy(view) or self.capture.is_capturing(view)
+            entry = None if busy else self.standby.take(self.ai_sites[i])
+            if entry is not None:
+                self._swap_view(i, entry)
+                swapped += 1
+            else:
+                run_runtime(view.page(), "clearChat")
+        if swapped:
+            self.viewport.schedule()
+            self._update_status()
+        if self.pool is not None:
+            self.pool.send({"cmd": "clear"})
+        return swapped
+
+    def _swap_view(self, index: int, entry: dict):
+        """Replace pane index's view with a ready standby view."""
+        old, view, site = self.views[index], entry["view"], self.ai_sites[index]
+        view.setZoomFactor(self.zoom_level)
+        blocker = entry["blocker"] or install_blocker(view.page(), site)
+        blocker.enabled = QSettings("Ai Freesta", "Ai Freesta").value("request_blocking", True, type=bool)
+        self.blockers[view] = blocker
+        self._pane_runs.pop(old, None)
+        self.hibernator.track(view)
+        self.dispatcher.track(view)
+        self.metrics.replace(old, view)
+        self.queue.replace(old, view)
+        self.views[index] = view
+
+        for forget in (self.hibernator.forget, self.capture.forget, self.dispatcher.forget,
+                       self.latency.forget, self.loader.forget, self.viewport.forget):
+            forget(old)
+        self.blockers.pop(old, None)
+
+        container = self._containers.pop(old, None)
+        if container is not None:
+            container.swap_view(view)
+            self._containers[view] = container
+            container.set_state("live", self._pane_state_text(view))
+        old.deleteLater()
 
     # -------------------- add pane --------------------
 
@@ -696,95 +5958,70 @@ class DynamicAIWindow(QMainWindow):
             self, "AI Name", "Enter a display name:",
             text=url.split("//")[-1].split("/")[0]
         )
-        if not ok or not name.strip():
+        self.add_pane(url, name if ok else "")
+
+    def add_pane(self, url: str, name: str = "") -> dict:
+        if not url.startswith(("http://", "https://")):
+            url = "https://" + url
+        if not name.strip():
             name = url.split("//")[-1].split("/")[0]
         new_site = {
             "name": name, "url": url, "mobile": False,
             "input_selector": "textarea, [contenteditable='true'], input[type='text']",
             "send_selector": "button[type='submit'], button[aria-label*='send' i]",
-            "delay_ms": 200,
+            "response_selector": DEFAULT_RESPONSE_SELECTOR,
+            "stop_selector": DEFAULT_STOP_SELECTOR,
+            "profile": ADDED_PANES_PROFILE,
         }
         self.ai_sites.append(new_site)
-        view = make_view(url, mobile=False)
+        entry = self.standby.take()
+        if entry is not None:
+            # Already a live, blank page; only the navigation is left.
+            view = entry["view"]
+            view.setUrl(QUrl(url))
+            self.blockers[view] = install_blocker(view.page(), new_site)
+            self._track_view(view, new_site)
+        else:
+            view = make_view(new_site)
+            self._register_view(view, new_site)
         view.setZoomFactor(self.zoom_level)
         self.views.append(view)
         self._rebuild_layout(self._current_layout)
         self._update_placeholder()
         self._update_status()
         self.statusBar().showMessage(f"Added {name}!", 5000)
+        return new_site
 
     # -------------------- layouts --------------------
 
-    def _make_pane_widget(self, view: QWebEngineView, name: str) -> QWidget:
-        container = QWidget()
-        layout = QVBoxLayout(container)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(0)
-
-        bar = QFrame()
-        bar.setObjectName("pane_label_bar")
-        bar.setFixedHeight(26)
-        bar_layout = QHBoxLayout(bar)
-        bar_layout.setContentsMargins(8, 0, 4, 0)
-
-        lbl = QLabel(name)
-        lbl.setStyleSheet("color: #cccccc; font-size: 12px; font-weight: bold;")
-        bar_layout.addWidget(lbl)
-        bar_layout.addStretch()
-
-        layout.addWidget(bar)
-        layout.addWidget(view)
+    def _pane_container(self, view: QWebEngineView, name: str) -> PaneContainer:
+        container = self._containers.get(view)
+        if container is None:
+            container = PaneContainer(view, name)
+            container.wakeRequested.connect(self._wake_pane)
+            container.set_state(self.hibernator.state(view), self._pane_state_text(view))
+            self._containers[view] = container
         return container
 
-    def _rebuild_layout(self, style: str = "horizontal"):
+    def _rebuild_layout(self, style: str = None):
+        started = time.perf_counter()
+        style = style or self._current_layout
         self._current_layout = style
 
-        if self.current_root_splitter is not None:
-            self.splitter_layout.removeWidget(self.current_root_splitter)
-            self.current_root_splitter.setParent(None)
+        self._arrange(self.workspace)
 
+        # Only side-by-side panes need the scroll area to grow.
         if not self.views:
-            return
-
-        pane_widgets = [
-            self._make_pane_widget(
-                view,
-                self.ai_sites[i]["name"] if i < len(self.ai_sites) else f"Pane {i+1}"
-            )
-            for i, view in enumerate(self.views)
-        ]
-
-        if style == "vertical":
-            root = QSplitter(Qt.Vertical)
-            for w in pane_widgets:
-                root.addWidget(w)
-            root.setSizes([1] * len(pane_widgets))
-
+            columns = 0
         elif style == "grid":
-            root = QSplitter(Qt.Horizontal)
-            left = QSplitter(Qt.Vertical)
-            right = QSplitter(Qt.Vertical)
-            for i, w in enumerate(pane_widgets):
-                (left if i % 2 == 0 else right).addWidget(w)
-            root.addWidget(left)
-            if right.count() > 0:
-                root.addWidget(right)
-            root.setSizes([1, 1])
-
+            columns = PaneLayoutEngine.grid_columns(len(self.views), self.workspace.columns)
         else:
-            root = QSplitter(Qt.Horizontal)
-            for w in pane_widgets:
-                root.addWidget(w)
-            root.setSizes([1] * len(pane_widgets))
+            columns = len(self.views) if style == "horizontal" else 1
+        self.splitter_container.setMinimumWidth(MIN_PANE_WIDTH * columns)
+        self.viewport.schedule()
 
-        root.setChildrenCollapsible(False)
-        self.current_root_splitter = root
-        self.splitter_layout.addWidget(root)
-
-        min_total_width = MIN_PANE_WIDTH * len(self.views)
-        self.splitter_container.setMinimumWidth(min_total_width)
-
-        self.statusBar().showMessage(f"📐 Layout: {style}", 1500)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.statusBar().showMessage(f"📐 Layout: {style} ({elapsed_ms:.1f} ms)", 1500)
 
     # -------------------- help --------------------
 
@@ -800,23 +6037,132 @@ class DynamicAIWindow(QMainWindow):
             "• <b>➖ Remove pane</b> — remove any AI pane by name<br>"
             "• <b>Zoom</b> all panes in/out simultaneously (Ctrl += / -)<br>"
             "• <b>Layout picker</b> (Horizontal / Vertical / Grid)<br>"
+            "• <b>Typing mirror</b> — live while typing, or only on submit<br>"
+            "• <b>📊 Metrics</b> — per-pane load time, memory, sends; JSON/CSV export<br>"
             "• <b>Always on Top</b> toggle (Ctrl+T)<br>"
-            "• <b>Pane labels</b> show AI name above each pane<br><br>"
+            "• <b>Pane labels</b> show AI name above each pane<br>"
+            "• <b>🧠 Memory</b> — idle panes freeze, then hibernate, over budget<br>"
+            "• <b>🛡 Block</b> — trackers, telemetry and third-party media are dropped per pane<br>"
+            "• <b>🗄 Archive</b> — every prompt and each pane's answer, searchable, JSONL export<br>"
+            "• <b>⏱ Latency</b> — per-site submit, first-text and answer times with p50/p95/p99<br>"
+            "• <b>🗂 Workspaces</b> — named pane sets (Alt+1…9); hidden ones free their renderers<br>"
+            "• <b>Ctrl+Shift+P</b> — start/stop a profiling session; UI stalls show in the status bar<br>"
+            "• <b>--pane-workers N</b> — host the panes in N separate processes/windows<br>"
+            "• <b>Session restore</b> — panes, open threads, layout and zoom come back on restart<br><br>"
 
             "<b>Shortcuts:</b><br>"
             "• Ctrl+L — focus input bar<br>"
+            "• Ctrl+Enter — add the prompt to the 📋 queue<br>"
             "• Ctrl+R — refresh all panes<br>"
             "• Ctrl+= / Ctrl+- — zoom in / out<br>"
             "• Ctrl+0 — reset zoom<br>"
             "• Ctrl+T — always on top<br><br>"
 
             "<b>Tips:</b><br>"
-            "• History saved to ~/.aifreesta_history.txt<br>"
+            "• History saved to ~/.aifreesta_history.db<br>"
+            "• Each site keeps its own logins and disk cache<br>"
             "• Click each AI input box once to focus it<br>"
             "• Press F12 in any pane to open DevTools"
         )
         msg.exec()
 
+    # -------------------- session --------------------
+
+    def _workspace_snapshot(self, ws: Workspace) -> dict:
+        snapshot = {"name": ws.name, "sites": ws.sites, "layout": ws.layout,
+                    "columns": ws.columns, "zoom": ws.zoom}
+        if not ws.instantiated:
+            return {**ws.snapshot, **snapshot}
+        urls, states = [], []
+        for view in ws.views:
+            url = self.loader.pending_url(view) or view.url().toString()
+            urls.append(url if url.startswith(("http://", "https://")) else "")
+            if self.loader.is_deferred(view):
+                # A hidden workspace loads all its panes once shown again.
+                states.append("discarded" if ws is self.workspace else "live")
+            elif self.loader.is_pending(view):
+                states.append("live")
+            elif view in ws.suspended:
+                states.append("live")   # was live when its workspace was hidden
+            else:
+                states.append(self.hibernator.state(view))
+        return {**snapshot, "urls": urls, "states": states, "sizes": ws.engine.saved_sizes()}
+
+    def session_snapshot(self) -> dict:
+        active = self._workspace_snapshot(self.workspace)
+        sites, urls, states = active["sites"], active["urls"], active["states"]
+        if self.pool is not None:
+            workers = self.pool.snapshot()
+            sites = workers["sites"] + sites
+            urls = workers["urls"] + urls
+            states = workers["states"] + states
+        session = {
+            "version": SESSION_VERSION,
+            "sites": sites,
+            "urls": urls,
+            "states": states,
+            "layout": self._current_layout,
+            "sizes": active["sizes"],
+            "zoom": self.zoom_level,
+        }
+        if self.pool is None and not self.worker:
+            session["workspaces"] = [
+                active if ws is self.workspace else self._workspace_snapshot(ws) for ws in self.workspaces
+            ]
+            session["workspace"] = self.workspaces.index(self.workspace)
+            session["broadcast_to"] = sorted(self.broadcast_to)
+        return session
+
+    def save_session(self):
+        if self.session_sink is not None:
+            self.session_sink(self.session_snapshot())
+            return
+        try:
+            save_session(session_path(), self.session_snapshot(), AI_SITES)
+        except OSError as e:
+            self.statusBar().showMessage(f"⚠️ Session not saved: {e}", 5000)
+
+    # -------------------- control API --------------------
+
+    def start_control_api(self, port: int):
+        import secrets
+
+        settings = QSettings("Ai Freesta", "Ai Freesta")
+        token = os.environ.get("AIFREESTA_CONTROL_TOKEN") or settings.value("control_token", "")
+        if not token:
+            token = secrets.token_urlsafe(24)
+            settings.setValue("control_token", token)
+        self.control = ControlServer(ControlBridge(self), port, token)
+        try:
+            self.control.start()
+        except OSError as e:
+            self.control = None
+            self.statusBar().showMessage(f"⚠️ Control API not started: {e}", 8000)
+            return
+        # Tools find the port and token here; readable by this user only.
+        path = control_info_path()
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"url": f"http://127.0.0.1:{self.control.port}", "token": token, "pid": os.getpid()}, f)
+        self.statusBar().showMessage(f"🔌 Control API on http://127.0.0.1:{self.control.port}", 5000)
+
+    def closeEvent(self, event):
+        if self.control is not None:
+            self.control.stop()
+            try:
+                os.remove(control_info_path())
+            except OSError:
+                pass
+        self._session_timer.stop()
+        self.standby.clear()
+        self.profiler.stop()
+        self.watchdog.stop()
+        self.archive.close()
+        if self.pool is not None:
+            self.pool.shutdown()   # collects the workers' final pane URLs
+        self.save_session()
+        super().closeEvent(event)
+
     # -------------------- startup notice --------------------
 
     def show_startup_notice_once(self):
@@ -837,19 +6183,60 @@ class DynamicAIWindow(QMainWindow):
         )
         cb = QCheckBox("Don't show again")
         msg.setCheckBox(cb)
-        msg.exec()
-        if cb.isChecked():
-            settings.setValue("hide_notice", True)
+        # Non-modal so panes keep loading and the input bar stays usable.
+        msg.setModal(False)
+        msg.setAttribute(Qt.WA_DeleteOnClose)
+        msg.finished.connect(lambda _r: cb.isChecked() and settings.setValue("hide_notice", True))
+        msg.show()
 
 
 # ------------------------------- main -------------------------------
 
 def main():
-    app = QApplication(sys.argv)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ai Freesta")
+    parser.add_argument("--chromium-preset", choices=list(CHROMIUM_PRESETS),
+                        help="Chromium process/rendering preset (default: last chosen)")
+    parser.add_argument("--pane-workers", type=int, default=None,
+                        help="host the panes in N separate processes (default: 0, all in one)")
+    parser.add_argument("--control-port", type=int, default=None,
+                        help="serve the local control API on this port (0: off, default: the control_port setting)")
+    parser.add_argument("--profile", type=int, nargs="?", const=0, metavar="SECONDS",
+                        help="profile from launch (Python + Chromium trace), for SECONDS or until Ctrl+Shift+P")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-index", type=int, default=0, help=argparse.SUPPRESS)
+    args, qt_args = parser.parse_known_args()
+    apply_chromium_preset(args.chromium_preset)
+
+    if args.worker:
+        # Only the main process may hold the DevTools port.
+        os.environ.pop("QTWEBENGINE_REMOTE_DEBUGGING", None)
+        sys.exit(run_worker(args.worker, args.worker_index))
+    if args.profile is not None:
+        os.environ.setdefault("QTWEBENGINE_REMOTE_DEBUGGING", f"127.0.0.1:{PROFILER_DEVTOOLS_PORT}")
+
+    workers = args.pane_workers
+    if workers is None:
+        workers = QSettings("Ai Freesta", "Ai Freesta").value("pane_workers", 0, type=int)
+
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyle("Fusion")
-    window = DynamicAIWindow(AI_SITES)
+    window = DynamicAIWindow(
+        AI_SITES, session=load_session(session_path(), AI_SITES), workers=max(0, workers)
+    )
+    port = args.control_port
+    if port is None:
+        port = QSettings("Ai Freesta", "Ai Freesta").value("control_port", CONTROL_PORT, type=int)
+    if port:
+        window.start_control_api(port)
+    if args.profile is not None:
+        window.profiler.start(args.profile)
     window.show()
-    sys.exit(app.exec())
+    code = app.exec()
+    # Pages have to go before the per-site profiles they use.
+    del window
+    sys.exit(code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,457 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+# Needs PySide6 with QtWebEngine and its system libraries.
+freesta = pytest.importorskip("freesta", exc_type=ImportError)
+
+
+# ---- request blocking ----
+
+def test_blocklist_path_patterns_match_whole_path():
+    rules = freesta.Blocklist(paths=freesta.BLOCKLIST["paths"])
+    assert rules.match("example.com", "/cdn-cgi/rum", None, False) == "path"
+    assert rules.match("example.com", "/cdn-cgi/rum/v2", None, False) == "path"
+    assert rules.match("example.com", "/a/b/analytics.js", None, False) == "path"
+    assert rules.match("example.com", "/gtag/js", None, False) == "path"
+
+
+@pytest.mark.parametrize("path", ["/x/cdn-cgi/rum", "/a/analytics.jsx", "/analytics.js.map", "/static/chat.js"])
+def test_blocklist_near_miss_paths_are_not_blocked(path):
+    rules = freesta.Blocklist(paths=freesta.BLOCKLIST["paths"])
+    assert rules.match("example.com", path, None, False) == ""
+
+
+def test_blocklist_domains_cover_subdomains_only():
+    rules = freesta.Blocklist(domains=["sentry.io"])
+    assert rules.match("o1.ingest.sentry.io", "/", None, True) == "domain"
+    assert rules.match("notsentry.io", "/", None, True) == ""
+
+
+
+@pytest.mark.parametrize("host, domain", [
+    ("chat.z.ai", "z.ai"),
+    ("z.ai", "z.ai"),
+    ("chat.example.co.uk", "example.co.uk"),
+    ("example.co.uk", "example.co.uk"),
+    ("ads.tracker.com.au", "tracker.com.au"),
+    ("www.co.com", "co.com"),
+    ("127.0.0.1", "127.0.0.1"),
+])
+def test_registrable_domain_keeps_country_second_level_labels(host, domain):
+    assert freesta.registrable_domain(host) == domain
+
+
+# ---- selectors ----
+
+@pytest.fixture
+def settings(tmp_path):
+    """QSettings in a temporary directory."""
+    from PySide6.QtCore import QSettings
+    QSettings.setPath(QSettings.NativeFormat, QSettings.UserScope, str(tmp_path))
+    yield
+    QSettings("Ai Freesta", "Ai Freesta").clear()
+
+
+def test_selector_reorder_persists_without_touching_builtin_sites(settings):
+    site = freesta.AI_SITES[0]
+    before = dict(site)
+    stats = freesta.SelectorStats()
+    last = freesta.split_selectors(site["input_selector"])[-1]
+    stats.record(site, {site["input_selector"]: {last: 3}})
+
+    reordered = stats.reordered(site)
+    assert site == before
+    assert freesta.split_selectors(reordered["input_selector"])[0] == last
+    # A later run gets the order back from the settings.
+    assert freesta.SelectorStats().with_order(dict(before)) == reordered
+
+
+def test_selector_order_ignored_after_the_list_changes(settings):
+    site = dict(freesta.AI_SITES[0])
+    stats = freesta.SelectorStats()
+    stats.reordered(site)
+    edited = dict(site, input_selector="textarea.new")
+    assert stats.with_order(edited)["input_selector"] == "textarea.new"
+
+
+# ---- prompt history ----
+
+@pytest.fixture(params=[True, False], ids=["fts", "like"])
+def history(request, tmp_path):
+    history = freesta.PromptHistory(str(tmp_path / "history.db"))
+    if not request.param:
+        history.db
+        history.fts = False
+    for text in ["hello world", "say hello", "unrelated", "hello world"]:
+        history.add(text)
+    return history
+
+
+def test_fts_query_makes_every_word_a_prefix():
+    assert freesta.fts_query('he "wor') == '"he"* "wor"*'
+    assert freesta.fts_query("  ") == ""
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("he wor", ["hello world"]),
+    ("hello", ["hello world", "say hello"]),
+    ("orld", ["hello world"]),
+    ("nope", []),
+])
+def test_history_search_matches_every_word(history, query, expected):
+    assert history.search(query, 10) == expected
+
+
+def test_history_search_never_scans_with_fts(tmp_path):
+    history = freesta.PromptHistory(str(tmp_path / "history.db"))
+    history.add("hello world")
+    assert history.fts and history.trigram
+    statements = []
+    history.db.set_trace_callback(statements.append)
+    for query in ("he wor", "orld", "rl", "zzz", "?!"):
+        history.search(query, 10)
+    assert statements and not any("LIKE" in sql for sql in statements)
+    assert history.search("rl", 10) == []
+
+
+def test_history_indexes_are_built_for_existing_rows(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "history.db")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE prompts (id INTEGER PRIMARY KEY, ts REAL NOT NULL, text TEXT NOT NULL,"
+               " targets TEXT NOT NULL DEFAULT '[]')")
+    db.execute("INSERT INTO prompts (ts, text) VALUES (0, 'older prompt')")
+    db.commit()
+    db.close()
+    history = freesta.PromptHistory(path)
+    assert history.search("old", 10) == ["older prompt"]
+    assert history.search("lder", 10) == ["older prompt"]
+
+
+def test_history_search_pages(history):
+    assert history.search("hello", 1) == ["hello world"]
+    assert history.search("hello", 1, offset=1) == ["say hello"]
+
+
+# ---- control API ----
+
+def test_control_token_check_handles_non_ascii():
+    server = freesta.ControlServer(SimpleNamespace(server=None), 0, "secret")
+    assert server._authorized({"authorization": "Bearer secret"}, "")
+    assert server._authorized({}, "token=secret")
+    assert not server._authorized({"authorization": "Bearer sécret"}, "")
+    assert not server._authorized({}, "")
+
+
+def test_control_broadcast_rejects_pane_names_that_are_not_a_list():
+    bridge = SimpleNamespace(window=SimpleNamespace(ai_sites=[{"name": "Claude"}], views=[]))
+    status, body = freesta.ControlBridge.op_broadcast(bridge, {"text": "hi", "panes": "Claude"})
+    assert status == 400
+
+
+
+@pytest.mark.parametrize("prompts", ["one prompt", 5, None, ["ok", 3], []])
+def test_control_batch_rejects_anything_but_a_list_of_prompts(prompts):
+    bridge = SimpleNamespace(window=None)
+    status, body = freesta.ControlBridge.op_batch(bridge, {"prompts": prompts})
+    assert status == 400
+
+
+@pytest.mark.parametrize("subscribe, panes, errors", [
+    (["Claude", "Grok"], {"Claude", "Grok"}, 0),
+    ("*", None, 0),
+    ("Claude", None, 1),
+    (7, None, 1),
+])
+def test_control_ws_subscribe_takes_a_list_of_names(subscribe, panes, errors):
+    server = freesta.ControlServer(SimpleNamespace(server=None), 0, "secret")
+    client = freesta.WebSocketClient(None, SimpleNamespace(set=lambda: None))
+    server._ws_command(client, json.dumps({"subscribe": subscribe}).encode())
+    assert client.panes == panes
+    assert [e["event"] for e in client.events] == ["error"] * errors
+
+
+# ---- conversation archive ----
+
+@pytest.fixture
+def archive(settings, tmp_path):
+    archive = freesta.ConversationArchive(str(tmp_path / "archive.db"))
+    first = archive.begin_run("compare sorting algorithms", ["A", "B"])
+    archive.add_answer(first, "A", "Quicksort is usually fastest.", {"ttft_ms": 120.0, "total_ms": 900.0})
+    archive.add_answer(first, "B", "Merge sort is stable.", {"ttft_ms": 80.0, "total_ms": 1500.0})
+    second = archive.begin_run("hello there", ["A"])
+    archive.add_answer(second, "A", "", {}, "failed")
+    archive.close()
+    return archive
+
+
+@pytest.mark.parametrize("query, prompts", [
+    ("", ["hello there", "compare sorting algorithms"]),
+    ("sort algo", ["compare sorting algorithms"]),
+    ("stable", ["compare sorting algorithms"]),
+    ("nothing", []),
+])
+def test_archive_search(archive, query, prompts):
+    assert [run["prompt"] for run in archive.search(query)] == prompts
+
+
+def test_archive_search_pages_by_run_id(archive):
+    newest = archive.search(limit=1)
+    assert [run["prompt"] for run in newest] == ["hello there"]
+    assert [run["prompt"] for run in archive.search(before=newest[0]["id"])] == ["compare sorting algorithms"]
+
+
+def test_archive_run_has_every_answer(archive):
+    run = archive.run(archive.search("sorting")[0]["id"])
+    assert [(a["pane"], a["status"], a["total_ms"]) for a in run["answers"]] == [
+        ("A", "done", 900.0), ("B", "done", 1500.0)]
+    assert run["answers"][1]["text"] == "Merge sort is stable."
+
+
+def test_archive_export_jsonl(archive, tmp_path):
+    path = tmp_path / "export.jsonl"
+    assert archive.export_jsonl(str(path)) == 2
+    runs = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [run["prompt"] for run in runs] == ["compare sorting algorithms", "hello there"]
+    assert len(runs[0]["answers"]) == 2
+
+
+def test_archive_writer_forgets_answered_runs(tmp_path):
+    db, fts = freesta._archive_connect(str(tmp_path / "archive.db"))
+    run_ids = {}
+    freesta.ConversationArchive._write(db, fts, run_ids, ("run", 1, 0.0, "p", ["A", "B"]))
+    freesta.ConversationArchive._write(db, fts, run_ids, ("answer", 1, 0.0, "A", "x", "done", None, None))
+    assert 1 in run_ids
+    freesta.ConversationArchive._write(db, fts, run_ids, ("answer", 1, 0.0, "B", "y", "done", None, None))
+    assert run_ids == {}
+    db.close()
+
+
+# ---- session ----
+
+def test_session_round_trip(tmp_path):
+    path = str(tmp_path / "session.json")
+    builtin = freesta.AI_SITES
+    custom = {"name": "Local", "url": "http://127.0.0.1:8080"}
+    edited = dict(builtin[1], send_selector="button.go")
+    session = {
+        "version": freesta.SESSION_VERSION,
+        "sites": [builtin[0], custom, edited],
+        "layout": "grid",
+        "zoom": 1.2,
+        "workspaces": [{"name": "Research", "sites": [builtin[2]], "layout": "diagonal"}],
+    }
+    freesta.save_session(path, session, builtin)
+
+    with open(path, encoding="utf-8") as f:
+        stored = json.load(f)
+    # Unchanged built-in sites are stored by name, everything else in full.
+    assert stored["sites"] == [builtin[0]["name"], custom, edited]
+
+    loaded = freesta.load_session(path, builtin)
+    assert loaded["sites"] == [builtin[0], custom, edited]
+    assert loaded["sites"][0] is not builtin[0]
+    assert loaded["layout"] == "grid" and loaded["zoom"] == 1.2
+    assert loaded["workspaces"][0]["sites"] == [builtin[2]]
+    assert "layout" not in loaded["workspaces"][0]
+
+
+def test_session_keeps_reordered_builtin_sites_by_name(settings, tmp_path):
+    path = str(tmp_path / "session.json")
+    site = freesta.AI_SITES[0]
+    stats = freesta.SelectorStats()
+    stats.record(site, {site["send_selector"]: {freesta.split_selectors(site["send_selector"])[-1]: 5}})
+    reordered = stats.reordered(site)
+    assert reordered != site
+    freesta.save_session(path, {"version": freesta.SESSION_VERSION, "sites": [reordered]}, freesta.AI_SITES)
+
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["sites"] == [site["name"]]
+    loaded = freesta.load_session(path, freesta.AI_SITES)
+    assert loaded["sites"] == [site]
+    assert stats.with_order(loaded["sites"][0]) == reordered
+
+
+@pytest.mark.parametrize("content", ["", "not json", '{"version": 0, "sites": ["ChatGPT"]}', '{"version": 1, "sites": []}'])
+def test_unusable_session_is_ignored(tmp_path, content):
+    path = tmp_path / "session.json"
+    path.write_text(content.replace('"version": 1', f'"version": {freesta.SESSION_VERSION}'), encoding="utf-8")
+    assert freesta.load_session(str(path), freesta.AI_SITES) is None
+
+
+# ---- pane workers ----
+
+def test_ipc_channel_reassembles_split_messages():
+    from PySide6.QtCore import QObject, Signal
+
+    class Socket(QObject):
+        readyRead = Signal()
+        disconnected = Signal()
+        data = b""
+
+        def readAll(self):
+            data, self.data = self.data, b""
+            return data
+
+    socket = Socket()
+    channel = freesta.IpcChannel(socket)
+    received = []
+    channel.message.connect(received.append)
+
+    socket.data = b'{"event": "hello", "text": "caf\xc3'
+    socket.readyRead.emit()
+    assert received == []
+    socket.data = b'\xa9"}\nnot json\n[1]\n{"event": "bye"}\n{"event"'
+    socket.readyRead.emit()
+    assert received == [{"event": "hello", "text": "café"}, {"event": "bye"}]
+
+
+
+def test_worker_answers_join_the_main_run(settings, tmp_path):
+    archive = freesta.ConversationArchive(str(tmp_path / "archive.db"))
+    broadcast = archive.begin_run("compare sorting algorithms", ["A", "B"])
+    queued = archive.begin_run("hello there", ["A", "B"])
+    queue = SimpleNamespace(generation=2, prompts=["hello there"], run=lambda index: queued)
+    window = SimpleNamespace(archive=archive, queue=queue)
+    forward = lambda run, pane, prompt: freesta.DynamicAIWindow._archive_forwarded(
+        window, {"run": run, "pane": pane, "prompt": prompt, "text": pane + " answer",
+                 "timings": {"total_ms": 900.0}, "status": "done"})
+
+    forward(broadcast, "B", "compare sorting algorithms")
+    forward(["queue", 2, 0], "B", "hello there")
+    forward(["queue", 1, 0], "B", "stale")   # sent before the queue was cleared
+    forward(None, "B", "just B")
+    archive.close()
+
+    runs = {run["prompt"]: archive.run(run["id"]) for run in archive.search()}
+    assert sorted(runs) == ["compare sorting algorithms", "hello there", "just B"]
+    assert [a["pane"] for a in runs["compare sorting algorithms"]["answers"]] == ["B"]
+    assert [a["text"] for a in runs["hello there"]["answers"]] == ["B answer"]
+
+
+# ---- latency ----
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert [freesta.percentile(values, p) for p in (50, 95, 99)] == [50, 95, 99]
+    assert freesta.percentile([7], 99) == 7
+    assert freesta.percentile([], 50) is None
+
+
+def test_histogram_bins_on_shared_log_bounds():
+    assert freesta.histogram([10, 100, 1000], 10, 1000, bins=3) == "███"
+    assert freesta.histogram([10, 10, 1000], 10, 1000, bins=3) == "█ ▄"
+    assert freesta.histogram([5], 5, 5, bins=4) == "█   "
+    assert freesta.histogram([], 1, 2) == ""
+
+
+def test_latency_stats_skip_unfinished_answers(settings):
+    stats = freesta.LatencyStats()
+    view, site = object(), {"name": "Site"}
+    stats.begin(view, site)
+    stats.on_acknowledged(view, {})
+    stats.on_finished(view, "x" * 300, {"ttft_ms": 500.0, "total_ms": 3500.0, "chars": 300, "reason": "quiet"})
+    stats.begin(view, site)
+    stats.on_finished(view, "", {"ttft_ms": 1.0, "total_ms": 9e5, "chars": 0, "reason": "timeout"})
+
+    samples = stats.samples("Site")
+    assert samples["ttft_ms"] == [500] and samples["total_ms"] == [3500]
+    assert samples["chars_per_s"] == [100.0]
+    assert len(samples["submit_ms"]) == 1
+    assert stats.summary()["Site"]["total_ms"] == {"n": 1, "p50": 3500, "p95": 3500, "p99": 3500}
+
+
+# ---- prompt queue ----
+
+def test_manual_send_waits_for_the_queued_prompt(settings):
+    from PySide6.QtCore import QCoreApplication, QObject, Signal
+
+    class Capture(QObject):
+        finished = Signal(object, str, dict)
+
+        def is_capturing(self, view):
+            return True
+
+    class Dispatcher(QObject):
+        failed = Signal(object, str)
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    sent = []
+    window = QObject()
+    view = object()
+    window.views = [view]
+    window.ai_sites = [{"name": "Site"}]
+    window.capture, window.dispatcher = Capture(), Dispatcher()
+    window.archive_sink = lambda *args: None
+    window.send_to_pane = lambda v, site, text, run=None, queued=False: sent.append(text)
+    queue = freesta.PromptQueue(window)
+    queue.add(["first", "second"])
+    assert sent == ["first"] and queue.is_busy(view)
+
+    queue.hold(view, lambda: window.send_to_pane(view, {}, "manual"))
+    window.capture.finished.emit(view, "first answer", {})
+    app.processEvents()
+    assert sent == ["first", "manual"]
+    assert queue.snapshot()[0]["done"] == "1/2"
+
+    window.capture.finished.emit(view, "manual answer", {})   # not counted as "second"
+    app.processEvents()
+    assert sent == ["first", "manual", "second"]
+    assert queue.snapshot()[0]["done"] == "1/2"
+
+
+# ---- typing mirror ----
+
+@pytest.fixture
+def mirror(settings, monkeypatch):
+    from PySide6.QtCore import QObject
+
+    drafts = []
+    monkeypatch.setattr(freesta, "run_runtime",
+                        lambda page, method, *args, callback=None: drafts.append((method, args)))
+    window = QObject()
+    view = SimpleNamespace(page=lambda: None)
+    window.pool = None
+    window.views = [view]
+    window.ai_sites = [{"name": "Site", "input_selector": "textarea"}]
+    window.hibernator = SimpleNamespace(is_hibernated=lambda v: False)
+    mirror = freesta.TypingMirror(window)
+    mirror.drafts = drafts
+    return mirror
+
+
+def test_mirror_defaults_to_submit_and_reads_old_off_as_submit(mirror):
+    from PySide6.QtCore import QSettings
+    assert mirror.mode == "submit"
+    QSettings("Ai Freesta", "Ai Freesta").setValue("mirror_mode", "off")
+    assert freesta.TypingMirror(mirror.window).mode == "submit"
+
+
+def test_mirror_submit_mode_leaves_panes_alone(mirror):
+    mirror.set_mode("submit")
+    mirror.queue("draft")
+    mirror.flush()
+    assert mirror.drafts == []
+
+
+def test_mirror_live_mode_pushes_the_latest_draft_once(mirror):
+    mirror.set_mode("live")
+    for text in ("d", "dr", "draft"):
+        mirror.queue(text)
+    mirror.flush()
+    assert mirror.drafts == [("setDraft", ("textarea", "draft"))]
+
+
+# ---- chromium presets ----
+
+def test_chromium_preset_is_not_applied_twice(settings, monkeypatch):
+    monkeypatch.setenv("QTWEBENGINE_CHROMIUM_FLAGS", "--user-flag")
+    monkeypatch.delenv("AIFREESTA_USER_CHROMIUM_FLAGS", raising=False)
+    freesta.apply_chromium_preset("low-memory")
+    first = freesta.os.environ["QTWEBENGINE_CHROMIUM_FLAGS"]
+    # A pane worker inherits the environment and applies the preset again.
+    freesta.apply_chromium_preset("low-memory")
+    assert freesta.os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] == first
+    assert first.split().count("--user-flag") == 1